@@ -1,4 +1,83 @@
 import random
+from collections import namedtuple
+from fractions import Fraction
+from functools import lru_cache
+
+Odds = namedtuple('Odds', [
+    'dice', 'faces', 'small_max', 'big_min',
+    'big', 'small', 'neither', 'house_edge', 'bet_variance',
+    'total_mean', 'total_variance',
+])
+
+
+def convolve(a, b):
+    """Product of two polynomials given as coefficient sequences"""
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                result[i + j] += x * y
+    return tuple(result)
+
+
+@lru_cache(maxsize=None)
+def total_counts(dice=3, faces=6):
+    """Number of ways to roll each total; index 0 is the lowest total, which is `dice`
+
+    The counts are the coefficients of (x + x^2 + ... + x^faces)^dice. Each dice count
+    is built from two cached halves, so n dice need about log2(n) convolutions.
+    """
+    if dice == 0:
+        return (1,)
+    if dice == 1:
+        return (1,) * faces
+    half = dice // 2
+    return convolve(total_counts(half, faces), total_counts(dice - half, faces))
+
+
+def probability(total, dice=3, faces=6):
+    """Exact chance of rolling `total`"""
+    if not dice <= total <= dice * faces:
+        return Fraction(0)
+    return Fraction(total_counts(dice, faces)[total - dice], faces ** dice)
+
+
+def thresholds(dice=3, faces=6):
+    """(highest Small total, lowest Big total); a total exactly in the middle is neither"""
+    twice_middle = dice * (faces + 1)
+    return (twice_middle - 1) // 2, twice_middle // 2 + 1
+
+
+@lru_cache(maxsize=None)
+def odds(dice=3, faces=6):
+    """Exact odds for an even-money bet on Big or Small
+
+    The house edge and bet variance are per unit staked. A total that is neither Big nor
+    Small loses both bets, and both bets have the same odds because the distribution is
+    symmetric.
+    """
+    small_max, big_min = thresholds(dice, faces)
+    counts = total_counts(dice, faces)
+    outcomes = faces ** dice
+    big = Fraction(sum(counts[big_min - dice:]), outcomes)
+    small = Fraction(sum(counts[:small_max - dice + 1]), outcomes)
+    neither = 1 - big - small
+    mean = Fraction(dice * (faces + 1), 2)
+    # Each round returns +1 or -1, so the variance is 1 - (expected return)^2
+    edge = 1 - 2 * big
+    return Odds(
+        dice=dice,
+        faces=faces,
+        small_max=small_max,
+        big_min=big_min,
+        big=big,
+        small=small,
+        neither=neither,
+        house_edge=edge,
+        bet_variance=1 - edge * edge,
+        total_mean=mean,
+        total_variance=Fraction(dice * (faces * faces - 1), 12),
+    )
 
 
 def roll_dice(numbers=3, points=None):
@@ -12,9 +91,10 @@ def roll_dice(numbers=3, points=None):
     return points
 
 
-def roll_result(total):
-    is_big = 11 <= total <= 18
-    is_small = 3 <= total <= 10
+def roll_result(total, dice=3, faces=6):
+    small_max, big_min = thresholds(dice, faces)
+    is_big = big_min <= total <= dice * faces
+    is_small = dice <= total <= small_max
     if is_big:
         return 'Big'
     elif is_small:
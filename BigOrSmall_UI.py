@@ -1,9 +1,205 @@
 import sys
 import random
+import threading
+import time
+from collections import Counter
+
+import numpy as np
 from PySide2.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel,
-                               QVBoxLayout, QHBoxLayout, QWidget, QMessageBox)
-from PySide2.QtCore import Qt
-from PySide2.QtGui import QFont
+                               QVBoxLayout, QHBoxLayout, QWidget, QMessageBox,
+                               QComboBox, QSpinBox, QGridLayout, QScrollArea)
+from PySide2.QtCore import Qt, QObject, QThread, QPointF, Signal
+from PySide2.QtGui import QFont, QPainter, QPen, QColor, QPolygonF
+
+from BigOrSmall_sim import outcome_table, roll_totals
+
+STRATEGIES = ('Flat', 'Martingale')
+# Rounds rolled at once by the auto-play worker; pause and cancel are checked between batches
+BATCH_SIZE = 10_000
+# Seconds between statistics updates sent to the window
+REFRESH_INTERVAL = 0.1
+# Most bankroll samples kept for the curve, and the longest streak with its own bar
+CURVE_POINTS = 400
+MAX_STREAK_BIN = 15
+
+
+class AutoPlayWorker(QObject):
+    """Plays rounds off the GUI thread and reports running statistics
+
+    Dice are rolled BATCH_SIZE rounds at a time with BigOrSmall_sim, then the stakes are
+    settled round by round because a strategy like martingale depends on the previous
+    result. A snapshot of the statistics goes out at most every REFRESH_INTERVAL seconds,
+    so a million rounds cost a handful of repaints rather than a million.
+    """
+
+    progress = Signal(dict)
+    finished = Signal(dict)
+
+    def __init__(self, rounds, choice, strategy, stake, bankroll, seed=None):
+        super().__init__()
+        self.rounds = rounds
+        self.choice = choice
+        self.strategy = strategy
+        self.stake = stake
+        self.start_bankroll = bankroll
+        self.seed = seed
+        self._resume = threading.Event()
+        self._resume.set()
+        self._cancelled = False
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def cancel(self):
+        self._cancelled = True
+        self._resume.set()
+
+    def run(self):
+        rng = np.random.default_rng(self.seed)
+        wins_on = np.array([result == self.choice for result in outcome_table()])
+        self.played = 0
+        self.wins = 0
+        self.bankroll = self.start_bankroll
+        self.peak = self.start_bankroll
+        self.win_streaks = Counter()
+        self.loss_streaks = Counter()
+        self.curve = [self.bankroll]
+        self.curve_step = 1
+        streak_won, streak = None, 0
+        bet = self.stake
+        last_report = time.perf_counter()
+
+        while self.played < self.rounds and not self._cancelled and self.bankroll > 0:
+            self._resume.wait()
+            if self._cancelled:
+                break
+            count = min(BATCH_SIZE, self.rounds - self.played)
+            for won in wins_on[roll_totals(rng, count)].tolist():
+                wager = min(bet, self.bankroll)
+                if won:
+                    self.bankroll += wager
+                    self.peak = max(self.peak, self.bankroll)
+                    self.wins += 1
+                    bet = self.stake
+                else:
+                    self.bankroll -= wager
+                    if self.strategy == 'Martingale':
+                        bet = wager * 2
+                if won == streak_won:
+                    streak += 1
+                else:
+                    if streak:
+                        (self.win_streaks if streak_won else self.loss_streaks)[streak] += 1
+                    streak_won, streak = won, 1
+                self.played += 1
+                if self.played % self.curve_step == 0:
+                    self.add_curve_point()
+                if self.bankroll <= 0:
+                    break
+            now = time.perf_counter()
+            if now - last_report >= REFRESH_INTERVAL:
+                last_report = now
+                self.progress.emit(self.snapshot())
+
+        if streak:
+            (self.win_streaks if streak_won else self.loss_streaks)[streak] += 1
+        if self.played % self.curve_step:
+            self.curve.append(self.bankroll)
+        report = self.snapshot()
+        report['cancelled'] = self._cancelled
+        self.finished.emit(report)
+
+    def add_curve_point(self):
+        self.curve.append(self.bankroll)
+        if len(self.curve) > 2 * CURVE_POINTS:
+            # Keep every other sample and sample half as often from now on
+            self.curve = self.curve[::2]
+            self.curve_step *= 2
+
+    def snapshot(self):
+        return {
+            'played': self.played,
+            'rounds': self.rounds,
+            'wins': self.wins,
+            'bankroll': self.bankroll,
+            'peak': self.peak,
+            'curve': list(self.curve),
+            'curve_step': self.curve_step,
+            'win_streaks': dict(self.win_streaks),
+            'loss_streaks': dict(self.loss_streaks),
+        }
+
+
+class BankrollChart(QWidget):
+    """Line chart of the bankroll over the rounds played so far"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.points = []
+        self.setMinimumHeight(140)
+
+    def set_points(self, points):
+        self.points = points
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("white"))
+        if len(self.points) < 2:
+            return
+        low, high = min(self.points), max(self.points)
+        span = (high - low) or 1
+        width, height = self.width() - 1, self.height() - 1
+        step = width / (len(self.points) - 1)
+        line = QPolygonF([QPointF(i * step, height - (value - low) / span * height)
+                          for i, value in enumerate(self.points)])
+        painter.setPen(QPen(QColor("#4CAF50"), 1.5))
+        painter.drawPolyline(line)
+        painter.setPen(QColor("gray"))
+        painter.drawText(4, 12, f"{high:,}")
+        painter.drawText(4, height - 2, f"{low:,}")
+
+
+class StreakChart(QWidget):
+    """Side-by-side bars of how often each win and loss streak length happened"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.win_streaks = {}
+        self.loss_streaks = {}
+        self.setMinimumHeight(120)
+
+    def set_streaks(self, win_streaks, loss_streaks):
+        self.win_streaks = win_streaks
+        self.loss_streaks = loss_streaks
+        self.update()
+
+    @staticmethod
+    def binned(streaks):
+        bins = [0] * MAX_STREAK_BIN
+        for length, count in streaks.items():
+            bins[min(length, MAX_STREAK_BIN) - 1] += count
+        return bins
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("white"))
+        wins, losses = self.binned(self.win_streaks), self.binned(self.loss_streaks)
+        tallest = max(wins + losses) or 1
+        slot = self.width() / MAX_STREAK_BIN
+        height = self.height() - 14
+        for i, (won, lost) in enumerate(zip(wins, losses)):
+            x = i * slot
+            for offset, count, color in ((0.1, won, "#4CAF50"), (0.5, lost, "#f44336")):
+                # Square root scale so the rare long streaks stay visible next to the common short ones
+                bar = int(height * (count / tallest) ** 0.5)
+                painter.fillRect(int(x + offset * slot), height - bar, max(1, int(0.4 * slot)), bar, QColor(color))
+            painter.setPen(QColor("gray"))
+            label = f"{i + 1}+" if i == MAX_STREAK_BIN - 1 else str(i + 1)
+            painter.drawText(int(x), self.height() - 2, label)
 
 
 class DiceGame(QMainWindow):
@@ -12,14 +208,20 @@ class DiceGame(QMainWindow):
         self.setWindowTitle("Dice Game")
         self.setFixedSize(400, 500)
 
-        # Create central widget and main layout
+        # Create central widget and main layout; the auto-play panel scrolls into view below the game
         central_widget = QWidget()
-        self.setCentralWidget(central_widget)
+        scroll_area = QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        scroll_area.setWidget(central_widget)
+        self.setCentralWidget(scroll_area)
         main_layout = QVBoxLayout(central_widget)
 
         # Create title label
         title_label = QLabel("Big or Small Dice Game")
         title_label.setAlignment(Qt.AlignCenter)
+        # Wraps rather than pushing the panel wider than the scroll area
+        title_label.setWordWrap(True)
         title_font = QFont()
         title_font.setPointSize(20)
         title_font.setBold(True)
@@ -104,6 +306,55 @@ class DiceGame(QMainWindow):
         # Add some spacing
         main_layout.addSpacing(20)
 
+        # Auto-play settings
+        settings_layout = QGridLayout()
+        self.auto_choice = QComboBox()
+        self.auto_choice.addItems(["Big", "Small"])
+        self.auto_strategy = QComboBox()
+        self.auto_strategy.addItems(STRATEGIES)
+        self.auto_rounds = QSpinBox()
+        self.auto_rounds.setRange(1, 10_000_000)
+        self.auto_rounds.setValue(1_000_000)
+        self.auto_rounds.setSingleStep(100_000)
+        self.auto_stake = QSpinBox()
+        self.auto_stake.setRange(1, 1_000_000)
+        self.auto_stake.setValue(10)
+        self.auto_bankroll = QSpinBox()
+        self.auto_bankroll.setRange(1, 1_000_000_000)
+        self.auto_bankroll.setValue(10_000)
+        for row, (label, widget) in enumerate((("Bet on", self.auto_choice), ("Strategy", self.auto_strategy),
+                                               ("Rounds", self.auto_rounds), ("Stake", self.auto_stake),
+                                               ("Bankroll", self.auto_bankroll))):
+            settings_layout.addWidget(QLabel(label), row, 0)
+            settings_layout.addWidget(widget, row, 1)
+        main_layout.addLayout(settings_layout)
+
+        # Auto-play controls
+        auto_layout = QHBoxLayout()
+        self.auto_button = QPushButton("Auto Play")
+        self.pause_button = QPushButton("Pause")
+        self.cancel_button = QPushButton("Cancel")
+        self.auto_button.clicked.connect(self.start_auto_play)
+        self.pause_button.clicked.connect(self.toggle_auto_pause)
+        self.cancel_button.clicked.connect(self.cancel_auto_play)
+        for button in (self.auto_button, self.pause_button, self.cancel_button):
+            auto_layout.addWidget(button)
+        main_layout.addLayout(auto_layout)
+
+        # Live statistics
+        self.stats_label = QLabel("Played: 0")
+        self.stats_label.setAlignment(Qt.AlignCenter)
+        main_layout.addWidget(self.stats_label)
+        self.bankroll_chart = BankrollChart()
+        main_layout.addWidget(self.bankroll_chart)
+        self.streak_chart = StreakChart()
+        main_layout.addWidget(self.streak_chart)
+
+        self.auto_thread = None
+        self.auto_worker = None
+        self.auto_paused = False
+        self.set_auto_running(False)
+
     def roll_dice(self, numbers=3):
         points = []
         for _ in range(numbers):
@@ -137,6 +388,81 @@ class DiceGame(QMainWindow):
             self.result_label.setText("You Lose! 😢")
             self.result_label.setStyleSheet("color: red;")
 
+    def set_auto_running(self, running):
+        self.auto_button.setEnabled(not running)
+        self.pause_button.setEnabled(running)
+        self.cancel_button.setEnabled(running)
+        self.big_button.setEnabled(not running)
+        self.small_button.setEnabled(not running)
+        for widget in (self.auto_choice, self.auto_strategy, self.auto_rounds, self.auto_stake, self.auto_bankroll):
+            widget.setEnabled(not running)
+
+    def start_auto_play(self):
+        self.auto_worker = AutoPlayWorker(
+            self.auto_rounds.value(), self.auto_choice.currentText(), self.auto_strategy.currentText(),
+            self.auto_stake.value(), self.auto_bankroll.value()
+        )
+        self.auto_thread = QThread(self)
+        self.auto_worker.moveToThread(self.auto_thread)
+        self.auto_thread.started.connect(self.auto_worker.run)
+        self.auto_worker.progress.connect(self.show_auto_stats)
+        self.auto_worker.finished.connect(self.on_auto_finished)
+        self.auto_worker.finished.connect(self.auto_thread.quit)
+        self.auto_thread.finished.connect(self.auto_worker.deleteLater)
+        self.auto_thread.finished.connect(self.auto_thread.deleteLater)
+        self.auto_paused = False
+        self.pause_button.setText("Pause")
+        self.set_auto_running(True)
+        self.auto_thread.start()
+
+    def toggle_auto_pause(self):
+        if self.auto_worker is None:
+            return
+        self.auto_paused = not self.auto_paused
+        if self.auto_paused:
+            self.auto_worker.pause()
+        else:
+            self.auto_worker.resume()
+        self.pause_button.setText("Resume" if self.auto_paused else "Pause")
+
+    def cancel_auto_play(self):
+        if self.auto_worker is not None:
+            self.auto_worker.cancel()
+
+    def show_auto_stats(self, stats):
+        played = stats['played']
+        win_rate = stats['wins'] / played if played else 0
+        longest_win = max(stats['win_streaks'], default=0)
+        longest_loss = max(stats['loss_streaks'], default=0)
+        self.stats_label.setText(
+            f"Played: {played:,} / {stats['rounds']:,}   Win rate: {win_rate:.4%}\n"
+            f"Bankroll: {stats['bankroll']:,}   Peak: {stats['peak']:,}\n"
+            f"Longest streaks: {longest_win} wins, {longest_loss} losses"
+        )
+        self.bankroll_chart.set_points(stats['curve'])
+        self.streak_chart.set_streaks(stats['win_streaks'], stats['loss_streaks'])
+
+    def on_auto_finished(self, stats):
+        self.show_auto_stats(stats)
+        if stats['cancelled']:
+            self.result_label.setText("Auto play cancelled")
+        elif stats['bankroll'] <= 0:
+            self.result_label.setText(f"Bankrupt after {stats['played']:,} rounds")
+        else:
+            self.result_label.setText(f"Auto play finished: {stats['bankroll'] - self.auto_bankroll.value():+,}")
+        self.result_label.setStyleSheet("")
+        self.auto_worker = None
+        self.auto_thread = None
+        self.set_auto_running(False)
+
+    def closeEvent(self, event):
+        # Stop the worker before the window and its thread are destroyed
+        if self.auto_worker is not None:
+            self.auto_worker.cancel()
+            self.auto_thread.quit()
+            self.auto_thread.wait()
+        super().closeEvent(event)
+
 
 def main():
     app = QApplication(sys.argv)
@@ -0,0 +1,209 @@
+"""Vectorized Monte Carlo simulation of the Big or Small dice game
+
+Rounds are rolled as NumPy arrays: a (dice, rounds) block of faces is summed into
+totals, and a lookup table built from BigOrSmall.roll_result classifies every total
+at once, so the batch rules cannot drift from the interactive game. A run is cut
+into fixed-size chunks and only a histogram of totals plus the current win/loss
+streak is carried between them, so memory stays flat however many rounds are
+played. Tasks fan out over a process pool; each gets its own stream from
+SeedSequence.spawn, so a seed reproduces the same result for any process count.
+
+    python BigOrSmall_sim.py --rounds 100000000 --bet Big --processes 8
+    python BigOrSmall_sim.py --validate --dice 4 --faces 6
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from BigOrSmall import odds, probability, roll_result
+
+DICE = 3
+FACES = 6
+BETS = ('Big', 'Small')
+# Rounds rolled per NumPy block, and rounds handed to one pool task
+CHUNK_SIZE = 1 << 20
+TASK_ROUNDS = 1 << 24
+
+
+def outcome_table(dice=DICE, faces=FACES):
+    """roll_result for every reachable total, indexed by total"""
+    return [roll_result(total, dice, faces) for total in range(dice * faces + 1)]
+
+
+def roll_totals(rng, rounds, dice=DICE, faces=FACES):
+    """Totals of `rounds` rolls of `dice` dice"""
+    faces_dtype = np.uint8 if faces < 256 else np.uint16
+    rolls = rng.integers(1, faces + 1, size=(dice, rounds), dtype=faces_dtype)
+    return np.add.reduce(rolls, axis=0, dtype=np.uint32)
+
+
+class Stats:
+    """Streaming results for one bet: a histogram of totals and the longest win/loss streaks"""
+
+    def __init__(self, bet, dice=DICE, faces=FACES):
+        self.bet = bet
+        self.wins_on = np.array([result == bet for result in outcome_table(dice, faces)])
+        self.histogram = np.zeros(dice * faces + 1, dtype=np.int64)
+        self.longest_win = 0
+        self.longest_loss = 0
+        # The streak still running at the end of the last chunk
+        self.run_won = None
+        self.run_length = 0
+
+    @property
+    def rounds(self):
+        return int(self.histogram.sum())
+
+    @property
+    def wins(self):
+        return int(self.histogram[self.wins_on].sum())
+
+    def add(self, totals):
+        if not len(totals):
+            return
+        self.histogram += np.bincount(totals, minlength=len(self.histogram))
+        won = self.wins_on[totals]
+        starts = np.concatenate(([0], np.flatnonzero(won[1:] != won[:-1]) + 1))
+        lengths = np.diff(np.append(starts, len(won)))
+        values = won[starts]
+        if values[0] == self.run_won:
+            lengths[0] += self.run_length
+        if values.any():
+            self.longest_win = max(self.longest_win, int(lengths[values].max()))
+        if not values.all():
+            self.longest_loss = max(self.longest_loss, int(lengths[~values].max()))
+        self.run_won = bool(values[-1])
+        self.run_length = int(lengths[-1])
+
+    def merge(self, other):
+        """Fold in another task's results; streaks never span tasks, they use different streams"""
+        self.histogram += other.histogram
+        self.longest_win = max(self.longest_win, other.longest_win)
+        self.longest_loss = max(self.longest_loss, other.longest_loss)
+
+
+def simulate(rounds, bet='Big', dice=DICE, faces=FACES, seed=None, chunk_size=CHUNK_SIZE):
+    """Play `rounds` rounds betting on `bet`, rolling chunk_size rounds at a time"""
+    rng = np.random.default_rng(seed)
+    stats = Stats(bet, dice, faces)
+    for start in range(0, rounds, chunk_size):
+        stats.add(roll_totals(rng, min(chunk_size, rounds - start), dice, faces))
+    return stats
+
+
+def _run_task(args):
+    rounds, bet, dice, faces, seed_sequence, chunk_size = args
+    return simulate(rounds, bet, dice, faces, seed_sequence, chunk_size)
+
+
+def evaluate(rounds, bet='Big', dice=DICE, faces=FACES, seed=0, processes=None,
+             chunk_size=CHUNK_SIZE, task_rounds=TASK_ROUNDS):
+    """Split `rounds` into pool tasks and summarize a flat even-money bet on `bet`"""
+    if rounds < 1:
+        raise ValueError(f"rounds must be at least 1, got {rounds}")
+    tasks = [min(task_rounds, rounds - start) for start in range(0, rounds, task_rounds)]
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    jobs = [(n, bet, dice, faces, child, chunk_size) for n, child in zip(tasks, seeds)]
+
+    started = time.perf_counter()
+    if processes == 1 or len(jobs) == 1:
+        results = [_run_task(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(processes or os.cpu_count()) as pool:
+            results = list(pool.map(_run_task, jobs))
+    elapsed = time.perf_counter() - started
+
+    stats = results[0]
+    for other in results[1:]:
+        stats.merge(other)
+    wins = stats.wins
+    win_rate = wins / rounds
+    # Each round returns +1 or -1, so the mean return is 2p - 1 with variance 4p(1 - p)
+    edge = 2 * win_rate - 1
+    return {
+        'rounds': rounds,
+        'bet': bet,
+        'dice': dice,
+        'faces': faces,
+        'seed': seed,
+        'wins': wins,
+        'losses': rounds - wins,
+        'win_rate': win_rate,
+        'expected_return': edge,
+        'standard_error': float(np.sqrt(4 * win_rate * (1 - win_rate) / rounds)),
+        'longest_win_streak': stats.longest_win,
+        'longest_loss_streak': stats.longest_loss,
+        'histogram': stats.histogram.tolist(),
+        'seconds': round(elapsed, 3),
+        'rounds_per_second': round(rounds / elapsed) if elapsed else None,
+    }
+
+
+def validate(rounds, dice=DICE, faces=FACES, seed=0, processes=None, chunk_size=CHUNK_SIZE):
+    """Cross-check BigOrSmall.odds against a simulation of `rounds` rounds
+
+    Reports the z-score of the simulated Big win rate against the exact one and a
+    chi-square test of the simulated totals against the exact distribution, turned into
+    an approximate z-score with the Wilson-Hilferty transform. Both stay within a few
+    units when the two agree.
+    """
+    report = evaluate(rounds, 'Big', dice, faces, seed, processes, chunk_size)
+    exact = odds(dice, faces)
+    win_rate = float(exact.big)
+    win_rate_z = (report['win_rate'] - win_rate) / np.sqrt(win_rate * (1 - win_rate) / rounds)
+
+    observed = np.array(report['histogram'][dice:], dtype=float)
+    expected = rounds * np.array([float(probability(total, dice, faces)) for total in range(dice, dice * faces + 1)])
+    # Totals too rare to expect a single hit would dominate the statistic, leave them out
+    kept = expected >= 5
+    chi2 = float((((observed - expected) ** 2)[kept] / expected[kept]).sum())
+    dof = max(1, int(kept.sum()) - 1)
+    chi2_z = ((chi2 / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / np.sqrt(2 / (9 * dof))
+    return {
+        'rounds': rounds,
+        'dice': dice,
+        'faces': faces,
+        'exact_win_rate': win_rate,
+        'simulated_win_rate': report['win_rate'],
+        'win_rate_z': float(win_rate_z),
+        'chi2': chi2,
+        'dof': dof,
+        'chi2_z': float(chi2_z),
+        'agrees': bool(abs(win_rate_z) < 4 and chi2_z < 4),
+        'seconds': report['seconds'],
+    }
+
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Big or Small Monte Carlo simulation")
+    parser.add_argument('--rounds', type=positive_int, default=10_000_000)
+    parser.add_argument('--bet', choices=BETS, default='Big')
+    parser.add_argument('--dice', type=int, default=DICE)
+    parser.add_argument('--faces', type=int, default=FACES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=None, help="defaults to every CPU core")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="rounds rolled per NumPy block")
+    parser.add_argument('--validate', action='store_true', help="compare the simulation with the exact odds")
+    args = parser.parse_args()
+    if args.validate:
+        report = validate(args.rounds, args.dice, args.faces, args.seed, args.processes, args.chunk_size)
+    else:
+        report = evaluate(args.rounds, args.bet, args.dice, args.faces, args.seed, args.processes, args.chunk_size)
+    for key, value in report.items():
+        if key != 'histogram':
+            print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
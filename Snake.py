@@ -1,7 +1,17 @@
+import argparse
+import os
 import random
+import sqlite3
+import sys
 import time
 import tkinter as tk
-from tkinter import Menu
+from array import array
+from collections import deque
+from heapq import heappop, heappush
+from itertools import islice
+from tkinter import Menu, filedialog, messagebox
+
+from Snake_replay import Replay, Scoreboard
 
 WIDTH = 20
 HEIGHT = 20
@@ -9,143 +19,995 @@ SNAKE_LENGTH = 5
 SNAKE_COLOR = "green"
 FOOD_COLOR = "red"
 CELL_SIZE = 20
-Scoreboard = []
+
+# 方向 -> (dx, dy)
+DIRECTIONS = {"up": (0, -1), "down": (0, 1), "left": (-1, 0), "right": (1, 0)}
+OPPOSITE = {"up": "down", "down": "up", "left": "right", "right": "left"}
+# 录像中的方向编号
+DIRECTION_NAMES = list(DIRECTIONS)
+DIRECTION_CODES = {name: code for code, name in enumerate(DIRECTION_NAMES)}
+# 初始蛇身，头在前
+START_SNAKE = [(0, 0), (0, 1), (0, 2), (0, 3), (0, 4)]
+
+# SnakeState.step 的结果
+MOVED, GREW, DIED = range(3)
+
+# 速度等级 -> 每步逻辑的间隔（秒）
+SPEED_LEVELS = {1: 0.200, 2: 0.150, 3: 0.100, 4: 0.070, 5: 0.050}
+DEFAULT_SPEED = 3
+# 画面检查时钟的间隔（毫秒），逻辑步进与它无关
+FRAME_INTERVAL = 10
+# 卡顿之后一帧内最多补跑的逻辑步数，超出的部分直接丢弃
+MAX_CATCH_UP = 5
+# 格子数超过这个值时整块棋盘画在一张图片上，而不是每节一个矩形
+BITMAP_CELLS = 2500
+# 自动选择格子大小时窗口的最大边长（像素）
+MAX_BOARD_PIXELS = 800
+BACKGROUND_COLOR = "black"
+# 回放倍速档位，以及左右方向键一次跳过的步数
+PLAYBACK_RATES = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+SEEK_STEPS = 50
+TOP_SCORES = 10
+# 自动驾驶每步搜索的时间预算（秒），以及预算用完后隔多少步再搜索
+AUTOPILOT_BUDGET = 0.005
+AUTOPILOT_RETRY = 8
+# 每步预算中寻路可以用掉的比例，其余留给后备方式检查各个方向
+AUTOPILOT_SEARCH_SHARE = 0.6
+# 蛇身占棋盘的比例达到这个值之后，自动驾驶改为按哈密顿回路的顺序走；大棋盘上蛇长到
+# FREE_ROAM_CELLS 节就改，再长的话后备方式数两个蛇长的空间在预算内数不完
+FREE_ROAM_SHARE = 0.05
+FREE_ROAM_CELLS = 250
+
+
+def application_path():
+    """高分榜等数据文件所在目录
+
+    打包成单文件 exe 时 __file__ 位于每次运行都会删除的临时解压目录，改用 exe 所在目录。
+    """
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+class SnakeState:
+    """与界面无关的游戏规则和状态
+
+    格子用整数编号 y * width + x 表示。蛇身是编号的双端队列（头在前），
+    occupied 按格子记录是否被蛇身占用，碰撞检测一次下标访问即可；
+    free 保存所有空格子，free_pos 记录每个格子在 free 中的位置，
+    占用和释放都是与末尾交换后 O(1) 增删，食物在空格子中均匀随机选取，不会落在蛇身上。
+    """
+
+    def __init__(self, width=WIDTH, height=HEIGHT, seed=None):
+        self.width = width
+        self.height = height
+        # 种子总是确定下来，录像只需保存它就能复现食物位置
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        size = width * height
+        self.occupied = bytearray(size)
+        self.free = array('i', range(size))
+        self.free_pos = array('i', range(size))
+        self.body = deque()
+        for x, y in START_SNAKE:
+            cell = self.pack(x, y)
+            self.body.append(cell)
+            self._occupy(cell)
+        self.dir = "right"
+        self.score = 0
+        # 已前进的步数
+        self.ticks = 0
+        self.game_over = False
+        self.food = None
+        self.place_food()
+
+    def pack(self, x, y):
+        return y * self.width + x
+
+    def unpack(self, cell):
+        y, x = divmod(cell, self.width)
+        return x, y
+
+    @property
+    def head(self):
+        return self.body[0]
+
+    def cells(self):
+        """蛇身各节的 (x, y)，头在前"""
+        return [self.unpack(cell) for cell in self.body]
+
+    def _occupy(self, cell):
+        self.occupied[cell] = 1
+        position = self.free_pos[cell]
+        last = self.free[-1]
+        self.free[position] = last
+        self.free_pos[last] = position
+        self.free.pop()
+
+    def _release(self, cell):
+        self.occupied[cell] = 0
+        self.free_pos[cell] = len(self.free)
+        self.free.append(cell)
+
+    def place_food(self):
+        """在空格子中均匀随机放置食物；棋盘已被占满时没有食物"""
+        self.food = self.free[self.rng.randrange(len(self.free))] if self.free else None
+
+    def turn(self, direction):
+        """改变方向，不允许直接掉头；返回是否改变"""
+        if direction == self.dir or direction == OPPOSITE[self.dir]:
+            return False
+        self.dir = direction
+        return True
+
+    def step(self):
+        """前进一格，返回 MOVED、GREW 或 DIED"""
+        dx, dy = DIRECTIONS[self.dir]
+        x, y = self.unpack(self.body[0])
+        x += dx
+        y += dy
+        # 与原规则一致：撞到当前尾部所在的格子也算撞到自己
+        if not (0 <= x < self.width and 0 <= y < self.height) or self.occupied[self.pack(x, y)]:
+            self.game_over = True
+            return DIED
+
+        cell = self.pack(x, y)
+        self.ticks += 1
+        self.body.appendleft(cell)
+        self._occupy(cell)
+        if cell == self.food:
+            self.score += 1
+            self.place_food()
+            if self.food is None:
+                # 蛇占满了整个棋盘
+                self.game_over = True
+            return GREW
+        self._release(self.body.pop())
+        return MOVED
+
+
+class ReplayPlayer:
+    """按录像重新模拟一局。向后跳转直接连续推进，向前跳转从头重放，中间都不绘制"""
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.rewind()
+
+    def rewind(self):
+        self.state = SnakeState(self.replay.width, self.replay.height, self.replay.seed)
+        self.next_event = 0
+
+    @property
+    def finished(self):
+        return self.state.game_over or self.state.ticks >= self.replay.ticks
+
+    def step(self):
+        state = self.state
+        events = self.replay.events
+        if self.next_event < len(events) and events[self.next_event][0] == state.ticks:
+            state.dir = DIRECTION_NAMES[events[self.next_event][1]]
+            self.next_event += 1
+        return state.step()
+
+    def seek(self, tick):
+        if tick < self.state.ticks:
+            self.rewind()
+        while self.state.ticks < tick and not self.finished:
+            self.step()
+
+
+class Autopilot:
+    """自动驾驶：用 A* 找到食物的路径，确认走完之后还有退路才采用，否则按后备方式走一步
+
+    邻居表 neighbors[cell * 4 + 方向编号] 预先算好（出界为 -1），搜索直接读 SnakeState.occupied，
+    seen、came_from 数组在各次搜索间复用，用代数标记代替清零。找到的路径缓存下来，
+    食物不变时后面各步直接沿用，通常每个食物只搜索一次。每步共用一个时间预算，寻路最多用掉
+    AUTOPILOT_SEARCH_SHARE，用完或没有安全路径时先按后备方式走几步再试。检查安全时直接在
+    SnakeState.occupied 上改出模拟的蛇身，数完空间再改回来，不复制整块棋盘。
+
+    蛇还短（不到棋盘的 FREE_ROAM_SHARE，也不到 FREE_ROAM_CELLS 节）时自由寻路：
+    模拟沿路径吃到食物后的蛇身，新蛇头能到达尾部或至少有两个蛇长的空间才算安全；
+    后备方式优先走能回到尾部的方向，其中选离尾部最远的，把蛇身拉开而不是绕着食物打转，
+    都回不去时朝空间最大的方向走。
+    之后如果棋盘有一边是偶数，就存在哈密顿回路：先沿回路走满一个蛇长，让蛇身整段排在回路上，
+    此后只沿回路顺序向前抄近路。蛇身始终落在回路上从尾到头的一段里，蛇头沿回路往前到尾部
+    之间都是空格，随时都能沿回路回到尾部，这样能吃满整个棋盘；后备方式是在回路上尽量往前
+    抄近路，前方到尾部留够一个蛇长的空格。两边都是奇数时没有回路，一直自由寻路。
+    """
+
+    def __init__(self, width, height, budget=AUTOPILOT_BUDGET):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.budget = budget
+        self.neighbors = array('i', [-1]) * (self.size * 4)
+        for cell in range(self.size):
+            y, x = divmod(cell, width)
+            for code, name in enumerate(DIRECTION_NAMES):
+                dx, dy = DIRECTIONS[name]
+                if 0 <= x + dx < width and 0 <= y + dy < height:
+                    self.neighbors[cell * 4 + code] = (y + dy) * width + x + dx
+        self.cycle = self.build_cycle()
+        self.free_roam = min(self.size * FREE_ROAM_SHARE, FREE_ROAM_CELLS)
+        if self.cycle is not None:
+            self.cycle_index = array('i', bytes(4 * self.size))
+            for position, cell in enumerate(self.cycle):
+                self.cycle_index[cell] = position
+        self.generation = 0
+        self.seen = array('i', bytes(4 * self.size))
+        self.came_from = array('i', bytes(4 * self.size))
+        self.reset()
+
+    def build_cycle(self):
+        """哈密顿回路上的格子顺序：第 0 列留作回程，其余列逐行蛇形往返；需要行数为偶数，否则转置"""
+        width, height = self.width, self.height
+        if height % 2 == 0 and width >= 2:
+            points = [(x, y) for y in range(height)
+                      for x in (range(1, width) if y % 2 == 0 else range(width - 1, 0, -1))]
+            points += [(0, y) for y in range(height - 1, -1, -1)]
+        elif width % 2 == 0 and height >= 2:
+            points = [(x, y) for x in range(width)
+                      for y in (range(1, height) if x % 2 == 0 else range(height - 1, 0, -1))]
+            points += [(x, 0) for x in range(width - 1, -1, -1)]
+        else:
+            return None
+        # 起点放在 (0, 0)，使初始蛇身正好沿回路排列
+        start = points.index((0, 0))
+        points = points[start:] + points[:start]
+        return array('i', [y * width + x for x, y in points])
+
+    def reset(self):
+        """换了一局：丢掉缓存的路径"""
+        self.path = deque()
+        self.path_food = None
+        self.retry_at = 0
+        # 蛇身是否整段排在回路上；在此之前自由寻路，靠尾部可达检查保证安全
+        self.ordered = False
+        self.aligned_steps = 0
+        self.align_until = None
+
+    def direction_to(self, head, cell):
+        base = head * 4
+        for code in range(4):
+            if self.neighbors[base + code] == cell:
+                return DIRECTION_NAMES[code]
+        return None
+
+    def choose(self, state):
+        """下一步的方向"""
+        head = state.head
+        deadline = time.perf_counter() + self.budget
+        search_deadline = deadline - self.budget * (1 - AUTOPILOT_SEARCH_SHARE)
+        if self.cycle is not None and not self.ordered and len(state.body) >= self.free_roam:
+            return self.align(state, search_deadline, deadline)
+        if self.path and self.path_food == state.food and not state.occupied[self.path[0]]:
+            direction = self.direction_to(head, self.path[0])
+            if direction is not None:
+                self.path.popleft()
+                return direction
+        self.path.clear()
+        if state.food is not None and state.ticks >= self.retry_at:
+            path = self.search(state, search_deadline)
+            if not path:
+                # 没有安全路径或预算用完，先按后备方式走几步再搜索
+                self.retry_at = state.ticks + AUTOPILOT_RETRY
+            else:
+                self.path = deque(path)
+                self.path_food = state.food
+                return self.direction_to(head, self.path.popleft())
+        return self.fallback(state, deadline)
+
+    def align(self, state, search_deadline, deadline):
+        """连续沿回路走满一个蛇长，蛇身就整段排在回路上，之后改为按回路顺序抄近路
+
+        回路的下一格会把蛇困住时先绕开；绕了整整一圈还没对齐就不再检查，直接沿回路走。
+        """
+        self.path.clear()
+        if self.align_until is None:
+            self.align_until = state.ticks + self.size
+        following = self.cycle[(self.cycle_index[state.head] + 1) % self.size]
+        careful = state.ticks < self.align_until
+        if state.occupied[following] or careful and not self.safe_after(state, [following], search_deadline):
+            self.aligned_steps = 0
+            return self.fallback(state, deadline)
+        self.aligned_steps += 1
+        if self.aligned_steps >= len(state.body):
+            self.ordered = True
+        return self.direction_to(state.head, following)
+
+    def shortcut(self, state):
+        """已对齐时的后备方式：在回路上尽量往前抄近路，前方到尾部至少留一个蛇长的空格；
+        食物在前方时不越过食物。没有这样的格子就走回路的下一格"""
+        size = self.size
+        cycle_index = self.cycle_index
+        head = state.head
+        tail_position = cycle_index[state.body[-1]]
+        position = (cycle_index[head] - tail_position) % size
+        limit = size - 1 - len(state.body)
+        if state.food is not None:
+            food_position = (cycle_index[state.food] - tail_position) % size
+            if position < food_position:
+                limit = min(limit, food_position)
+        following = self.cycle[(cycle_index[head] + 1) % size]
+        best, best_ahead = following, position + 1
+        for code in range(4):
+            neighbor = self.neighbors[head * 4 + code]
+            if neighbor < 0 or state.occupied[neighbor]:
+                continue
+            ahead = (cycle_index[neighbor] - tail_position) % size
+            if best_ahead < ahead <= limit:
+                best, best_ahead = neighbor, ahead
+        return self.direction_to(head, best)
+
+    def search(self, state, deadline):
+        """A* 找到食物的路径（不含蛇头）；没有安全路径返回空列表，超出预算返回 None"""
+        width = self.width
+        size = self.size
+        neighbors = self.neighbors
+        occupied = state.occupied
+        head, food = state.head, state.food
+        food_y, food_x = divmod(food, width)
+        ordered = self.ordered
+        if ordered:
+            # 只允许沿回路顺序在蛇头和食物之间前进
+            cycle_index = self.cycle_index
+            tail_position = cycle_index[state.body[-1]]
+            limit = (cycle_index[food] - tail_position) % size
+            if limit <= (cycle_index[head] - tail_position) % size:
+                return []
+            # 吃到之后食物前方到尾部的空格不少于蛇长，否则空格被抄近路留下的空洞分散，可能走进死角
+            if size - 1 - limit < len(state.body):
+                return []
+
+        self.generation += 1
+        generation = self.generation
+        seen = self.seen
+        came_from = self.came_from
+        seen[head] = generation
+        y, x = divmod(head, width)
+        # 估值相同时优先展开走得更远的格子，否则会把整个矩形区域都展开一遍
+        heap = [(abs(food_x - x) + abs(food_y - y), 0, head)]
+        expanded = 0
+        while heap:
+            _, depth, cell = heappop(heap)
+            if cell == food:
+                path = []
+                while cell != head:
+                    path.append(cell)
+                    cell = came_from[cell]
+                path.reverse()
+                if not ordered and not self.safe_after(state, path, deadline):
+                    return []
+                return path
+            expanded += 1
+            if not expanded & 63 and time.perf_counter() > deadline:
+                return None
+            if ordered:
+                position = (cycle_index[cell] - tail_position) % size
+            base = cell * 4
+            for code in range(4):
+                neighbor = neighbors[base + code]
+                if neighbor < 0 or seen[neighbor] == generation or occupied[neighbor]:
+                    continue
+                if ordered:
+                    ahead = (cycle_index[neighbor] - tail_position) % size
+                    if not position < ahead <= limit:
+                        continue
+                seen[neighbor] = generation
+                came_from[neighbor] = cell
+                y, x = divmod(neighbor, width)
+                heappush(heap, (1 - depth + abs(food_x - x) + abs(food_y - y), depth - 1, neighbor))
+        return []
+
+    def safe_after(self, state, path, deadline):
+        """沿 path 走完（按吃到食物变长一节算）之后，新蛇头能到达尾部或至少还有两个蛇长的活动空间；
+        预算内数不完按不安全算"""
+        body = state.body
+        occupied = state.occupied
+        length = len(body) + 1
+        # 走完之后的蛇身是 path 倒序接上原蛇身的前 kept 节：只改 path 经过的格子和让出的尾部
+        kept = max(0, length - len(path))
+        entered = path[-length:]
+        left = list(islice(reversed(body), len(body) - kept))
+        tail = body[kept - 1] if kept else entered[0]
+        for cell in left:
+            occupied[cell] = 0
+        for cell in entered:
+            occupied[cell] = 1
+        try:
+            count, reached = self.room(occupied, path[-1], tail, 2 * length, deadline)
+        finally:
+            for cell in entered:
+                occupied[cell] = 0
+            for cell in left:
+                occupied[cell] = 1
+        return reached or count >= 2 * length
+
+    def room(self, occupied, start, tail, limit, deadline):
+        """从 start 出发数能到达的空格，返回 (格数, 能否到达尾部)，数到 limit 或碰到尾部为止；
+        超出预算时返回已数到的
+
+        撞到当前尾部所在的格子也会死，所以紧挨着 start 的尾部不算能到达，至少要隔一步。
+        """
+        self.generation += 1
+        generation = self.generation
+        seen = self.seen
+        neighbors = self.neighbors
+        seen[start] = generation
+        frontier = [start]
+        count = 0
+        while frontier:
+            if time.perf_counter() > deadline:
+                return count, False
+            following = []
+            for cell in frontier:
+                base = cell * 4
+                for code in range(4):
+                    neighbor = neighbors[base + code]
+                    if neighbor == tail and cell != start:
+                        return count, True
+                    if neighbor >= 0 and seen[neighbor] != generation and not occupied[neighbor]:
+                        seen[neighbor] = generation
+                        following.append(neighbor)
+            count += len(following)
+            if count >= limit:
+                return limit, False
+            frontier = following
+        return count, False
+
+    def fallback(self, state, deadline):
+        """没有采用路径时：已对齐就沿回路抄近路，否则优先走能回到尾部的方向，再看活动空间；
+        剩下的预算由各个方向平分，数不完的按已数到的空间比较"""
+        head = state.head
+        if self.ordered:
+            return self.shortcut(state)
+        body = state.body
+        occupied = state.occupied
+        tail = body[-1]
+        limit = 2 * len(body)
+        food_y, food_x = divmod(state.food if state.food is not None else head, self.width)
+        tail_y, tail_x = divmod(tail, self.width)
+        moves = [(code, neighbor) for code, neighbor in enumerate(self.neighbors[head * 4:head * 4 + 4])
+                 if neighbor >= 0 and not occupied[neighbor]]
+        best, best_key = state.dir, None
+        for i, (code, neighbor) in enumerate(moves):
+            now = time.perf_counter()
+            share = (deadline - now) / (len(moves) - i)
+            # 走这一步之后尾部前移一节，新尾部是倒数第二节；吃到食物时尾部不动
+            eats = neighbor == state.food
+            occupied[neighbor] = 1
+            occupied[tail] = eats
+            try:
+                count, reached = self.room(occupied, neighbor, tail if eats else body[-2], limit, now + share)
+            finally:
+                occupied[neighbor] = 0
+                occupied[tail] = 1
+            y, x = divmod(neighbor, self.width)
+            if reached:
+                # 能回到尾部时离尾部越远，蛇身越舒展
+                key = (1, 0, abs(tail_x - x) + abs(tail_y - y))
+            else:
+                # 空间一样大时选离食物近的，免得总朝同一个方向走进角落
+                key = (0, count, -abs(food_x - x) - abs(food_y - y))
+            if best_key is None or key > best_key:
+                best, best_key = DIRECTION_NAMES[code], key
+        return best
+
+
+class BitmapBoard:
+    """整块棋盘画在一张 PhotoImage 上，每步只改写变化的几个格子"""
+
+    def __init__(self, canvas, width, height, cell_size):
+        self.cell_size = cell_size
+        self.image = tk.PhotoImage(width=width * cell_size, height=height * cell_size)
+        self.item = canvas.create_image(0, 0, image=self.image, anchor="nw")
+
+    def paint(self, x, y, color):
+        size = self.cell_size
+        self.image.put(color, to=(x * size, y * size, (x + 1) * size, (y + 1) * size))
+
 
 class SnakeGame:
-    def __init__(self, root):
+    def __init__(self, root, width=WIDTH, height=HEIGHT, cell_size=None, bitmap=None):
         self.root = root
+        # 命令行指定的格子大小和绘制方式，未指定时随棋盘大小自动选择
+        self.fixed_cell_size = cell_size
+        self.force_bitmap = bitmap
+        self.set_board_size(width, height)
+        self.board = None
         self.root.title("Snake Game")
-        
+
         # 创建菜单栏
         self.menu = Menu(self.root)
         self.root.config(menu=self.menu)
-        
+
         # 添加文件菜单
         file_menu = Menu(self.menu, tearoff=0)
         self.menu.add_cascade(label="文件", menu=file_menu)
         file_menu.add_command(label="重新开始", command=self.restart_game)
         file_menu.add_separator()
+        file_menu.add_command(label="高分榜", command=self.show_scoreboard)
+        file_menu.add_command(label="打开录像...", command=self.open_replay)
+        file_menu.add_command(label="保存录像...", command=self.save_replay)
+        file_menu.add_separator()
         file_menu.add_command(label="退出", command=self.root.quit)
-        
+
         # 添加游戏菜单
         game_menu = Menu(self.menu, tearoff=0)
         self.menu.add_cascade(label="游戏", menu=game_menu)
         game_menu.add_command(label="暂停", command=self.toggle_pause)
+        game_menu.add_command(label="显示/隐藏计时信息", command=self.toggle_overlay)
+        game_menu.add_command(label="自动驾驶", command=self.toggle_autopilot)
+        speed_menu = Menu(game_menu, tearoff=0)
+        game_menu.add_cascade(label="速度", menu=speed_menu)
+        for level in SPEED_LEVELS:
+            speed_menu.add_command(label=f"{level} 级", command=lambda level=level: self.set_speed(level))
 
-        self.canvas = tk.Canvas(root, width=WIDTH * CELL_SIZE, height=HEIGHT * CELL_SIZE, bg="black")
+        self.canvas = tk.Canvas(root, width=self.width * self.cell_size, height=self.height * self.cell_size,
+                                bg=BACKGROUND_COLOR, highlightthickness=0)
         self.canvas.pack()
-        self.game_over = False
+        # 画布上长期保留的图形：蛇身每节一个矩形（头在前），食物、分数各一个
+        self.segment_items = deque()
+        self.food_item = None
+        self.score_item = None
+        self.pause_item = None
+        # 上次绘制之后每一步新进入的蛇头格子和移出的尾部格子（变长时为 None），一帧内可能追赶了多步
+        self.pending_heads = []
+        self.drawn_food = None
+        self.drawn_score = None
         self.paused = False  # 新增属性：暂停状态
-        self.score = 0
-        self.snake = [[0, 0], [0, 1], [0, 2], [0, 3], [0, 4]]
-        self.food = [random.randint(1, WIDTH - 1), random.randint(1, HEIGHT - 1)]
-        self.dir = "right"
+
+        # 当前这局的录像；回放时 player 不为 None，state 是它正在模拟的那一局
+        self.scoreboard = None
+        try:
+            self.scoreboard = Scoreboard(os.path.join(application_path(), 'snake_scores.db'))
+        except sqlite3.Error as e:
+            messagebox.showerror("高分榜", f"无法打开高分榜: {e}")
+        self.player = None
+        self.playback_rate = 1
+        # 打开自动驾驶时不为 None，每步代替方向键选择方向
+        self.autopilot = None
+        self.new_game()
+
+        # 固定步长的主循环：只允许存在一个 after 回调
+        self.speed = DEFAULT_SPEED
+        self.loop_id = None
+        self.last_frame = 0.0
+        self.accumulator = 0.0
+        self.next_tick = 0.0
+        # 最近若干步逻辑相对理想时刻的偏差、最近若干帧的绘制耗时（毫秒）
+        self.jitter = deque(maxlen=100)
+        self.frame_times = deque(maxlen=100)
+        self.pilot_times = deque(maxlen=100)
+        self.overlay_item = None
+        self.show_overlay = False
+        self.last_overlay = 0.0
+
         self.root.bind("<KeyPress>", self.handle_key_press)
-        self.update()
+        self.start_loop()
 
-    def draw(self):
+    @property
+    def game_over(self):
+        return self.state.game_over
+
+    @property
+    def score(self):
+        return self.state.score
+
+    def set_board_size(self, width, height):
+        self.width = width
+        self.height = height
+        self.cell_size = self.fixed_cell_size or max(1, min(CELL_SIZE, MAX_BOARD_PIXELS // max(width, height)))
+        # 默认只在大棋盘上使用图片绘制
+        self.use_bitmap = width * height > BITMAP_CELLS if self.force_bitmap is None else self.force_bitmap
+
+    def new_game(self):
+        self.state = SnakeState(self.width, self.height)
+        self.replay = Replay(self.width, self.height, self.state.seed)
+        self.recorded_dir = self.state.dir
+        self.replay_saved = False
+        if self.autopilot is not None:
+            self.autopilot.reset()
+
+    def cell_coords(self, cell):
+        x, y = self.state.unpack(cell)
+        size = self.cell_size
+        return x * size, y * size, (x + 1) * size, (y + 1) * size
+
+    def reset_canvas(self):
+        """清空画布，下一次 draw 重新创建全部图形"""
         self.canvas.delete("all")
-        for segment in self.snake:
-            x, y = segment
-            self.canvas.create_rectangle(
-                x * CELL_SIZE, y * CELL_SIZE,
-                (x + 1) * CELL_SIZE, (y + 1) * CELL_SIZE,
-                fill=SNAKE_COLOR
-            )
-        fx, fy = self.food
-        self.canvas.create_rectangle(
-            fx * CELL_SIZE, fy * CELL_SIZE,
-            (fx + 1) * CELL_SIZE, (fy + 1) * CELL_SIZE,
-            fill=FOOD_COLOR
-        )
+        self.board = None
+        self.segment_items.clear()
+        self.food_item = None
+        self.score_item = None
+        self.pause_item = None
+        self.overlay_item = None
+        self.pending_heads = []
+        self.drawn_food = None
+        self.drawn_score = None
+
+    def draw(self):
+        """增量绘制：每步只把尾部矩形移到新蛇头（变长时新建一个），食物和分数有变化才更新"""
+        state = self.state
+        if self.use_bitmap:
+            self.draw_bitmap()
+        elif self.score_item is None:
+            for cell in state.body:
+                self.segment_items.append(
+                    self.canvas.create_rectangle(*self.cell_coords(cell), fill=SNAKE_COLOR)
+                )
+            self.food_item = self.canvas.create_rectangle(0, 0, 0, 0, fill=FOOD_COLOR, state="hidden")
+            self.show_score()
+        else:
+            for head, tail in self.pending_heads:
+                if tail is None:
+                    item = self.canvas.create_rectangle(*self.cell_coords(head), fill=SNAKE_COLOR)
+                    # 新图形在最上层，分数要保持在蛇身上方
+                    self.canvas.tag_raise(self.score_item)
+                else:
+                    item = self.segment_items.pop()
+                    self.canvas.coords(item, *self.cell_coords(head))
+                self.segment_items.appendleft(item)
+        self.pending_heads = []
+
+        if state.food != self.drawn_food and not self.use_bitmap:
+            if state.food is None:
+                self.canvas.itemconfigure(self.food_item, state="hidden")
+            else:
+                self.canvas.coords(self.food_item, *self.cell_coords(state.food))
+                self.canvas.itemconfigure(self.food_item, state="normal")
+            self.drawn_food = state.food
         self.show_score()
 
+    def draw_bitmap(self):
+        """图片模式：新蛇头涂成蛇身颜色，移出的尾部涂回背景色，食物换位置时涂新格子"""
+        state = self.state
+        if self.board is None:
+            self.board = BitmapBoard(self.canvas, self.width, self.height, self.cell_size)
+            for cell in state.body:
+                self.board.paint(*state.unpack(cell), SNAKE_COLOR)
+            self.drawn_food = None
+            self.show_score()
+        else:
+            for head, tail in self.pending_heads:
+                if tail is not None:
+                    self.board.paint(*state.unpack(tail), BACKGROUND_COLOR)
+                self.board.paint(*state.unpack(head), SNAKE_COLOR)
+        self.pending_heads = []
+        if state.food != self.drawn_food:
+            # 旧食物所在的格子已被蛇头吃掉并涂成蛇身
+            if state.food is not None:
+                self.board.paint(*state.unpack(state.food), FOOD_COLOR)
+            self.drawn_food = state.food
+
     def show_score(self):
-        self.canvas.create_text(
-            WIDTH * CELL_SIZE // 2, 10,
-            text=f"Score: {self.score}",
-            fill="white",
-            font=("Arial", 16)
-        )
+        if self.score_item is None:
+            self.score_item = self.canvas.create_text(
+                self.width * self.cell_size // 2, 10,
+                text=f"Score: {self.score}",
+                fill="white",
+                font=("Arial", 16)
+            )
+            self.drawn_score = self.score
+        elif self.score != self.drawn_score:
+            self.canvas.itemconfigure(self.score_item, text=f"Score: {self.score}")
+            self.drawn_score = self.score
 
     def handle_key_press(self, event):
         key = event.keysym
-        if key == "Up" and self.dir != "down":
-            self.dir = "up"
-        elif key == "Down" and self.dir != "up":
-            self.dir = "down"
-        elif key == "Left" and self.dir != "right":
-            self.dir = "left"
-        elif key == "Right" and self.dir != "left":
-            self.dir = "right"
+        if self.player is not None and key in ("Up", "Down", "Left", "Right", "Home", "Escape"):
+            self.handle_playback_key(key)
+        elif key in ("Up", "Down", "Left", "Right"):
+            if self.autopilot is not None:
+                # 手动操作时交还控制权
+                self.toggle_autopilot()
+            self.state.turn(key.lower())
         elif key == "F1":  # 按 'F1' 键重新开始游戏
             self.restart_game()
         elif key == "F2":  # 按 'F2' 键暂停或恢复游戏
             self.toggle_pause()
+        elif key == "F3":  # 按 'F3' 键显示计时信息
+            self.toggle_overlay()
+        elif key == "F4":  # 按 'F4' 键打开或关闭自动驾驶
+            self.toggle_autopilot()
+        elif key in ("plus", "equal", "KP_Add"):
+            self.set_speed(self.speed + 1)
+        elif key in ("minus", "KP_Subtract"):
+            self.set_speed(self.speed - 1)
+        elif key.isdigit() and int(key) in SPEED_LEVELS:
+            self.set_speed(int(key))
+
+    def handle_playback_key(self, key):
+        """回放时：左右方向键前后跳转，上下方向键改变倍速，Home 回到开头，Esc 结束回放"""
+        if key == "Left":
+            self.seek(self.state.ticks - SEEK_STEPS)
+        elif key == "Right":
+            self.seek(self.state.ticks + SEEK_STEPS)
+        elif key == "Home":
+            self.seek(0)
+        elif key == "Escape":
+            self.restart_game()
+        else:
+            index = PLAYBACK_RATES.index(self.playback_rate) + (1 if key == "Up" else -1)
+            if 0 <= index < len(PLAYBACK_RATES):
+                self.playback_rate = PLAYBACK_RATES[index]
+                self.reset_clock()
+                self.show_title()
+
+    def show_title(self):
+        if self.player is not None:
+            self.root.title(f"Snake Game - 回放 {self.playback_rate}x")
+        elif self.autopilot is not None:
+            self.root.title("Snake Game - 自动驾驶")
+        else:
+            self.root.title("Snake Game")
+
+    def toggle_autopilot(self):
+        if self.player is not None:
+            return
+        if self.autopilot is None:
+            self.autopilot = Autopilot(self.width, self.height)
+        else:
+            self.autopilot = None
+        self.show_title()
+
+    def set_speed(self, level):
+        if level in SPEED_LEVELS:
+            self.speed = level
+            # 从现在起按新间隔计时，不补跑旧间隔下积累的时间
+            self.accumulator = 0.0
+            self.next_tick = time.perf_counter() + SPEED_LEVELS[level]
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        if not self.show_overlay and self.overlay_item is not None:
+            self.canvas.delete(self.overlay_item)
+            self.overlay_item = None
 
     def toggle_pause(self):
         self.paused = not self.paused
-        if self.paused:
-            self.canvas.create_text(
-                WIDTH * CELL_SIZE // 2, HEIGHT * CELL_SIZE // 2,
+        self.show_paused()
+        # 暂停期间的时间不计入下一步
+        self.reset_clock()
+
+    def show_paused(self):
+        if self.paused and self.pause_item is None:
+            self.pause_item = self.canvas.create_text(
+                self.width * self.cell_size // 2, self.height * self.cell_size // 2,
                 text="Paused",
                 fill="white",
                 font=("Arial", 24)
             )
-        else:
-            self.canvas.delete("all")
-            self.draw()
+        elif not self.paused and self.pause_item is not None:
+            self.canvas.delete(self.pause_item)
+            self.pause_item = None
 
     def restart_game(self):
-        self.game_over = False
         self.paused = False
-        self.score = 0
-        self.snake = [[0, 0], [0, 1], [0, 2], [0, 3], [0, 4]]
-        self.food = [random.randint(1, WIDTH - 1), random.randint(1, HEIGHT - 1)]
-        self.dir = "right"
-        self.canvas.delete("all")
+        self.player = None
+        self.show_title()
+        self.new_game()
+        self.reset_canvas()
         self.draw()
-        self.update()
+        self.start_loop()
+
+    def play_replay(self, replay):
+        """开始回放一局录像，棋盘大小跟随录像"""
+        self.paused = False
+        self.player = ReplayPlayer(replay)
+        self.playback_rate = 1
+        self.autopilot = None
+        self.show_title()
+        if (replay.width, replay.height) != (self.width, self.height):
+            self.set_board_size(replay.width, replay.height)
+            self.canvas.configure(width=self.width * self.cell_size, height=self.height * self.cell_size)
+        self.seek(0)
+
+    def seek(self, tick):
+        """跳到回放的第 tick 步：不绘制中间的步，到达后整体重绘一次"""
+        self.player.seek(max(0, tick))
+        self.state = self.player.state
+        self.reset_canvas()
+        self.draw()
+        self.show_paused()
+        self.start_loop()
 
     def move(self):
         if not self.game_over and not self.paused:
-            head = self.snake[0].copy()
-            if self.dir == "up":
-                head[1] -= 1
-            elif self.dir == "down":
-                head[1] += 1
-            elif self.dir == "left":
-                head[0] -= 1
-            elif self.dir == "right":
-                head[0] += 1
-
-            if head[0] == WIDTH or head[0] < 0 or head[1] == HEIGHT or head[1] < 0 or head in self.snake:
-                self.game_over = True
+            state = self.state
+            tail = state.body[-1]
+            if self.player is not None:
+                result = self.player.step()
             else:
-                self.snake.insert(0, head)
-                if head[0] == self.food[0] and head[1] == self.food[1]:
-                    self.food = None
-                    while self.food is None:
-                        self.food = [random.randint(1, WIDTH - 1), random.randint(1, HEIGHT - 1)]
-                    self.score += 1
-                else:
-                    self.snake.pop()
+                if self.autopilot is not None:
+                    started = time.perf_counter()
+                    state.turn(self.autopilot.choose(state))
+                    self.pilot_times.append((time.perf_counter() - started) * 1000)
+                if state.dir != self.recorded_dir:
+                    self.replay.record(state.ticks, DIRECTION_CODES[state.dir])
+                    self.recorded_dir = state.dir
+                result = state.step()
+            if result != DIED:
+                self.pending_heads.append((state.head, tail if result == MOVED else None))
+
+    def finish_game(self):
+        """一局结束：把录像存进高分榜，返回名次（没有高分榜时为 None）"""
+        self.replay.ticks = self.state.ticks
+        self.replay.score = self.state.score
+        if self.scoreboard is None or self.replay_saved:
+            return None
+        self.replay_saved = True
+        try:
+            self.scoreboard.add(self.replay)
+            return self.scoreboard.rank(self.replay.score, self.replay.ticks)
+        except sqlite3.Error as e:
+            messagebox.showerror("高分榜", f"无法保存成绩: {e}")
+            return None
+
+    def show_scoreboard(self):
+        if self.scoreboard is None:
+            messagebox.showinfo("高分榜", "高分榜不可用")
+            return
+        ScoreboardWindow(self.root, self.scoreboard, self.play_replay)
+
+    def open_replay(self):
+        path = filedialog.askopenfilename(filetypes=[("贪吃蛇录像", "*.snkr"), ("所有文件", "*.*")])
+        if not path:
+            return
+        try:
+            replay = Replay.load(path)
+        except (IOError, ValueError) as e:
+            messagebox.showerror("打开录像", f"无法打开录像: {e}")
+            return
+        self.play_replay(replay)
+
+    def save_replay(self):
+        if self.player is not None:
+            replay = self.player.replay
+        else:
+            replay = self.replay
+            replay.ticks = self.state.ticks
+            replay.score = self.state.score
+        path = filedialog.asksaveasfilename(defaultextension=".snkr", filetypes=[("贪吃蛇录像", "*.snkr")])
+        if not path:
+            return
+        try:
+            replay.save(path)
+        except IOError as e:
+            messagebox.showerror("保存录像", f"无法保存录像: {e}")
+
+    def reset_clock(self):
+        self.last_frame = time.perf_counter()
+        self.accumulator = 0.0
+        self.next_tick = self.last_frame + SPEED_LEVELS[self.speed]
+
+    def start_loop(self):
+        """启动主循环；已有循环时先取消，保证任何时候只有一个"""
+        if self.loop_id is not None:
+            self.root.after_cancel(self.loop_id)
+        self.reset_clock()
+        self.loop_id = self.root.after(FRAME_INTERVAL, self.update)
 
     def update(self):
-        if not self.game_over:
-            if not self.paused:
+        """主循环：按单调时钟累积经过的时间，每满一个步长推进一步逻辑，有变化时才绘制一次"""
+        self.loop_id = None
+        now = time.perf_counter()
+        tick = SPEED_LEVELS[self.speed]
+        catch_up = MAX_CATCH_UP
+        if self.player is not None:
+            # 快进就是缩短步长，一帧内推进很多步但只绘制一次
+            tick /= self.playback_rate
+            catch_up *= self.playback_rate
+        if self.paused:
+            self.last_frame = now
+        else:
+            self.accumulator += now - self.last_frame
+            self.last_frame = now
+            steps = 0
+            while self.accumulator >= tick and not self.game_over:
+                if self.player is not None and self.player.finished:
+                    break
+                if steps == catch_up:
+                    # 卡得太久，不再追赶，避免蛇突然连跳很多格
+                    self.accumulator = 0.0
+                    self.next_tick = now + tick
+                    break
+                self.jitter.append((now - self.next_tick) * 1000)
+                self.next_tick += tick
+                self.accumulator -= tick
                 self.move()
+                steps += 1
+            if steps:
+                started = time.perf_counter()
+                if len(self.pending_heads) > len(self.state.body):
+                    # 一帧内走过的步数比蛇身还长，整体重绘比逐步移动更快
+                    self.reset_canvas()
                 self.draw()
-            self.root.after(100, self.update)
+                self.frame_times.append((time.perf_counter() - started) * 1000)
+        if self.show_overlay and now - self.last_overlay >= 0.5:
+            self.last_overlay = now
+            self.draw_overlay()
+
+        if self.player is not None and self.player.finished:
+            self.canvas.create_text(
+                self.width * self.cell_size // 2, self.height * self.cell_size // 2,
+                text="回放结束",
+                fill="white",
+                font=("Arial", 24)
+            )
+        elif not self.game_over:
+            self.loop_id = self.root.after(FRAME_INTERVAL, self.update)
         else:
+            rank = self.finish_game()
             self.canvas.create_text(
-                WIDTH * CELL_SIZE // 2, HEIGHT * CELL_SIZE // 2,
-                text="Game Over",
+                self.width * self.cell_size // 2, self.height * self.cell_size // 2,
+                text="Game Over" if rank is None else f"Game Over\n第 {rank} 名",
                 fill="white",
                 font=("Arial", 24)
             )
 
-if __name__ == "__main__":
+    def draw_overlay(self):
+        """左上角显示速度、逻辑步的时间偏差、绘制耗时和自动驾驶每步的耗时"""
+        jitter = sorted(abs(value) for value in self.jitter)
+        frames = sorted(self.frame_times)
+        text = (f"speed {self.speed} ({SPEED_LEVELS[self.speed] * 1000:.0f} ms)\n"
+                f"jitter p50 {jitter[len(jitter) // 2] if jitter else 0:.1f} "
+                f"max {jitter[-1] if jitter else 0:.1f} ms\n"
+                f"frame p50 {frames[len(frames) // 2] if frames else 0:.2f} "
+                f"max {frames[-1] if frames else 0:.2f} ms")
+        if self.autopilot is not None and self.pilot_times:
+            pilot = sorted(self.pilot_times)
+            text += f"\npilot p50 {pilot[len(pilot) // 2]:.2f} max {pilot[-1]:.2f} ms"
+        if self.overlay_item is None:
+            self.overlay_item = self.canvas.create_text(
+                4, 24, text=text, fill="yellow", anchor="nw", font=("Arial", 9)
+            )
+        else:
+            self.canvas.itemconfigure(self.overlay_item, text=text)
+        self.canvas.tag_raise(self.overlay_item)
+
+
+class ScoreboardWindow:
+    """高分榜窗口，双击一行回放那一局"""
+
+    def __init__(self, root, scoreboard, on_play):
+        self.scoreboard = scoreboard
+        self.on_play = on_play
+        self.window = tk.Toplevel(root)
+        self.window.title("高分榜")
+        self.listbox = tk.Listbox(self.window, width=48, height=TOP_SCORES, font=("Courier", 11))
+        self.listbox.pack(fill="both", expand=True, padx=5, pady=5)
+        self.rows = scoreboard.top(TOP_SCORES)
+        for rank, (score_id, score, ticks, width, height, played_at) in enumerate(self.rows, 1):
+            self.listbox.insert(tk.END, f"{rank:>2}. {score:>4} 分 {ticks:>6} 步 {width}x{height}  {played_at}")
+        self.listbox.bind("<Double-Button-1>", self.play)
+
+    def play(self, event=None):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        replay = self.scoreboard.replay(self.rows[selection[0]][0])
+        self.window.destroy()
+        if replay is not None:
+            self.on_play(replay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="贪吃蛇")
+    parser.add_argument('--width', type=int, default=WIDTH, help="棋盘宽度（格）")
+    parser.add_argument('--height', type=int, default=HEIGHT, help="棋盘高度（格）")
+    parser.add_argument('--cell', type=int, default=None, help="格子边长（像素），默认按棋盘大小自动选择")
+    parser.add_argument('--bitmap', action='store_true', default=None, help="小棋盘也用图片绘制")
+    parser.add_argument('--replay', help="启动后回放这个录像文件")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    game = SnakeGame(root)
-    root.mainloop()
\ No newline at end of file
+    game = SnakeGame(root, args.width, args.height, args.cell, args.bitmap)
+    if args.replay:
+        game.play_replay(Replay.load(args.replay))
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
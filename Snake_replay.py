@@ -0,0 +1,153 @@
+"""贪吃蛇的录像格式和高分榜
+
+录像只保存重放一局所需的最少信息：棋盘大小、随机数种子，以及每次转向发生在第几步。
+食物位置由种子决定，按同样的转向重新模拟就能得到完全相同的一局。
+
+二进制格式（小端）：
+    头部   b'SNKR'、版本(1 字节)、宽(2 字节)、高(2 字节)、种子(8 字节)
+    变长整数 总步数、分数、转向次数
+    每次转向一个变长整数 (与上次转向的步数差 << 2) | 方向编号
+
+方向编号就是 Snake.DIRECTIONS 中的顺序。常见的一局几百次转向，录像只有几百字节。
+
+高分榜是 SQLite 表，每局一行并带上录像，(score DESC, ticks) 上的索引让前 N 名查询
+只读取 N 行索引。
+"""
+import sqlite3
+import struct
+from datetime import datetime
+
+MAGIC = b'SNKR'
+VERSION = 1
+HEADER = struct.Struct('<4sBHHQ')
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, position):
+    """返回 (值, 下一个字节的位置)"""
+    value = shift = 0
+    while True:
+        if position >= len(data):
+            raise ValueError("录像数据不完整")
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+class Replay:
+    """一局的录像：events 是按步数排列的 (步数, 方向编号)，表示第几步之前转向"""
+
+    def __init__(self, width, height, seed, events=None, ticks=0, score=0):
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.events = events if events is not None else []
+        self.ticks = ticks
+        self.score = score
+
+    def record(self, tick, code):
+        self.events.append((tick, code))
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.width, self.height, self.seed))
+        write_varint(out, self.ticks)
+        write_varint(out, self.score)
+        write_varint(out, len(self.events))
+        last = 0
+        for tick, code in self.events:
+            write_varint(out, (tick - last) << 2 | code)
+            last = tick
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ValueError("录像数据不完整")
+        magic, version, width, height, seed = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("不是可识别的录像文件")
+        position = HEADER.size
+        ticks, position = read_varint(data, position)
+        score, position = read_varint(data, position)
+        count, position = read_varint(data, position)
+        events = []
+        tick = 0
+        for _ in range(count):
+            value, position = read_varint(data, position)
+            tick += value >> 2
+            events.append((tick, value & 3))
+        return cls(width, height, seed, events, ticks, score)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class Scoreboard:
+    """持久化的高分榜，每局一行并保存录像"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS scores (
+        id INTEGER PRIMARY KEY,
+        score INTEGER NOT NULL,
+        ticks INTEGER NOT NULL,
+        width INTEGER NOT NULL,
+        height INTEGER NOT NULL,
+        played_at TEXT NOT NULL,
+        replay BLOB NOT NULL
+    )
+    """
+    # 同分时步数少的排前面
+    INDEX = "CREATE INDEX IF NOT EXISTS scores_rank ON scores (score DESC, ticks)"
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        with self.conn:
+            self.conn.execute(self.SCHEMA)
+            self.conn.execute(self.INDEX)
+
+    def add(self, replay, played_at=None):
+        """保存一局，返回它的编号"""
+        played_at = played_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO scores (score, ticks, width, height, played_at, replay) VALUES (?, ?, ?, ?, ?, ?)",
+                (replay.score, replay.ticks, replay.width, replay.height, played_at, replay.to_bytes())
+            )
+        return cursor.lastrowid
+
+    def top(self, n=10):
+        """前 n 名的 (编号, 分数, 步数, 宽, 高, 时间)，不读取录像"""
+        return self.conn.execute(
+            "SELECT id, score, ticks, width, height, played_at FROM scores "
+            "ORDER BY score DESC, ticks LIMIT ?", (n,)
+        ).fetchall()
+
+    def rank(self, score, ticks):
+        """这个成绩排第几名（从 1 开始）"""
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM scores WHERE score > ? OR (score = ? AND ticks < ?)",
+            (score, score, ticks)
+        ).fetchone()
+        return row[0] + 1
+
+    def replay(self, score_id):
+        row = self.conn.execute("SELECT replay FROM scores WHERE id = ?", (score_id,)).fetchone()
+        return Replay.from_bytes(row[0]) if row else None
+
+    def close(self):
+        self.conn.close()
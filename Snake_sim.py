@@ -0,0 +1,223 @@
+"""无界面的批量贪吃蛇模拟，用于大规模评估自动驾驶策略
+
+规则与 Snake.py 的 SnakeState 相同（初始蛇身、不能掉头、撞到当前尾部也算死亡、
+食物在空格子中均匀随机），但成千上万局游戏以 NumPy 数组同步推进：
+
+- 每局一行 enter 数组，记录每个格子最近一次被蛇头进入时该局的步数。
+  蛇身就是最近 length 步进入的格子，碰撞检测是一次比较，变长只需 length + 1。
+- 食物先做几轮批量拒绝采样，剩下的（棋盘快满时）逐局从空格子中精确抽取。
+- 随机数用 numpy Generator，给定 seed、局数和策略结果可复现；多进程时按
+  SeedSequence.spawn 为每块分配独立的随机流。
+
+    python Snake_sim.py --games 100000 --policy greedy --processes 8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Snake import WIDTH, HEIGHT, DIRECTIONS, START_SNAKE
+
+# 方向编号与 Snake.DIRECTIONS 的顺序一致：上、下、左、右；相反方向是编号 ^ 1
+DIRECTION_NAMES = list(DIRECTIONS)
+DX = np.array([DIRECTIONS[name][0] for name in DIRECTION_NAMES], dtype=np.int64)
+DY = np.array([DIRECTIONS[name][1] for name in DIRECTION_NAMES], dtype=np.int64)
+START_DIRECTION = DIRECTION_NAMES.index("right")
+# 从未被进入过的格子
+NEVER = np.iinfo(np.int64).min // 2
+# 批量拒绝采样的轮数，之后逐局精确抽取
+FOOD_SAMPLE_ROUNDS = 8
+
+
+class BatchSnake:
+    """同步推进的 n 局游戏"""
+
+    def __init__(self, n, width=WIDTH, height=HEIGHT, seed=None):
+        self.n = n
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.rng = np.random.default_rng(seed)
+        self.games = np.arange(n)
+
+        self.enter = np.full((n, self.size), NEVER, dtype=np.int64)
+        for age, (x, y) in enumerate(START_SNAKE):
+            self.enter[:, y * width + x] = -age
+        head_x, head_y = START_SNAKE[0]
+        self.head_x = np.full(n, head_x, dtype=np.int64)
+        self.head_y = np.full(n, head_y, dtype=np.int64)
+        self.direction = np.full(n, START_DIRECTION, dtype=np.int64)
+        self.length = np.full(n, len(START_SNAKE), dtype=np.int64)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.last_food_step = np.zeros(n, dtype=np.int64)
+        self.alive = np.ones(n, dtype=bool)
+        self.won = np.zeros(n, dtype=bool)
+        self.food = np.zeros(n, dtype=np.int64)
+        self.place_food(self.games)
+
+    def occupied(self, games, cells):
+        """games 这几局中 cells 格子是否被蛇身占用（含尾部）"""
+        return self.enter[games, cells] > self.steps[games] - self.length[games]
+
+    def place_food(self, games):
+        """为 games 这几局在空格子中均匀随机放置食物"""
+        pending = games
+        for _ in range(FOOD_SAMPLE_ROUNDS):
+            if not len(pending):
+                return
+            cells = self.rng.integers(0, self.size, len(pending))
+            ok = ~self.occupied(pending, cells)
+            self.food[pending[ok]] = cells[ok]
+            pending = pending[~ok]
+        for game in pending:
+            free = np.flatnonzero(self.enter[game] <= self.steps[game] - self.length[game])
+            self.food[game] = free[self.rng.integers(len(free))]
+
+    def step(self, actions):
+        """每局按 actions 中的方向编号前进一格（掉头无效），已结束的局不动"""
+        games = self.games[self.alive]
+        if not len(games):
+            return
+        wanted = actions[games]
+        current = self.direction[games]
+        direction = np.where(wanted ^ 1 == current, current, wanted)
+        self.direction[games] = direction
+
+        x = self.head_x[games] + DX[direction]
+        y = self.head_y[games] + DY[direction]
+        outside = (x < 0) | (x >= self.width) | (y < 0) | (y >= self.height)
+        cells = np.clip(y, 0, self.height - 1) * self.width + np.clip(x, 0, self.width - 1)
+        dead = outside | self.occupied(games, cells)
+        self.alive[games[dead]] = False
+
+        moving = games[~dead]
+        cells = cells[~dead]
+        self.steps[moving] += 1
+        self.enter[moving, cells] = self.steps[moving]
+        self.head_x[moving] = x[~dead]
+        self.head_y[moving] = y[~dead]
+
+        eating = cells == self.food[moving]
+        eaters = moving[eating]
+        self.length[eaters] += 1
+        self.score[eaters] += 1
+        self.last_food_step[eaters] = self.steps[eaters]
+        full = self.length[eaters] == self.size
+        self.won[eaters[full]] = True
+        self.alive[eaters[full]] = False
+        self.place_food(eaters[~full])
+
+    def head_cells(self):
+        return self.head_y * self.width + self.head_x
+
+
+def random_policy(sim):
+    """随机方向（掉头会被忽略）"""
+    return sim.rng.integers(0, 4, sim.n)
+
+
+def greedy_policy(sim):
+    """朝食物方向走，避开下一步就会撞上的方向；无路可走时保持原方向"""
+    food_x = sim.food % sim.width
+    food_y = sim.food // sim.width
+    scores = np.empty((sim.n, 4), dtype=np.int64)
+    for code in range(4):
+        x = sim.head_x + DX[code]
+        y = sim.head_y + DY[code]
+        outside = (x < 0) | (x >= sim.width) | (y < 0) | (y >= sim.height)
+        cells = np.clip(y, 0, sim.height - 1) * sim.width + np.clip(x, 0, sim.width - 1)
+        blocked = outside | sim.occupied(sim.games, cells) | (code ^ 1 == sim.direction)
+        distance = np.abs(food_x - x) + np.abs(food_y - y)
+        scores[:, code] = np.where(blocked, np.iinfo(np.int64).max, distance)
+    return scores.argmin(axis=1)
+
+
+POLICIES = {'random': random_policy, 'greedy': greedy_policy}
+
+
+def run_batch(n, width=WIDTH, height=HEIGHT, policy='greedy', seed=None, max_steps=None, starve_steps=None):
+    """跑完 n 局，返回每局的分数、步数和是否占满棋盘
+
+    max_steps 限制总步数；starve_steps（默认为格子数的两倍）步内没吃到食物的局视为结束，
+    避免策略绕圈时永远停不下来。
+    """
+    sim = BatchSnake(n, width, height, seed)
+    choose = POLICIES[policy] if isinstance(policy, str) else policy
+    starve_steps = starve_steps or 2 * sim.size
+    while sim.alive.any():
+        sim.step(choose(sim))
+        sim.alive &= sim.steps - sim.last_food_step < starve_steps
+        if max_steps is not None and sim.steps.max() >= max_steps:
+            break
+    return {'score': sim.score, 'steps': sim.steps, 'won': sim.won}
+
+
+def _run_chunk(args):
+    n, width, height, policy, seed_sequence = args
+    return run_batch(n, width, height, policy, seed_sequence)
+
+
+def evaluate(games, width=WIDTH, height=HEIGHT, policy='greedy', seed=0, processes=None, chunk_size=4096):
+    """把 games 局分块交给进程池，汇总分数分布；相同参数结果相同，与进程数无关"""
+    if games < 1:
+        raise ValueError(f"games 至少为 1，实际为 {games}")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size 至少为 1，实际为 {chunk_size}")
+    chunks = [min(chunk_size, games - start) for start in range(0, games, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(n, width, height, policy, child) for n, child in zip(chunks, seeds)]
+
+    started = time.perf_counter()
+    if processes == 1 or len(tasks) == 1:
+        results = [_run_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(processes or os.cpu_count()) as pool:
+            results = list(pool.map(_run_chunk, tasks))
+    elapsed = time.perf_counter() - started
+
+    score = np.concatenate([result['score'] for result in results])
+    steps = np.concatenate([result['steps'] for result in results])
+    won = np.concatenate([result['won'] for result in results])
+    return {
+        'games': games,
+        'board': [width, height],
+        'policy': policy,
+        'seed': seed,
+        'mean_score': float(score.mean()),
+        'score_percentiles': {str(q): float(np.percentile(score, q)) for q in (50, 90, 99)},
+        'max_score': int(score.max()),
+        'win_rate': float(won.mean()),
+        'total_steps': int(steps.sum()),
+        'seconds': round(elapsed, 3),
+        'steps_per_second': round(steps.sum() / elapsed) if elapsed else None,
+    }
+
+
+def positive_int(text):
+    """argparse 的类型：局数等计数至少为 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"至少为 1，实际为 {value}")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量贪吃蛇模拟")
+    parser.add_argument('--games', type=positive_int, default=10000)
+    parser.add_argument('--width', type=int, default=WIDTH)
+    parser.add_argument('--height', type=int, default=HEIGHT)
+    parser.add_argument('--policy', choices=list(POLICIES), default='greedy')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=positive_int, default=None, help="默认使用全部 CPU 核心")
+    parser.add_argument('--chunk-size', type=positive_int, default=4096, help="每个进程任务的局数")
+    args = parser.parse_args()
+    report = evaluate(args.games, args.width, args.height, args.policy, args.seed, args.processes, args.chunk_size)
+    for key, value in report.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
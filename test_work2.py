@@ -0,0 +1,66 @@
+"""Deleting a todo in TodoApp must leave the neighbour that gets selected intact"""
+import os
+import sqlite3
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+QtWidgets = pytest.importorskip('PySide2.QtWidgets')
+
+import work2
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    # todos.db lives next to the script; point it at a temporary directory
+    monkeypatch.setattr(work2, '__file__', str(tmp_path / 'work2.py'))
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    window = work2.TodoApp()
+    yield window
+    window.close()
+    app.processEvents()
+
+
+def test_delete_keeps_completed_neighbour(window, tmp_path):
+    first = {'text': 'first', 'completed': False, 'notes': ''}
+    second = {'text': 'second', 'completed': True, 'notes': 'second notes'}
+    for todo_id, todo in (('1', first), ('2', second)):
+        window.todo_model.add(todo_id, todo)
+        window.persist('save', todo_id, todo)
+    window.todo_list.setCurrentIndex(window.proxy_model.index(0, 0))
+
+    window.delete_selected_todo()
+
+    assert window.selected_todo_id() == '2'
+    assert window.status_checkbox.isChecked()
+    assert window.notes_area.toPlainText() == 'second notes'
+    assert window.todos['2']['completed']
+    stored = work2.TodoStore(str(tmp_path / 'todos.db')).load()
+    assert list(stored) == ['2'] and stored['2']['completed']
+    assert work2.TodoStore(str(tmp_path / 'todos.db')).load_notes('2') == 'second notes'
+
+
+def test_unreadable_notes_show_a_message(window, monkeypatch):
+    todo = {'text': 'first', 'completed': False, 'notes': 'kept on disk'}
+    window.todo_model.add('1', todo)
+    window.persist('save', '1', todo)
+    del todo['notes']
+    errors = []
+
+    class MessageBox:
+        @staticmethod
+        def critical(parent, title, text):
+            errors.append(text)
+
+    monkeypatch.setattr(work2, 'QMessageBox', MessageBox)
+
+    def fail(todo_id):
+        raise sqlite3.OperationalError("Could not decode to UTF-8")
+
+    monkeypatch.setattr(window.store, 'load_notes', fail)
+    window.todo_list.setCurrentIndex(window.proxy_model.index(0, 0))
+
+    assert len(errors) == 1
+    assert window.notes_area.toPlainText() == ''
+    # Nothing was cached, so opening the todo again retries the read
+    assert 'notes' not in window.todos['1']
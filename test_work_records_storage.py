@@ -0,0 +1,169 @@
+"""两个实例共享同一份数据时的备注合并
+
+Instance 使用 WorkRecordApp 同一个 SyncedRecords，只是不创建界面：
+备注框换成一个字符串，写入线程送来的事件由 pump 在测试线程中处理。
+"""
+import threading
+import time
+
+import pytest
+
+from work_records_index import INDEX_TYPES
+from work_records_storage import FileLock, JournalStore, SQLiteStore, SyncedRecords, merge_text
+
+DATE = '2024-11-01'
+
+
+class Instance:
+    def __init__(self, store, get_notes=None, set_notes=None):
+        self.notes = ''
+        with FileLock(store.lock_path):
+            data, indexes = store.load()
+        self.records = SyncedRecords(store, data, indexes, DATE,
+                                     get_notes=get_notes or (lambda: self.notes),
+                                     set_notes=set_notes or self.set_notes,
+                                     interval=0.01, sync_interval=0.01)
+
+    def set_notes(self, notes):
+        self.notes = notes
+
+    def type_notes(self, notes):
+        self.notes = notes
+        self.records.record_change({'op': 'notes', 'date': DATE, 'notes': notes})
+
+    def pump(self, timeout=2.0):
+        """处理写入线程的事件，直到本实例的变更全部写入"""
+        deadline = time.monotonic() + timeout
+        while True:
+            self.records.process_events()
+            if not self.records.unsaved and self.records.events.empty():
+                return
+            if time.monotonic() > deadline:
+                raise AssertionError("变更没有在限定时间内写入")
+            time.sleep(0.005)
+
+    def sync(self):
+        """等一个同步周期，读入对方写入的变更"""
+        time.sleep(0.05)
+        self.pump()
+
+    def close(self):
+        return self.records.close()
+
+
+@pytest.fixture(params=['journal', 'sqlite'])
+def make_store(request, tmp_path):
+    if request.param == 'journal':
+        return lambda: JournalStore(str(tmp_path / 'work_records.json'), INDEX_TYPES)
+    return lambda: SQLiteStore(str(tmp_path / 'work_records.db'), INDEX_TYPES)
+
+
+def test_merge_text_by_position():
+    assert merge_text('', 'a\nb', 'a\nb\nc') == 'a\nb\nc'
+    assert merge_text('x\ny', 'x\ny\nz', 'w\nx\ny') == 'w\nx\ny\nz'
+    # 对方删掉第二个空行，我方在末尾追加：删的是那一行，而不是第一个相同的行
+    assert merge_text('a\n\nb\n\nc', 'a\n\nb\n\nc\nd', 'a\n\nb\nc') == 'a\n\nb\nc\nd'
+    assert merge_text('a\nb\nc', 'a\nB\nc', 'a\nb\nC') == 'a\nB\nC'
+    assert merge_text('a\nb', 'a\nb\nx', 'a\nb\nx\ny') == 'a\nb\nx\ny'
+
+
+def test_two_instances_merge_notes(make_store):
+    first = Instance(make_store())
+    second = Instance(make_store())
+    try:
+        first.type_notes('a\nb')
+        first.pump()
+        second.sync()
+        assert second.notes == 'a\nb'
+
+        second.type_notes('a\nb\nc')
+        second.pump()
+        first.sync()
+        # 合并起点随本实例的写入前移，对方追加的行不会被挪到开头
+        assert first.notes == 'a\nb\nc'
+
+        # 两边同时修改不同的行
+        first.type_notes('A\nb\nc')
+        second.type_notes('a\nb\nc\nd')
+        first.pump()
+        second.pump()
+        for _ in range(3):
+            first.sync()
+            second.sync()
+        assert first.notes == second.notes == 'A\nb\nc\nd'
+    finally:
+        first.close()
+        second.close()
+
+    reopened = make_store()
+    with FileLock(reopened.lock_path):
+        data, _ = reopened.load()
+    assert data[DATE].notes == 'A\nb\nc\nd'
+
+
+def test_sqlite_close_with_pending_batch_does_not_touch_ui(tmp_path):
+    path = str(tmp_path / 'work_records.db')
+    main = threading.current_thread()
+    # 界面只能在主线程使用：其他线程调用时像 Tk 一样等主线程，而主线程正在 close 里等写入线程
+    foreign_calls = []
+
+    def ui(result=None):
+        if threading.current_thread() is not main:
+            foreign_calls.append(threading.current_thread().name)
+            time.sleep(5)
+        return result
+
+    other = Instance(SQLiteStore(path))
+    other.pump()
+    instance = Instance(SQLiteStore(path), get_notes=lambda: ui(''), set_notes=ui)
+    instance.pump()
+    # 关闭时既有待写的一批变更，又有其他实例的变更要读入
+    other.type_notes('remote')
+    other.pump()
+    other.close()
+    instance.records.record_change({'op': 'notes', 'date': DATE, 'notes': 'local'})
+
+    started = time.monotonic()
+    assert instance.close()
+    assert time.monotonic() - started < 2
+    assert foreign_calls == []
+
+    reopened = SQLiteStore(path)
+    with FileLock(reopened.lock_path):
+        data, _ = reopened.load()
+    assert data[DATE].notes == 'local'
+
+
+def test_search_index_restores_on_first_query(make_store):
+    store = make_store()
+    task = {'text': 'weekly report', 'status': False, 'created_at': '2024-11-01 09:00:00'}
+    with FileLock(store.lock_path):
+        store.append([{'op': 'day', 'date': DATE, 'record': {'tasks': [task], 'notes': 'draft report'}}])
+        store.compact(*store.load())
+
+    reopened = make_store()
+    with FileLock(reopened.lock_path):
+        data, indexes = reopened.load()
+    search = indexes['search']
+    assert search.doc_terms == {}
+    # 恢复之前到来的变更在恢复后补上
+    change = {'op': 'notes', 'date': DATE, 'notes': 'final review'}
+    search.observe(change)
+    assert [hit.kind for hit in search.search('report')] == ['task']
+    assert [hit.kind for hit in search.search('review')] == ['notes']
+
+
+def test_sqlite_day_merge_appends_after_duplicate_tasks(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'work_records.db'))
+    task = {'text': 'report', 'status': False, 'created_at': '2024-11-01 09:00:00'}
+    store.append([
+        {'op': 'day', 'date': DATE, 'record': {'tasks': [], 'notes': ''}},
+        {'op': 'add', 'date': DATE, 'task': task},
+        {'op': 'add', 'date': DATE, 'task': task},
+    ])
+    other = {'text': 'review', 'status': False, 'created_at': '2024-11-01 10:00:00'}
+    store.append([{'op': 'day', 'date': DATE, 'record': {'tasks': [task, other], 'notes': ''}}])
+    positions = [row[0] for row in store.connection.execute(
+        "SELECT position FROM tasks WHERE date = ? ORDER BY position", (DATE,))]
+    assert positions == [0, 1, 2]
+    assert [t.text for t in store.load_day(DATE).tasks] == ['report', 'report', 'review']
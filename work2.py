@@ -1,13 +1,185 @@
 import sys
 import json
 import os
+import sqlite3
 from datetime import datetime
-from PySide2.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QListWidget, QLineEdit, QPushButton, \
-    QLabel, QCheckBox, QTextEdit, QMessageBox
-from PySide2.QtCore import Qt, QTimer
+from PySide2.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QListView, QLineEdit, \
+    QPushButton, QLabel, QCheckBox, QTextEdit, QMessageBox, QComboBox
+from PySide2.QtCore import Qt, QTimer, QAbstractListModel, QModelIndex, QSortFilterProxyModel
+
+TEXT_ROLE = Qt.UserRole + 1
+COMPLETED_ROLE = Qt.UserRole + 2
+
+
+class TodoModel(QAbstractListModel):
+    """List model over the todos dict; rows keep insertion order
+
+    rows maps each id to its row. Removing a row shifts every later row, so
+    entries from valid_rows on are renumbered lazily on the next lookup that
+    needs them instead of on every removal.
+    """
+
+    def __init__(self, todos=None, parent=None):
+        super().__init__(parent)
+        self.todos = todos if todos is not None else {}
+        self._index_rows()
+
+    def _index_rows(self):
+        self.ids = list(self.todos)
+        self.rows = {todo_id: row for row, todo_id in enumerate(self.ids)}
+        self.valid_rows = len(self.ids)
+
+    def row_of(self, todo_id):
+        row = self.rows[todo_id]
+        if row >= self.valid_rows:
+            start = self.valid_rows
+            self.rows.update(zip(self.ids[start:], range(start, len(self.ids))))
+            self.valid_rows = len(self.ids)
+            row = self.rows[todo_id]
+        return row
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        todo_id = self.ids[index.row()]
+        todo = self.todos[todo_id]
+        if role == Qt.DisplayRole:
+            return f"{todo['text']} [已完成]" if todo["completed"] else todo["text"]
+        if role == Qt.UserRole:
+            return todo_id
+        if role == TEXT_ROLE:
+            return todo["text"]
+        if role == COMPLETED_ROLE:
+            return todo["completed"]
+        return None
+
+    def reset(self, todos):
+        self.beginResetModel()
+        self.todos = todos
+        self._index_rows()
+        self.endResetModel()
+
+    def add(self, todo_id, todo):
+        row = len(self.ids)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.todos[todo_id] = todo
+        self.ids.append(todo_id)
+        self.rows[todo_id] = row
+        if self.valid_rows == row:
+            self.valid_rows += 1
+        self.endInsertRows()
+
+    def remove(self, todo_id):
+        row = self.row_of(todo_id)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.ids[row]
+        del self.rows[todo_id]
+        self.valid_rows = min(self.valid_rows, row)
+        del self.todos[todo_id]
+        self.endRemoveRows()
+
+    def set_completed(self, todo_id, completed):
+        todo = self.todos[todo_id]
+        if todo["completed"] == completed:
+            return
+        todo["completed"] = completed
+        index = self.index(self.row_of(todo_id))
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, COMPLETED_ROLE])
+
+
+class TodoFilterModel(QSortFilterProxyModel):
+    """Filters by completion state and by a case-insensitive text search"""
+
+    SHOW_ALL, SHOW_PENDING, SHOW_COMPLETED = range(3)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.status_filter = self.SHOW_ALL
+        self.setFilterRole(TEXT_ROLE)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.setDynamicSortFilter(True)
+
+    def set_status_filter(self, status_filter):
+        self.status_filter = status_filter
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.status_filter != self.SHOW_ALL:
+            index = self.sourceModel().index(source_row, 0, source_parent)
+            completed = index.data(COMPLETED_ROLE)
+            if completed != (self.status_filter == self.SHOW_COMPLETED):
+                return False
+        return super().filterAcceptsRow(source_row, source_parent)
+
+
+class TodoStore:
+    """todos.db keeps one row per todo, so a change writes only that todo
+
+    On first use an existing todos.json is imported. Notes bodies are not
+    read by load(); load_notes() fetches them when a todo is opened.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS todos (
+        id TEXT PRIMARY KEY,
+        text TEXT NOT NULL,
+        completed INTEGER NOT NULL,
+        notes TEXT NOT NULL DEFAULT ''
+    )
+    """
+
+    def __init__(self, db_path, legacy_json_path=None):
+        todos = {}
+        if not os.path.exists(db_path) and legacy_json_path and os.path.exists(legacy_json_path):
+            # Read the old file before creating the database, so a bad file leaves nothing behind
+            with open(legacy_json_path, 'r', encoding='utf-8') as f:
+                todos = json.load(f)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(self.SCHEMA)
+            self.conn.executemany(
+                "INSERT INTO todos (id, text, completed, notes) VALUES (?, ?, ?, ?)",
+                [(todo_id, todo["text"], int(todo["completed"]), todo.get("notes", ""))
+                 for todo_id, todo in todos.items()]
+            )
+
+    def load(self):
+        """All todos in insertion order, without their notes"""
+        rows = self.conn.execute("SELECT id, text, completed FROM todos ORDER BY rowid")
+        return {todo_id: {"text": text, "completed": bool(completed)} for todo_id, text, completed in rows}
+
+    def load_notes(self, todo_id):
+        row = self.conn.execute("SELECT notes FROM todos WHERE id = ?", (todo_id,)).fetchone()
+        return row[0] if row else ""
+
+    def save(self, todo_id, todo):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO todos (id, text, completed, notes) VALUES (?, ?, ?, ?)",
+                (todo_id, todo["text"], int(todo["completed"]), todo.get("notes", ""))
+            )
+
+    def set_completed(self, todo_id, completed):
+        with self.conn:
+            self.conn.execute("UPDATE todos SET completed = ? WHERE id = ?", (int(completed), todo_id))
+
+    def save_notes(self, todo_id, notes):
+        with self.conn:
+            self.conn.execute("UPDATE todos SET notes = ? WHERE id = ?", (notes, todo_id))
+
+    def delete(self, todo_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM todos WHERE id = ?", (todo_id,))
 
 
 class TodoApp(QMainWindow):
+    # Milliseconds of typing pause before the notes are written
+    NOTES_SAVE_DELAY = 500
+
     def __init__(self):
         super().__init__()
 
@@ -26,8 +198,24 @@ class TodoApp(QMainWindow):
         self.date_label.setAlignment(Qt.AlignCenter)
         main_layout.addWidget(self.date_label)
 
-        # Todo list widget
-        self.todo_list = QListWidget()
+        # Search and status filter
+        filter_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索...")
+        self.status_filter = QComboBox()
+        self.status_filter.addItems(["全部", "未完成", "已完成"])
+        filter_layout.addWidget(self.search_input)
+        filter_layout.addWidget(self.status_filter)
+        main_layout.addLayout(filter_layout)
+
+        # Todo list view over the model, through the filter proxy
+        self.todo_model = TodoModel()
+        self.proxy_model = TodoFilterModel()
+        self.proxy_model.setSourceModel(self.todo_model)
+        self.todo_list = QListView()
+        self.todo_list.setModel(self.proxy_model)
+        # All rows have the same height, so the view never measures every item
+        self.todo_list.setUniformItemSizes(True)
         main_layout.addWidget(self.todo_list)
 
         # Input for new todo
@@ -50,88 +238,132 @@ class TodoApp(QMainWindow):
         self.notes_area.setPlaceholderText("输入备注...")
         main_layout.addWidget(self.notes_area)
 
+        # Notes are written back after typing pauses, one todo at a time
+        self.notes_timer = QTimer(self)
+        self.notes_timer.setSingleShot(True)
+        self.notes_timer.setInterval(self.NOTES_SAVE_DELAY)
+        self.notes_timer.timeout.connect(self.save_notes)
+        self.notes_todo_id = None
+        self.notes_dirty = False
+        self.loading_notes = False
+
         # Bind events
         add_button.clicked.connect(self.add_todo)
         delete_button.clicked.connect(self.delete_selected_todo)
-        self.todo_list.itemClicked.connect(self.load_selected_todo)
+        self.todo_list.selectionModel().currentChanged.connect(self.load_selected_todo)
+        self.search_input.textChanged.connect(self.proxy_model.setFilterFixedString)
+        self.status_filter.currentIndexChanged.connect(self.proxy_model.set_status_filter)
         self.status_checkbox.stateChanged.connect(self.update_status)
         self.new_todo_input.returnPressed.connect(self.add_todo)
-        self.notes_area.textChanged.connect(self.save_to_json)
+        self.notes_area.textChanged.connect(self.on_notes_changed)
 
         # Load existing todos
-        self.todos = {}
-        self.json_file_path = os.path.join(os.path.dirname(__file__), 'todos.json')
-        self.load_from_json()
+        self.todos = self.todo_model.todos
+        data_dir = os.path.dirname(os.path.abspath(__file__))
+        self.json_file_path = os.path.join(data_dir, 'todos.json')
+        self.store = None
+        try:
+            self.store = TodoStore(os.path.join(data_dir, 'todos.db'), self.json_file_path)
+            self.todo_model.reset(self.store.load())
+            self.todos = self.todo_model.todos
+        except (sqlite3.Error, IOError, ValueError) as e:
+            QMessageBox.critical(self, "加载错误", f"无法加载文件: {e}")
+
+    def persist(self, action, *args):
+        """Run one TodoStore write, reporting failures like the old JSON save did"""
+        if self.store is None:
+            return
+        try:
+            getattr(self.store, action)(*args)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "保存错误", f"无法保存文件: {e}")
 
     def add_todo(self):
         text = self.new_todo_input.text().strip()
         if text:
             # Create new todo entry
             todo_id = str(datetime.now().timestamp())
-            self.todos[todo_id] = {
+            todo = {
                 "text": text,
                 "completed": False,
                 "notes": ""
             }
-            self.update_todo_list()
-            self.save_to_json()
+            self.todo_model.add(todo_id, todo)
+            self.persist('save', todo_id, todo)
             self.new_todo_input.clear()
 
+    def selected_todo_id(self):
+        current = self.todo_list.currentIndex()
+        return current.data(Qt.UserRole) if current.isValid() else None
+
     def delete_selected_todo(self):
-        current_item = self.todo_list.currentItem()
-        if current_item:
-            todo_id = current_item.data(Qt.UserRole)
-            if todo_id in self.todos:
-                del self.todos[todo_id]
-                self.update_todo_list()
-                self.save_to_json()
-                self.notes_area.clear()
+        todo_id = self.selected_todo_id()
+        if todo_id in self.todos:
+            if todo_id == self.notes_todo_id:
+                self.notes_timer.stop()
+                self.notes_dirty = False
+                self.notes_todo_id = None
+            # Removing the row moves the selection to a neighbour, which fills the panel
+            self.todo_model.remove(todo_id)
+            self.persist('delete', todo_id)
+            if not self.todo_list.currentIndex().isValid():
+                # Nothing left to select: clear the panel without saving anything
+                self.status_checkbox.blockSignals(True)
                 self.status_checkbox.setChecked(False)
+                self.status_checkbox.blockSignals(False)
+                self.show_notes("")
 
     def load_selected_todo(self):
-        current_item = self.todo_list.currentItem()
-        if current_item:
-            todo_id = current_item.data(Qt.UserRole)
+        # Write out the notes of the previously selected todo before switching
+        self.save_notes()
+        todo_id = self.selected_todo_id()
+        if todo_id is not None:
             todo = self.todos.get(todo_id, {})
+            if todo and "notes" not in todo and self.store is not None:
+                # Notes bodies stay on disk until a todo is opened
+                try:
+                    todo["notes"] = self.store.load_notes(todo_id)
+                except (sqlite3.Error, IOError, ValueError) as e:
+                    # Left unset, so the next time the todo is opened reads it again
+                    QMessageBox.critical(self, "加载错误", f"无法加载备注: {e}")
             self.new_todo_input.setText(todo.get("text", ""))
             self.status_checkbox.setChecked(todo.get("completed", False))
-            self.notes_area.setPlainText(todo.get("notes", ""))
+            self.show_notes(todo.get("notes", ""))
+            self.notes_todo_id = todo_id
+
+    def show_notes(self, notes):
+        self.loading_notes = True
+        self.notes_area.setPlainText(notes)
+        self.loading_notes = False
+
+    def on_notes_changed(self):
+        if self.loading_notes or self.notes_todo_id not in self.todos:
+            return
+        self.todos[self.notes_todo_id]["notes"] = self.notes_area.toPlainText()
+        self.notes_dirty = True
+        # Restarting the timer on every keystroke coalesces a burst of typing into one write
+        self.notes_timer.start()
+
+    def save_notes(self):
+        if not self.notes_dirty:
+            return
+        self.notes_dirty = False
+        self.notes_timer.stop()
+        todo = self.todos.get(self.notes_todo_id)
+        if todo is not None:
+            self.persist('save_notes', self.notes_todo_id, todo["notes"])
 
     def update_status(self):
-        current_item = self.todo_list.currentItem()
-        if current_item:
-            todo_id = current_item.data(Qt.UserRole)
-            if todo_id in self.todos:
-                self.todos[todo_id]["completed"] = self.status_checkbox.isChecked()
-                self.update_todo_list()
-                self.save_to_json()
-
-    def update_todo_list(self):
-        self.todo_list.clear()
-        for todo_id, todo in self.todos.items():
-            text = todo["text"]
-            if todo["completed"]:
-                text += " [已完成]"
-            item = self.todo_list.addItem(text)
-            item.setData(Qt.UserRole, todo_id)
-
-    def save_to_json(self):
-        # Save all todos to JSON file
-        try:
-            with open(self.json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.todos, f, indent=4, ensure_ascii=False)
-        except IOError as e:
-            QMessageBox.critical(self, "保存错误", f"无法保存文件: {e}")
+        todo_id = self.selected_todo_id()
+        completed = self.status_checkbox.isChecked()
+        # Selecting a todo also sets the checkbox; only save real changes
+        if todo_id in self.todos and self.todos[todo_id]["completed"] != completed:
+            self.todo_model.set_completed(todo_id, completed)
+            self.persist('set_completed', todo_id, completed)
 
-    def load_from_json(self):
-        # Load todos from JSON file if exists
-        if os.path.exists(self.json_file_path):
-            try:
-                with open(self.json_file_path, 'r', encoding='utf-8') as f:
-                    self.todos = json.load(f)
-                self.update_todo_list()
-            except IOError as e:
-                QMessageBox.critical(self, "加载错误", f"无法加载文件: {e}")
+    def closeEvent(self, event):
+        self.save_notes()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
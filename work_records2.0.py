@@ -1,13 +1,197 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+import csv
 import json
+import logging
 import os
+import queue
 import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Any, Tuple, Optional
+
+from work_records_index import INDEX_TYPES, DateIndex, RollupIndex, SearchIndex, summarize
+from work_records_model import Day, Task, TIME_FORMAT
+from work_records_profile import PROFILER, enable as enable_profiling, profiled, profiling_requested
+from work_records_storage import FileLock, SyncedRecords, open_store, task_key
+
+# 脚本开始执行的时刻，启动耗时都相对它计算
+PROCESS_START = time.perf_counter()
+# 启动日志超过这个大小就换成新文件，只保留上一份
+STARTUP_LOG_BYTES = 256 * 1024
+
+
+class StartupTimer:
+    """记录启动各阶段相对脚本开始执行的耗时（毫秒）"""
+
+    def __init__(self):
+        self.marks = {}
+
+    def mark(self, name: str) -> None:
+        self.marks[name] = round((time.perf_counter() - PROCESS_START) * 1000, 1)
+
+    def summary(self) -> str:
+        return "启动 " + "，".join(f"{name} {ms:.0f} ms" for name, ms in self.marks.items())
+
+    def save(self, path: str) -> None:
+        """追加一行到启动日志，便于比较不同版本、不同数据量下的启动速度"""
+        entry = {'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'marks': self.marks}
+        handler = RotatingFileHandler(path, maxBytes=STARTUP_LOG_BYTES, backupCount=1, encoding='utf-8')
+        try:
+            handler.emit(logging.makeLogRecord({'msg': json.dumps(entry, ensure_ascii=False)}))
+        finally:
+            handler.close()
+
+
+class TaskRow:
+    """任务列表中可复用的一行控件，记住当前显示的内容以便只更新变化的部分"""
+
+    def __init__(self, view: 'TaskListView'):
+        self.index = -1
+        self.shown_text = None
+        self.shown_status = None
+
+        self.frame = ttk.Frame(view.canvas)
+        self.status_btn = ttk.Button(
+            self.frame,
+            text="□",
+            width=3,
+            command=lambda: view.on_toggle(self.index)
+        )
+        self.status_btn.pack(side='left', padx=(0, 5))
+
+        self.label = ttk.Label(self.frame, font=("Arial", 9))
+        self.label.pack(side='left', fill='x', expand=True)
+
+        delete_btn = ttk.Button(
+            self.frame,
+            text="X",
+            width=2,
+            command=lambda: view.on_delete(self.index),
+            style="Delete.TButton"
+        )
+        delete_btn.pack(side='right')
+
+        self.item = view.canvas.create_window(
+            0, 0, window=self.frame, anchor="nw",
+            width=view.width, height=TaskListView.ROW_HEIGHT - 4
+        )
+        if PROFILER.enabled:
+            PROFILER.count('widgets_created', 4)
+
+    def show(self, index: int, task: Task) -> None:
+        """显示第 index 个任务，内容没变的部分不重新配置"""
+        self.index = index
+        if task.text != self.shown_text:
+            self.label.configure(text=task.text)
+            self.shown_text = task.text
+        if task.status != self.shown_status:
+            self.status_btn.configure(text="✔" if task.status else "□")
+            self.label.configure(font=("Arial", 9, "overstrike") if task.status else ("Arial", 9))
+            self.shown_status = task.status
+
+
+class TaskListView:
+    """虚拟化的任务列表
+
+    所有行等高，只为画布可见范围内的任务创建行控件；滚动时复用移出视野的行，
+    任务数量再多，控件数也只和窗口高度有关。切换单个任务状态只更新那一行。
+    """
+
+    ROW_HEIGHT = 34
+    # 可见范围上下各多准备几行，滚动时不露白
+    OVERSCAN = 2
+
+    def __init__(self, parent, on_toggle, on_delete):
+        self.on_toggle = on_toggle
+        self.on_delete = on_delete
+        self.tasks = []
+        self.width = 1
+        self.bound = {}
+        self.free = []
+        self._rendering = False
+
+        # 创建带滚动条的画布
+        self.canvas = tk.Canvas(parent, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+
+        # 布局滚动区域
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.bind("<Configure>", self.on_canvas_configure)
+
+    def on_scroll(self, first, last) -> None:
+        """画布视图变化（滚动、调整大小）时同步滚动条并补齐可见行"""
+        self.scrollbar.set(first, last)
+        self.render()
+
+    def on_canvas_configure(self, event) -> None:
+        """当画布大小改变时，调整每行的宽度"""
+        self.width = event.width
+        for row in self.bound.values():
+            self.canvas.itemconfigure(row.item, width=event.width)
+        for row in self.free:
+            self.canvas.itemconfigure(row.item, width=event.width)
+        self.render()
+
+    def set_tasks(self, tasks: List[Task]) -> None:
+        """更换或增删任务后调用，可见行按新数据逐行比对更新"""
+        self.tasks = tasks
+        self.canvas.configure(scrollregion=(0, 0, self.width, len(tasks) * self.ROW_HEIGHT))
+        for index, row in list(self.bound.items()):
+            if index < len(tasks):
+                row.show(index, tasks[index])
+        self.render()
+
+    def update_row(self, index: int) -> None:
+        """只刷新一个任务所在的行"""
+        row = self.bound.get(index)
+        if row is not None:
+            row.show(index, self.tasks[index])
+
+    def visible_range(self) -> range:
+        top = int(self.canvas.canvasy(0)) // self.ROW_HEIGHT
+        count = self.canvas.winfo_height() // self.ROW_HEIGHT + 1
+        first = max(0, top - self.OVERSCAN)
+        last = min(len(self.tasks), top + count + self.OVERSCAN)
+        return range(first, last)
+
+    @profiled('task_list_render')
+    def render(self) -> None:
+        """回收移出可见范围的行，并为新进入可见范围的任务绑定行"""
+        if self._rendering:
+            return
+        self._rendering = True
+        try:
+            visible = self.visible_range()
+            for index in [i for i in self.bound if i not in visible]:
+                row = self.bound.pop(index)
+                self.canvas.itemconfigure(row.item, state='hidden')
+                self.free.append(row)
+
+            for index in visible:
+                if index in self.bound:
+                    continue
+                row = self.free.pop() if self.free else TaskRow(self)
+                row.show(index, self.tasks[index])
+                self.canvas.coords(row.item, 0, index * self.ROW_HEIGHT + 2)
+                self.canvas.itemconfigure(row.item, state='normal')
+                self.bound[index] = row
+        finally:
+            self._rendering = False
 
 
 class WorkRecordApp:
+    # 检查后台加载结果的间隔（毫秒）
+    LOAD_POLL_INTERVAL = 20
+    # 检查写入线程事件的间隔（毫秒）
+    STORE_POLL_INTERVAL = 50
+
     def __init__(self, root: tk.Tk):
         self.root = root
         self.root.title("每日工作记录v2.0 by Roy")
@@ -18,14 +202,35 @@ class WorkRecordApp:
         self.style.configure("Task.TButton", padding=5)
         self.style.configure("Delete.TButton", padding=5)
 
-        # 初始化数据
+        if profiling_requested():
+            enable_profiling(self.root, os.path.join(self.get_application_path(), 'work_records_profile.log'))
+
+        # 先画出窗口，数据在后台线程加载
+        self.startup = StartupTimer()
         self.current_date = datetime.now().strftime('%Y-%m-%d')
-        self.data = self.load_data()
-        self.init_current_date_data()
+        self.store = None
+        # 内存中的数据、索引以及与写入线程的同步，完整数据加载后创建
+        self.records = None
+        # 完整数据加载完成前，编辑类的事件处理函数直接返回
+        self.loaded = False
+        # 打开的历史、搜索、统计窗口，重新加载数据后改用新的索引
+        self.windows = []
+        self.loading_widgets = []
 
         # 创建主框架
         self.create_main_layout()
-        self.refresh_tasks()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.startup.mark("窗口")
+        self.root.after_idle(lambda: self.startup.mark("首屏"))
+        self.start_loading()
+
+    @property
+    def data(self) -> Dict[str, Day]:
+        return self.records.data if self.records is not None else {}
+
+    @property
+    def indexes(self) -> Dict[str, Any]:
+        return self.records.indexes if self.records is not None else {}
 
     def get_application_path(self) -> str:
         """获取应用程序路径，兼容打包后的exe"""
@@ -40,56 +245,147 @@ class WorkRecordApp:
 
     def ensure_file_directory(self) -> None:
         """确保文件目录存在"""
-        directory = os.path.dirname(self.file_path)
-        if not os.path.exists(directory):
-            try:
-                os.makedirs(directory)
-            except Exception as e:
-                messagebox.showerror("错误", f"无法创建数据目录: {e}")
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
 
-    def load_data(self) -> Dict[str, Any]:
-        """加载历史记录"""
-        self.ensure_file_directory()
-        try:
-            if os.path.exists(self.file_path):
-                with open(self.file_path, 'r', encoding='utf-8') as file:
-                    return json.load(file)
-            return {}
-        except Exception as e:
-            messagebox.showerror("加载错误", f"无法加载数据文件: {e}")
-            return {}
+    def start_loading(self) -> None:
+        """启动后台加载线程，并定时检查加载进度"""
+        self.load_results = queue.Queue()
+        threading.Thread(target=self.load_data, name="work-records-loader", daemon=True).start()
+        self.root.after(self.LOAD_POLL_INTERVAL, self.poll_loading)
+
+    def load_data(self) -> None:
+        """加载历史记录（后台线程）
 
-    def save_data(self) -> None:
-        """保存数据"""
-        self.ensure_file_directory()
+        支持按天读取的存储先送出今天的记录，随后再送出完整数据和索引。
+        """
         try:
-            with open(self.file_path, 'w', encoding='utf-8') as file:
-                json.dump(self.data, file, ensure_ascii=False, indent=4)
+            self.ensure_file_directory()
+            store = open_store(self.file_path, INDEX_TYPES)
+            if store.partial_load:
+                self.load_results.put(('today', store.load_day(self.current_date)))
+            # 快照和日志必须在同一次加锁内读取，否则其他实例在两次读取之间折叠会丢失变更
+            with FileLock(store.lock_path):
+                data, indexes = store.load()
+            # 之后的读取都在界面线程和写入线程中进行
+            store.release_connection()
+            self.load_results.put(('all', (store, data, indexes)))
         except Exception as e:
-            messagebox.showerror("保存错误", f"无法保存数据: {e}")
+            self.load_results.put(('error', e))
 
-    def init_current_date_data(self) -> None:
-        """Initialize data for the current date and carry over incomplete tasks from previous days."""
-        if self.current_date not in self.data:
-            self.data[self.current_date] = {'tasks': [], 'notes': ''}
+    def poll_loading(self) -> None:
+        """在界面线程中接收后台加载的结果"""
+        while True:
+            try:
+                stage, result = self.load_results.get_nowait()
+            except queue.Empty:
+                self.root.after(self.LOAD_POLL_INTERVAL, self.poll_loading)
+                return
+            if stage == 'today':
+                if result is not None:
+                    self.show_today(result)
+                self.startup.mark("今日数据")
+            elif stage == 'all':
+                self.on_data_loaded(*result)
+                return
+            else:
+                # 保持只读，避免用空数据覆盖无法读取的数据文件
+                self.status_label.configure(text="加载失败，当前为只读状态")
+                messagebox.showerror("加载错误", f"无法加载数据文件: {result}")
+                return
+
+    def show_today(self, record: Day) -> None:
+        """显示今天的待办事项和备注"""
+        self.task_list.set_tasks(record.tasks)
+        self.set_notes_text(record.notes)
+
+    def set_notes_text(self, notes: str) -> None:
+        """替换备注框内容，尽量保持光标位置"""
+        if self.notes_text.get("1.0", tk.END).strip() == notes:
+            return
+        # 加载完成前备注框是只读的，填入内容后恢复原状态
+        state = self.notes_text.cget('state')
+        cursor = self.notes_text.index(tk.INSERT)
+        self.notes_text.configure(state='normal')
+        self.notes_text.delete("1.0", tk.END)
+        self.notes_text.insert("1.0", notes)
+        self.notes_text.mark_set(tk.INSERT, cursor)
+        self.notes_text.configure(state=state)
+
+    def on_data_loaded(self, store, data: Dict[str, Day], indexes: Dict[str, Any]) -> None:
+        """完整数据就绪：顺延未完成任务，开放编辑"""
+        self.store = store
+        self.records = SyncedRecords(store, data, indexes, self.current_date,
+                                     get_notes=self.get_notes_text, set_notes=self.set_notes_text,
+                                     on_write=self.on_store_write if PROFILER.enabled else None)
+        self.show_today(self.data[self.current_date])
+        self.loaded = True
+        for widget in self.loading_widgets:
+            widget.configure(state='normal')
+        self.startup.mark("就绪")
+        self.status_label.configure(text=self.startup.summary())
+        log_path = os.path.join(self.get_application_path(), 'work_records_startup.log')
+        threading.Thread(target=self.startup.save, args=(log_path,), daemon=True).start()
+        self.root.after(self.STORE_POLL_INTERVAL, self.poll_store_events)
+
+    @profiled('record_change')
+    def record_change(self, change: Dict[str, Any]) -> None:
+        """应用一条变更，并交给后台线程写入日志"""
+        self.records.record_change(change)
+
+    def get_notes_text(self) -> str:
+        return self.notes_text.get("1.0", tk.END).strip()
+
+    def on_store_write(self, kind: str, size: int, seconds: float) -> None:
+        """写入线程每次追加或折叠后调用（仅在性能观测打开时）"""
+        PROFILER.record(f'write_{kind}_ms', seconds * 1000)
+        PROFILER.record(f'write_{kind}_bytes', size)
+        PROFILER.count('bytes_written', size)
+
+    def poll_store_events(self) -> None:
+        """在界面线程中处理写入线程送来的事件
+
+        写入线程从不直接调用 Tk，关闭窗口时界面线程等待它结束才不会互相卡住。
+        """
+        notices = self.records.process_events()
+        if notices:
+            self.on_store_notices(notices)
+        self.root.after(self.STORE_POLL_INTERVAL, self.poll_store_events)
+
+    @profiled('merge_remote_changes')
+    def on_store_notices(self, notices: List[Tuple[str, Any]]) -> None:
+        """刷新其他实例修改过的内容，提示写入错误"""
+        for kind, payload in notices:
+            if kind == 'error':
+                messagebox.showerror("保存错误", f"无法保存数据: {payload}")
+            elif kind == 'remote':
+                if self.current_date in payload:
+                    self.refresh_tasks()
+                self.status_label.configure(text=f"已同步其他窗口对 {len(payload)} 天记录的修改")
+            else:
+                # 整体重新加载了数据，打开的窗口改用新的索引
+                self.refresh_tasks()
+                self.prune_windows()
+                for window in self.windows:
+                    window.rebind()
 
-            # Traverse backward to find and carry over incomplete tasks from previous dates
-            date = datetime.now() - timedelta(days=1)
-            seen_tasks = set(task['text'] for task in self.data[self.current_date]['tasks'])
+    def register_window(self, window: Any) -> None:
+        """记下打开的窗口，重新加载数据后通知它改用新的索引"""
+        self.prune_windows()
+        self.windows.append(window)
 
-            # Gather incomplete tasks until we run out of recorded days
-            while date.strftime('%Y-%m-%d') in self.data:
-                date_str = date.strftime('%Y-%m-%d')
-                previous_tasks = self.data[date_str]['tasks']
+    def prune_windows(self) -> None:
+        self.windows = [window for window in self.windows if window.window.winfo_exists()]
 
-                for task in previous_tasks:
-                    if not task['status'] and task['text'] not in seen_tasks:
-                        # Add incomplete task only if it's unique for the day
-                        self.data[self.current_date]['tasks'].append(task.copy())
-                        seen_tasks.add(task['text'])
+    def on_close(self) -> None:
+        """关闭窗口前写完所有变更并生成快照"""
+        self.root.withdraw()
+        if self.records is not None and not self.records.close():
+            messagebox.showerror("保存错误", "部分修改未能保存，请检查数据文件是否可写")
+        self.root.destroy()
 
-                # Move one day further back
-                date -= timedelta(days=1)
+    def init_current_date_data(self) -> None:
+        """初始化当天数据，并把之前所有未完成的任务顺延到今天"""
+        self.records.ensure_day(self.current_date)
 
     def create_main_layout(self) -> None:
         """创建主要布局"""
@@ -113,6 +409,31 @@ class WorkRecordApp:
             style="Task.TButton"
         )
         history_btn.pack(side='right')
+        self.loading_widgets.append(history_btn)
+
+        # 搜索按钮
+        search_btn = ttk.Button(
+            top_frame,
+            text="搜索",
+            command=self.open_search,
+            style="Task.TButton"
+        )
+        search_btn.pack(side='right', padx=5)
+        self.loading_widgets.append(search_btn)
+
+        # 统计按钮
+        report_btn = ttk.Button(
+            top_frame,
+            text="统计",
+            command=self.open_report,
+            style="Task.TButton"
+        )
+        report_btn.pack(side='right')
+        self.loading_widgets.append(report_btn)
+
+        # 底部状态栏，显示加载进度和启动耗时
+        self.status_label = ttk.Label(self.root, text="正在加载历史记录…", anchor='w')
+        self.status_label.pack(side='bottom', fill='x', padx=10, pady=(0, 5))
 
         # 创建主容器
         main_container = ttk.PanedWindow(self.root, orient='horizontal')
@@ -137,26 +458,17 @@ class WorkRecordApp:
             style="Task.TButton"
         )
         add_btn.pack(side='right')
+        self.loading_widgets.extend([self.task_entry, add_btn])
 
         # 待办事项列表区域
         tasks_frame = ttk.Frame(tasks_container)
         tasks_frame.pack(fill='both', expand=True)
 
-        # 创建带滚动条的画布
-        self.canvas = tk.Canvas(tasks_frame)
-        scrollbar = ttk.Scrollbar(tasks_frame, orient="vertical", command=self.canvas.yview)
-        self.tasks_frame = ttk.Frame(self.canvas)
-
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-
-        # 布局滚动区域
-        scrollbar.pack(side="right", fill="y")
-        self.canvas.pack(side="left", fill="both", expand=True)
-        self.canvas_frame = self.canvas.create_window((0, 0), window=self.tasks_frame, anchor="nw")
-
-        # 绑定调整大小事件
-        self.tasks_frame.bind("<Configure>", self.on_frame_configure)
-        self.canvas.bind("<Configure>", self.on_canvas_configure)
+        self.task_list = TaskListView(
+            tasks_frame,
+            on_toggle=self.update_task_status,
+            on_delete=self.delete_task
+        )
 
         # 右侧工作记录区域
         notes_container = ttk.Frame(main_container)
@@ -167,155 +479,492 @@ class WorkRecordApp:
 
         self.notes_text = scrolledtext.ScrolledText(notes_container, wrap=tk.WORD, height=10)
         self.notes_text.pack(fill='both', expand=True)
-        self.notes_text.insert("1.0", self.data[self.current_date].get('notes', ''))
         self.notes_text.bind("<KeyRelease>", self.on_notes_change)
+        self.loading_widgets.append(self.notes_text)
 
-    def on_frame_configure(self, event=None):
-        """更新画布的滚动区域"""
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-
-    def on_canvas_configure(self, event):
-        """当画布大小改变时，调整内部框架的宽度"""
-        self.canvas.itemconfig(self.canvas_frame, width=event.width)
+        # 数据加载完成前不允许编辑
+        for widget in self.loading_widgets:
+            widget.configure(state='disabled')
 
+    @profiled('add_task')
     def add_task(self) -> None:
         """添加新任务"""
+        if not self.loaded:
+            return
         task_text = self.task_entry.get().strip()
         if task_text:
-            self.data[self.current_date]['tasks'].append({
-                'text': task_text,
-                'status': False,
-                'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self.record_change({
+                'op': 'add',
+                'date': self.current_date,
+                'task': {
+                    'text': task_text,
+                    'status': False,
+                    'created_at': datetime.now().strftime(TIME_FORMAT)
+                }
             })
-            self.save_data()
             self.task_entry.delete(0, tk.END)
             self.refresh_tasks()
         else:
             messagebox.showwarning("输入错误", "请先输入待办事项内容")
 
+    @profiled('update_task_status')
     def update_task_status(self, index: int) -> None:
         """更新任务状态"""
+        if not self.loaded:
+            return
         try:
-            self.data[self.current_date]['tasks'][index]['status'] = \
-                not self.data[self.current_date]['tasks'][index]['status']
-            self.save_data()
-            self.refresh_tasks()
+            task = self.data[self.current_date].tasks[index]
+            self.record_change({
+                'op': 'status',
+                'date': self.current_date,
+                'index': index,
+                'key': task_key(task),
+                'status': not task.status
+            })
+            self.task_list.update_row(index)
         except Exception as e:
             messagebox.showerror("错误", f"更新任务状态失败: {e}")
 
     def delete_task(self, index: int) -> None:
         """删除任务"""
+        if not self.loaded:
+            return
         if messagebox.askyesno("确认", "确定要删除这个任务吗？"):
             try:
-                del self.data[self.current_date]['tasks'][index]
-                self.save_data()
+                task = self.data[self.current_date].tasks[index]
+                self.record_change({
+                    'op': 'delete',
+                    'date': self.current_date,
+                    'index': index,
+                    'key': task_key(task),
+                    'status': task.status
+                })
                 self.refresh_tasks()
             except Exception as e:
                 messagebox.showerror("错误", f"删除任务失败: {e}")
 
+    @profiled('refresh_tasks')
     def refresh_tasks(self) -> None:
         """刷新任务列表"""
-        for widget in self.tasks_frame.winfo_children():
-            widget.destroy()
-
-        for idx, task in enumerate(self.data[self.current_date]['tasks']):
-            task_frame = ttk.Frame(self.tasks_frame)
-            task_frame.pack(fill='x', pady=2)
-
-            # 状态图标
-            status_text = "✔" if task['status'] else "□"
-            status_btn = ttk.Button(
-                task_frame,
-                text=status_text,
-                width=3,
-                command=lambda i=idx: self.update_task_status(i)
-            )
-            status_btn.pack(side='left', padx=(0, 5))
-
-            # 任务内容
-            task_text = task['text']
-            if task['status']:
-                task_label = ttk.Label(
-                    task_frame,
-                    text=task_text,
-                    font=("Arial", 9, "overstrike")
-                )
-            else:
-                task_label = ttk.Label(
-                    task_frame,
-                    text=task_text,
-                    font=("Arial", 9)
-                )
-            task_label.pack(side='left', fill='x', expand=True)
-
-            # 删除按钮
-            delete_btn = ttk.Button(
-                task_frame,
-                text="X",
-                width=2,
-                command=lambda i=idx: self.delete_task(i),
-                style="Delete.TButton"
-            )
-            delete_btn.pack(side='right')
+        self.task_list.set_tasks(self.data[self.current_date].tasks)
 
+    @profiled('on_notes_change')
     def on_notes_change(self, event=None) -> None:
         """处理备注内容变更"""
-        self.data[self.current_date]['notes'] = self.notes_text.get("1.0", tk.END).strip()
-        self.save_data()
-
-    def view_history(self) -> None:
+        if not self.loaded:
+            return
+        notes = self.notes_text.get("1.0", tk.END).strip()
+        # 方向键等按键不改变内容，无需写日志
+        if notes != self.data[self.current_date].notes:
+            self.record_change({'op': 'notes', 'date': self.current_date, 'notes': notes})
+
+    @profiled('view_history')
+    def view_history(self, date: Optional[str] = None) -> None:
         """查看历史记录"""
-        history_window = tk.Toplevel(self.root)
-        history_window.title("历史记录")
-        history_window.geometry("600x400")
+        HistoryBrowser(self, date)
+
+    def open_search(self) -> None:
+        """搜索所有日期的待办事项和备注"""
+        SearchWindow(self)
+
+    def open_report(self) -> None:
+        """按日期范围查看完成率等效率统计"""
+        ReportWindow(self)
+
+
+def render_record(record: Day) -> List[Tuple[str, str]]:
+    """把单日记录排版成 (文本, 标签) 片段，供历史窗口直接插入"""
+    segments = [("待办事项:\n", "header")]
+    for task in record.tasks:
+        status = '✔' if task.status else '❌'
+        segments.append((f"{status} {task.text}\n", ""))
+    segments.append(("\n备注:\n", "header"))
+    segments.append((record.notes, ""))
+    return segments
+
+
+class HistoryBrowser:
+    """按需加载的历史记录窗口
+
+    日期来自有序的日期索引，只在选中时读取当天记录；排版结果放进小型 LRU 缓存，
+    并在后台预取前后相邻的日期。下拉框只列出当前月份的日期，按天、周、月翻页。
+    """
+
+    CACHE_SIZE = 32
+
+    def __init__(self, app: 'WorkRecordApp', date: Optional[str] = None):
+        self.app = app
+        self.bind_index()
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        # 数据重新加载时加一，之前开始的预取结果不再放进缓存
+        self.generation = 0
+        self.prefetcher = ThreadPoolExecutor(max_workers=1)
+        self.prefetches = set()
+        self.selected = None
+        self.shown_month = None
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title("历史记录")
+        self.window.geometry("600x400")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
 
         # 创建日期选择器
-        date_frame = ttk.Frame(history_window, padding="5")
+        date_frame = ttk.Frame(self.window, padding="5")
         date_frame.pack(fill='x')
 
-        dates = sorted(self.data.keys(), reverse=True)
-        date_var = tk.StringVar(value=dates[0] if dates else self.current_date)
+        for text, command in (("<< 月", lambda: self.jump_months(-1)),
+                              ("< 周", lambda: self.jump_days(-7)),
+                              ("< 天", self.show_previous)):
+            ttk.Button(date_frame, text=text, width=5, command=command).pack(side='left')
 
-        date_combo = ttk.Combobox(
-            date_frame,
-            textvariable=date_var,
-            values=dates,
-            state="readonly"
-        )
-        date_combo.pack(side='left', padx=5)
+        self.date_var = tk.StringVar()
+        self.date_combo = ttk.Combobox(date_frame, textvariable=self.date_var, width=12)
+        self.date_combo.pack(side='left', padx=5)
+        self.date_combo.bind('<<ComboboxSelected>>', lambda e: self.show(self.date_var.get()))
+        self.date_combo.bind('<Return>', lambda e: self.jump_to(self.date_var.get().strip()))
+
+        for text, command in (("天 >", self.show_next),
+                              ("周 >", lambda: self.jump_days(7)),
+                              ("月 >>", lambda: self.jump_months(1))):
+            ttk.Button(date_frame, text=text, width=5, command=command).pack(side='left')
 
         # 创建内容显示区域
-        content_frame = ttk.Frame(history_window, padding="5")
+        content_frame = ttk.Frame(self.window, padding="5")
         content_frame.pack(fill='both', expand=True)
 
-        history_text = scrolledtext.ScrolledText(
+        self.history_text = scrolledtext.ScrolledText(
             content_frame,
             wrap='word',
             font=("Arial", 10)
         )
-        history_text.pack(fill='both', expand=True)
-
-        def update_history_view(*args):
-            selected_date = date_var.get()
-            if selected_date in self.data:
-                history_text.delete("1.0", tk.END)
-                record = self.data[selected_date]
-
-                # 添加任务列表
-                history_text.insert(tk.END, "待办事项:\n", "header")
-                for task in record['tasks']:
-                    status = '✔' if task['status'] else '❌'
-                    history_text.insert(tk.END, f"{status} {task['text']}\n")
-
-                # 添加备注
-                history_text.insert(tk.END, "\n备注:\n", "header")
-                history_text.insert(tk.END, record['notes'])
+        self.history_text.pack(fill='both', expand=True)
+        # 设置标题样式
+        self.history_text.tag_configure("header", font=("Arial", 10, "bold"))
+
+        latest = self.date_index.dates[-1] if self.date_index.dates else None
+        self.show(date or latest or app.current_date)
+        app.register_window(self)
+
+    def bind_index(self) -> None:
+        self.date_index = self.app.indexes.get('dates')
+        if self.date_index is None:
+            self.date_index = DateIndex()
+            self.date_index.build(self.app.data)
+
+    def rebind(self) -> None:
+        """数据重新加载后改用新的日期索引，丢掉旧数据排版的缓存并重新显示"""
+        self.bind_index()
+        with self.cache_lock:
+            self.cache.clear()
+            self.generation += 1
+        self.shown_month = None
+        if self.selected:
+            self.jump_to(self.selected)
+
+    def close(self) -> None:
+        for future in list(self.prefetches):
+            future.cancel()
+        # 预取线程读数据库用的是它自己的连接，只能在这个线程里关闭
+        self.prefetcher.submit(self.app.store.release_connection)
+        self.prefetcher.shutdown(wait=False)
+        self.window.destroy()
+
+    def load_segments(self, date: str):
+        """读取并排版一天的记录，优先使用缓存；可在预取线程中调用"""
+        with self.cache_lock:
+            if date in self.cache:
+                self.cache.move_to_end(date)
+                return self.cache[date]
+            generation = self.generation
+        record = self.app.data.get(date)
+        if record is None:
+            return None
+        segments = render_record(record)
+        with self.cache_lock:
+            if generation != self.generation:
+                return segments
+            self.cache[date] = segments
+            while len(self.cache) > self.CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return segments
+
+    def prefetch(self, date: str) -> None:
+        """后台准备相邻日期，翻页时直接命中缓存"""
+        for neighbour in (self.date_index.before(date), self.date_index.after(date)):
+            # 今天的记录还在编辑中，每次都按最新内容显示，不缓存
+            if neighbour and neighbour != self.app.current_date:
+                future = self.prefetcher.submit(self.load_segments, neighbour)
+                self.prefetches.add(future)
+                future.add_done_callback(self.prefetches.discard)
+
+    @profiled('history_show')
+    def show(self, date: str) -> None:
+        """显示指定日期的记录"""
+        if date == self.app.current_date:
+            record = self.app.data.get(date)
+            segments = render_record(record) if record else None
+        else:
+            segments = self.load_segments(date)
+        if segments is None:
+            return
+
+        self.selected = date
+        self.date_var.set(date)
+        self.update_month_values(date)
+        self.history_text.delete("1.0", tk.END)
+        for text, tag in segments:
+            self.history_text.insert(tk.END, text, tag)
+        self.prefetch(date)
+
+    def update_month_values(self, date: str) -> None:
+        """下拉框只列出所选日期所在月份的记录"""
+        month = date[:7]
+        if month != self.shown_month:
+            self.date_combo.configure(values=self.date_index.between(month + '-01', month + '-31'))
+            self.shown_month = month
+
+    def show_previous(self) -> None:
+        if self.selected:
+            target = self.date_index.before(self.selected)
+            if target:
+                self.show(target)
+
+    def show_next(self) -> None:
+        if self.selected:
+            target = self.date_index.after(self.selected)
+            if target:
+                self.show(target)
+
+    def jump_to(self, date: str, forward: bool = False) -> None:
+        """跳到 date 当天，没有记录时取最近的一天"""
+        if forward:
+            target = self.date_index.at_or_after(date) or self.date_index.at_or_before(date)
+        else:
+            target = self.date_index.at_or_before(date) or self.date_index.at_or_after(date)
+        if target:
+            self.show(target)
+
+    def jump_days(self, days: int) -> None:
+        if self.selected:
+            target = datetime.strptime(self.selected, '%Y-%m-%d') + timedelta(days=days)
+            self.jump_to(target.strftime('%Y-%m-%d'), forward=days > 0)
+
+    def jump_months(self, months: int) -> None:
+        if self.selected:
+            year, month, day = (int(part) for part in self.selected.split('-'))
+            year, month = divmod(year * 12 + month - 1 + months, 12)
+            # 日期按字符串比较，2024-02-31 这样的越界日期也能正确定位
+            self.jump_to(f"{year:04d}-{month + 1:02d}-{day:02d}", forward=months > 0)
+
+
+class SearchWindow:
+    """全文搜索窗口：边输入边搜索，双击结果打开当天的历史记录"""
+
+    # 停止输入多久后开始搜索（毫秒）
+    SEARCH_DELAY = 150
+
+    def __init__(self, app: 'WorkRecordApp'):
+        self.app = app
+        self.bind_index()
+        self.pending = None
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title("搜索")
+        self.window.geometry("600x400")
+
+        query_frame = ttk.Frame(self.window, padding="5")
+        query_frame.pack(fill='x')
+        self.query_var = tk.StringVar()
+        query_entry = ttk.Entry(query_frame, textvariable=self.query_var)
+        query_entry.pack(side='left', fill='x', expand=True)
+        query_entry.bind('<KeyRelease>', self.schedule_search)
+        query_entry.focus_set()
+        self.status_label = ttk.Label(query_frame, width=16, anchor='e')
+        self.status_label.pack(side='right', padx=5)
+
+        result_frame = ttk.Frame(self.window, padding="5")
+        result_frame.pack(fill='both', expand=True)
+        self.results = ttk.Treeview(result_frame, columns=("date", "kind", "snippet"), show="headings")
+        self.results.heading("date", text="日期")
+        self.results.heading("kind", text="类型")
+        self.results.heading("snippet", text="内容")
+        self.results.column("date", width=90, stretch=False)
+        self.results.column("kind", width=60, stretch=False)
+        scrollbar = ttk.Scrollbar(result_frame, orient="vertical", command=self.results.yview)
+        self.results.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.results.pack(side="left", fill="both", expand=True)
+        self.results.bind('<Double-1>', self.open_result)
+        app.register_window(self)
+
+    def bind_index(self) -> None:
+        self.index = self.app.indexes.get('search')
+        if self.index is None:
+            self.index = SearchIndex()
+            self.index.build(self.app.data)
+
+    def rebind(self) -> None:
+        """数据重新加载后改用新的索引，并重新执行当前的搜索"""
+        self.bind_index()
+        self.run_search()
+
+    def schedule_search(self, event=None) -> None:
+        """连续输入时只在停顿后搜索一次"""
+        if self.pending is not None:
+            self.window.after_cancel(self.pending)
+        self.pending = self.window.after(self.SEARCH_DELAY, self.run_search)
+
+    def notes_text(self, date: str) -> str:
+        record = self.app.data.get(date)
+        return record.notes if record else ''
+
+    def run_search(self) -> None:
+        self.pending = None
+        query = self.query_var.get().strip()
+        started = time.perf_counter()
+        hits = self.index.search(query, notes_text=self.notes_text) if query else []
+        elapsed = (time.perf_counter() - started) * 1000
+
+        self.results.delete(*self.results.get_children())
+        for hit in hits:
+            kind = "待办" if hit.kind == 'task' else "备注"
+            self.results.insert('', tk.END, values=(hit.date, kind, hit.snippet(query)))
+        self.status_label.configure(text=f"{len(hits)} 条 / {elapsed:.1f} ms" if query else "")
+
+    def open_result(self, event=None) -> None:
+        selection = self.results.selection()
+        if selection:
+            self.app.view_history(self.results.item(selection[0], 'values')[0])
+
+
+class ReportWindow:
+    """效率统计报表
+
+    数字全部来自增量维护的日、周、月汇总，切换范围和周期时不扫描历史记录。
+    """
+
+    PERIOD_NAMES = {'日': 'day', '周': 'week', '月': 'month'}
+    COLUMNS = (
+        ("period", "时间段", 90),
+        ("days", "记录天数", 70),
+        ("tasks", "任务数", 70),
+        ("completion_rate", "完成率", 70),
+        ("tasks_per_day", "日均新建", 70),
+        ("carry_over_age", "顺延天龄", 70),
+        ("time_to_complete", "完成用时(天)", 90),
+    )
+
+    def __init__(self, app: 'WorkRecordApp'):
+        self.app = app
+        self.bind_index()
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title("效率统计")
+        self.window.geometry("700x450")
+
+        range_frame = ttk.Frame(self.window, padding="5")
+        range_frame.pack(fill='x')
+        today = datetime.now()
+        self.start_var = tk.StringVar(value=(today - timedelta(days=29)).strftime('%Y-%m-%d'))
+        self.end_var = tk.StringVar(value=today.strftime('%Y-%m-%d'))
+        self.period_var = tk.StringVar(value='周')
+        ttk.Label(range_frame, text="从").pack(side='left')
+        ttk.Entry(range_frame, textvariable=self.start_var, width=12).pack(side='left', padx=2)
+        ttk.Label(range_frame, text="到").pack(side='left')
+        ttk.Entry(range_frame, textvariable=self.end_var, width=12).pack(side='left', padx=2)
+        period_combo = ttk.Combobox(range_frame, textvariable=self.period_var, values=list(self.PERIOD_NAMES),
+                                    width=4, state='readonly')
+        period_combo.pack(side='left', padx=5)
+        period_combo.bind('<<ComboboxSelected>>', lambda e: self.refresh())
+        ttk.Button(range_frame, text="统计", command=self.refresh).pack(side='left')
+        ttk.Button(range_frame, text="导出 CSV", command=self.export).pack(side='right')
+
+        self.summary_label = ttk.Label(self.window, padding="5", anchor='w')
+        self.summary_label.pack(fill='x')
+
+        table_frame = ttk.Frame(self.window, padding="5")
+        table_frame.pack(fill='both', expand=True)
+        self.table = ttk.Treeview(table_frame, columns=[name for name, _, _ in self.COLUMNS], show="headings")
+        for name, title, width in self.COLUMNS:
+            self.table.heading(name, text=title)
+            self.table.column(name, width=width, anchor='e' if name != 'period' else 'w')
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.table.yview)
+        self.table.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.table.pack(side="left", fill="both", expand=True)
+
+        self.rows = []
+        self.refresh()
+        app.register_window(self)
+
+    def bind_index(self) -> None:
+        self.rollups = self.app.indexes.get('rollups')
+        if self.rollups is None:
+            self.rollups = RollupIndex()
+            self.rollups.build(self.app.data)
+
+    def rebind(self) -> None:
+        """数据重新加载后改用新的汇总并刷新表格"""
+        self.bind_index()
+        self.refresh()
+
+    @staticmethod
+    def format_row(label: str, metrics: Dict[str, Any]) -> Tuple[str, ...]:
+        def number(value: Optional[float], pattern: str) -> str:
+            return '-' if value is None else pattern.format(value)
+
+        return (
+            label,
+            str(metrics['days']),
+            str(metrics['tasks']),
+            number(metrics['completion_rate'], '{:.0%}'),
+            number(metrics['tasks_per_day'], '{:.1f}'),
+            number(metrics['carry_over_age'], '{:.1f}'),
+            number(metrics['time_to_complete'], '{:.1f}'),
+        )
 
-                # 设置标题样式
-                history_text.tag_configure("header", font=("Arial", 10, "bold"))
+    def refresh(self) -> None:
+        start, end = self.start_var.get().strip(), self.end_var.get().strip()
+        try:
+            datetime.strptime(start, '%Y-%m-%d')
+            datetime.strptime(end, '%Y-%m-%d')
+        except ValueError:
+            messagebox.showwarning("输入错误", "日期格式应为 YYYY-MM-DD", parent=self.window)
+            return
+
+        started = time.perf_counter()
+        period = self.PERIOD_NAMES[self.period_var.get()]
+        self.rows = [self.format_row(label, summarize(stats))
+                     for label, stats in self.rollups.series(start, end, period)]
+        total = self.format_row("合计", summarize(self.rollups.range(start, end)))
+        elapsed = (time.perf_counter() - started) * 1000
+
+        self.table.delete(*self.table.get_children())
+        for row in self.rows:
+            self.table.insert('', tk.END, values=row)
+        self.table.insert('', tk.END, values=total)
+        self.rows.append(total)
+        self.summary_label.configure(
+            text=f"{start} 至 {end}：完成率 {total[3]}，日均新建 {total[4]}，"
+                 f"顺延天龄 {total[5]}，完成用时 {total[6]} 天（{elapsed:.1f} ms）"
+        )
 
-        date_combo.bind('<<ComboboxSelected>>', update_history_view)
-        update_history_view()
+    def export(self) -> None:
+        """把当前表格导出为 CSV（带 BOM，Excel 可直接打开）"""
+        path = filedialog.asksaveasfilename(
+            parent=self.window, defaultextension='.csv', filetypes=[("CSV", "*.csv")],
+            initialfile=f"work_records_{self.start_var.get()}_{self.end_var.get()}.csv"
+        )
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8-sig', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow([title for _, title, _ in self.COLUMNS])
+                writer.writerows(self.rows)
+        except OSError as e:
+            messagebox.showerror("导出错误", f"无法写入文件: {e}", parent=self.window)
 
 
 def main():
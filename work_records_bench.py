@@ -0,0 +1,289 @@
+"""每日工作记录的性能基准
+
+生成指定规模的合成历史（几天到十几年，每天多条任务和长备注），
+测量 load_data、快照折叠（compact）、init_current_date_data、refresh_tasks、view_history
+等操作的耗时分位数和峰值内存，结果写成 JSON，方便比较不同版本。
+
+    python work_records_bench.py --days 7 365 3650 --output bench_results.json
+
+没有图形界面（无法创建 Tk 窗口）时，依赖界面的操作记为 skipped。
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Callable, Optional
+
+from work_records_index import INDEX_TYPES
+from work_records_storage import JournalStore, SyncedRecords, migrate_json_to_sqlite, open_store
+
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'work_records2.0.py')
+
+WORDS = [
+    "整理", "周报", "会议", "需求", "评审", "修复", "测试", "上线", "客户", "回访", "文档", "合同",
+    "预算", "采购", "培训", "数据", "报表", "服务器", "备份", "巡检", "接口", "联调", "设计", "方案",
+    "review", "deploy", "refactor", "meeting", "report", "invoice", "backup", "release", "bug", "api",
+]
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return ''.join(rng.choice(WORDS) + (' ' if rng.random() < 0.3 else '') for _ in range(words)).strip()
+
+
+def generate_history(days: int, tasks_per_day: int = 10, notes_chars: int = 500,
+                     done_ratio: float = 0.8, seed: int = 0,
+                     end: Optional[datetime] = None) -> Dict[str, Any]:
+    """生成与 work_records.json 相同格式的合成历史
+
+    约七分之一的日期没有记录（模拟休息日），未完成的任务会像真实使用一样顺延到下一个记录日。
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now() - timedelta(days=1)
+    date = end - timedelta(days=days - 1)
+    data = {}
+    carried = []
+    while date <= end:
+        if rng.random() < 1 / 7:
+            date += timedelta(days=1)
+            continue
+        date_str = date.strftime('%Y-%m-%d')
+        tasks = [dict(task) for task in carried]
+        for i in range(tasks_per_day):
+            created = date + timedelta(hours=9, minutes=i * 7, seconds=rng.randrange(60))
+            tasks.append({
+                'text': random_text(rng, rng.randint(2, 6)),
+                'status': False,
+                'created_at': created.strftime('%Y-%m-%d %H:%M:%S')
+            })
+        for task in tasks:
+            task['status'] = rng.random() < done_ratio
+        carried = [dict(task, status=False) for task in tasks if not task['status']][:tasks_per_day]
+
+        notes = []
+        while sum(len(line) for line in notes) < notes_chars:
+            notes.append(random_text(rng, rng.randint(5, 15)) + "。")
+        data[date_str] = {'tasks': tasks, 'notes': '\n'.join(notes)[:notes_chars]}
+        date += timedelta(days=1)
+    return data
+
+
+def load_app_module():
+    """文件名里带点，只能按路径导入主程序"""
+    spec = importlib.util.spec_from_file_location('work_records_app', APP_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p50_ms': round(pick(0.50), 3),
+        'p90_ms': round(pick(0.90), 3),
+        'p99_ms': round(pick(0.99), 3),
+        'max_ms': round(ordered[-1], 3),
+    }
+
+
+def measure(operation: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """多次计时得到分位数，再单独跑一次用 tracemalloc 统计峰值内存"""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        started = time.perf_counter()
+        operation()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    operation()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = percentiles(samples)
+    result['peak_kib'] = round(peak / 1024, 1)
+    return result
+
+
+def bench_storage(workdir: str, data: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    """不需要界面的存储操作"""
+    results = {}
+    snapshot_path = os.path.join(workdir, 'work_records.json')
+    with open(snapshot_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=4)
+    results['snapshot_bytes'] = os.path.getsize(snapshot_path)
+
+    store = JournalStore(snapshot_path, INDEX_TYPES)
+    # 第一次加载没有索引存档，需要从全部历史重建
+    results['load_data_rebuild_indexes'] = measure(lambda: JournalStore(snapshot_path, INDEX_TYPES).load(), 1)
+    loaded, indexes = store.load()
+    store.compact(loaded, indexes)
+    results['load_data'] = measure(lambda: JournalStore(snapshot_path, INDEX_TYPES).load(), repeat)
+    results['compact'] = measure(lambda: store.compact(loaded, indexes), repeat)
+
+    last_date = max(loaded)
+    change = {'op': 'notes', 'date': last_date, 'notes': loaded[last_date].notes + '。'}
+    results['journal_append'] = measure(lambda: store.append([change]), repeat * 10)
+
+    db_path = os.path.join(workdir, 'work_records.db')
+    results['sqlite_migrate'] = measure(
+        lambda: migrate_json_to_sqlite(snapshot_path, db_path, INDEX_TYPES), 1,
+        setup=lambda: os.path.exists(db_path) and os.remove(db_path)
+    )
+    sqlite_store = open_store(snapshot_path, INDEX_TYPES)
+    results['sqlite_load_day'] = measure(lambda: sqlite_store.load_day(last_date), repeat * 10)
+    results['sqlite_load_data'] = measure(sqlite_store.load, repeat)
+
+    search = indexes['search']
+    results['search'] = measure(lambda: search.search("周报 review"), repeat * 10)
+    # 全文索引在第一次查询时才从保存的状态恢复
+    lazy_search = None
+
+    def reload_search():
+        nonlocal lazy_search
+        lazy_search = JournalStore(snapshot_path, INDEX_TYPES).load()[1]['search']
+
+    results['search_first_query'] = measure(lambda: lazy_search.search("周报 review"), repeat, setup=reload_search)
+    rollups = indexes['rollups']
+    first_date = min(loaded)
+    results['rollup_range'] = measure(lambda: rollups.range(first_date, last_date), repeat * 10)
+    return results
+
+
+def bench_app(workdir: str, repeat: int) -> Dict[str, Any]:
+    """需要 WorkRecordApp 的操作，使用 bench_storage 写好的数据目录"""
+    module = load_app_module()
+    snapshot_path = os.path.join(workdir, 'work_records.json')
+    db_path = os.path.join(workdir, 'work_records.db')
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    results = {}
+
+    # init_current_date_data 不依赖界面：直接给应用对象装上数据和写入线程
+    app = module.WorkRecordApp.__new__(module.WorkRecordApp)
+    store = JournalStore(snapshot_path, INDEX_TYPES)
+    data, indexes = store.load()
+    last_date = max(data)
+    app.records = SyncedRecords(store, data, indexes, last_date, get_notes=lambda: '', set_notes=lambda notes: None)
+    day = datetime.strptime(last_date, '%Y-%m-%d')
+
+    def next_day():
+        # 每次都换一个还没有记录的日期，才会真正执行顺延
+        nonlocal day
+        day += timedelta(days=1)
+        app.current_date = day.strftime('%Y-%m-%d')
+
+    results['init_current_date_data'] = measure(app.init_current_date_data, repeat, setup=next_day)
+    app.records.close()
+
+    try:
+        root = module.tk.Tk()
+    except module.tk.TclError as e:
+        for name in ('refresh_tasks', 'update_task_status', 'view_history'):
+            results[name] = {'skipped': f"无法创建窗口: {e}"}
+        return results
+
+    class BenchApp(module.WorkRecordApp):
+        file_path = snapshot_path
+
+        def get_application_path(self) -> str:
+            return workdir
+
+    root.withdraw()
+    app = BenchApp(root)
+    while app.records is None:
+        root.update()
+        time.sleep(0.001)
+    results['startup_marks_ms'] = app.startup.marks
+    if not app.data[app.current_date].tasks:
+        # 切换状态需要至少一个任务
+        app.task_entry.insert(0, "benchmark")
+        app.add_task()
+
+    def refresh():
+        app.refresh_tasks()
+        root.update_idletasks()
+
+    def toggle():
+        app.update_task_status(0)
+        root.update_idletasks()
+
+    def view_history():
+        app.view_history()
+        root.update_idletasks()
+
+    results['refresh_tasks'] = measure(refresh, repeat)
+    results['update_task_status'] = measure(toggle, repeat)
+    results['view_history'] = measure(view_history, repeat)
+
+    app.records.close()
+    root.destroy()
+    return results
+
+
+def run(days_list: List[int], tasks_per_day: int, notes_chars: int, repeat: int) -> Dict[str, Any]:
+    report = {
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'tasks_per_day': tasks_per_day,
+        'notes_chars': notes_chars,
+        'repeat': repeat,
+        'sizes': []
+    }
+    for days in days_list:
+        workdir = tempfile.mkdtemp(prefix='work_records_bench_')
+        try:
+            data = generate_history(days, tasks_per_day, notes_chars)
+            entry = {'days': days, 'records': len(data), 'tasks': sum(len(r['tasks']) for r in data.values())}
+            print(f"{days} 天：{entry['records']} 条日记录，{entry['tasks']} 个任务", flush=True)
+            entry.update(bench_storage(workdir, data, repeat))
+            del data
+            entry.update(bench_app(workdir, repeat))
+            report['sizes'].append(entry)
+            for name, result in entry.items():
+                if isinstance(result, dict) and 'p50_ms' in result:
+                    print(f"  {name:28s} p50 {result['p50_ms']:10.3f} ms  p99 {result['p99_ms']:10.3f} ms"
+                          f"  峰值 {result['peak_kib']:10.1f} KiB")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="每日工作记录性能基准")
+    parser.add_argument('--days', type=int, nargs='+', default=[7, 365, 3650], help="历史天数，可给多个")
+    parser.add_argument('--tasks-per-day', type=int, default=10)
+    parser.add_argument('--notes-chars', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5, help="每个操作的计时次数")
+    parser.add_argument('--output', default='bench_results.json', help="结果 JSON 文件")
+    args = parser.parse_args()
+
+    report = run(args.days, args.tasks_per_day, args.notes_chars, args.repeat)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,589 @@
+"""每日工作记录的派生索引
+
+索引随每条变更增量更新（observe），并由存储层在折叠日志时保存状态，
+启动时从保存的状态恢复，而不是扫描全部历史。
+"""
+import bisect
+import math
+import re
+from datetime import date as Date, timedelta
+from functools import lru_cache
+from typing import Dict, List, Any, Tuple, Optional, Callable
+
+from work_records_model import Day, Task
+from work_records_storage import task_key
+
+
+class OpenTaskIndex:
+    """未完成任务索引：最近一天记录中每个任务（按身份）的状态
+
+    每天的记录创建时都会顺延之前全部未完成的任务，所以最近一天的记录就是完整的待办清单；
+    更早日期上未完成、却没有出现在最近一天的任务，是在之后被删除了。
+    因此索引只跟踪最近一天，更早日期的变更不影响顺延：增量维护和重建得到的结果相同，
+    重建也只需读取最近一天，而不是扫描全部历史。
+    """
+
+    name = 'open_tasks'
+
+    def __init__(self):
+        self.date = None
+        # 任务身份 -> 是否已完成，按在最近一天出现的顺序排列
+        self.tasks = {}
+
+    def build(self, data: Dict[str, Day]) -> None:
+        """只读取最近一天的记录；按需加载的数据只查询日期列表和这一天"""
+        self.date = max(data, default=None)
+        self.tasks = {}
+        if self.date is not None:
+            self._merge(data.get(self.date).tasks)
+
+    def _merge(self, tasks: List[Task]) -> None:
+        """与 merge_day 相同：已有的任务保持原状态，只补上新出现的任务"""
+        for task in tasks:
+            self.tasks.setdefault(task_key(task), task.status)
+
+    def observe(self, change: Dict[str, Any]) -> None:
+        """根据一条变更更新索引"""
+        date = change['date']
+        if self.date is not None and date < self.date:
+            return
+        if date != self.date:
+            self.date = date
+            self.tasks = {}
+        op = change['op']
+        if op == 'day':
+            self._merge(Day.from_json(change['record']).tasks)
+        elif op == 'add':
+            self._merge([Task.from_json(change['task'])])
+        elif op in ('status', 'delete') and 'key' in change:
+            key = tuple(change['key'])
+            if op == 'delete':
+                self.tasks.pop(key, None)
+            elif key in self.tasks:
+                self.tasks[key] = change['status']
+
+    def open_tasks(self) -> List[Dict[str, Any]]:
+        """所有未完成任务（文件格式），可直接作为顺延副本写入变更"""
+        return [
+            {'text': text, 'status': False, 'created_at': created_at}
+            for (created_at, text), status in self.tasks.items() if not status
+        ]
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'date': self.date,
+            'tasks': [(created_at, text, status) for (created_at, text), status in self.tasks.items()]
+        }
+
+    def load_state(self, state: Any) -> None:
+        if isinstance(state, list):
+            # 旧格式：(创建时间, 内容, 最近出现的日期) 的未完成任务列表
+            self.date = max((date for _, _, date in state), default=None)
+            self.tasks = {(created_at, text): False for created_at, text, _ in state}
+            return
+        self.date = state['date']
+        self.tasks = {(created_at, text): bool(status) for created_at, text, status in state['tasks']}
+
+
+class DateIndex:
+    """有记录的日期的有序列表，历史浏览按它翻页，无需遍历全部数据"""
+
+    name = 'dates'
+
+    def __init__(self):
+        self.dates = []
+
+    def build(self, data: Dict[str, Any]) -> None:
+        self.dates = sorted(data.keys())
+
+    def observe(self, change: Dict[str, Any]) -> None:
+        """第一次出现的日期插入到有序位置"""
+        date = change['date']
+        position = bisect.bisect_left(self.dates, date)
+        if position == len(self.dates) or self.dates[position] != date:
+            self.dates.insert(position, date)
+
+    def before(self, date: str) -> Optional[str]:
+        """早于 date 的最近一个有记录的日期"""
+        position = bisect.bisect_left(self.dates, date)
+        return self.dates[position - 1] if position > 0 else None
+
+    def after(self, date: str) -> Optional[str]:
+        """晚于 date 的最近一个有记录的日期"""
+        position = bisect.bisect_right(self.dates, date)
+        return self.dates[position] if position < len(self.dates) else None
+
+    def at_or_before(self, date: str) -> Optional[str]:
+        position = bisect.bisect_right(self.dates, date)
+        return self.dates[position - 1] if position > 0 else None
+
+    def at_or_after(self, date: str) -> Optional[str]:
+        position = bisect.bisect_left(self.dates, date)
+        return self.dates[position] if position < len(self.dates) else None
+
+    def between(self, start: str, end: str) -> List[str]:
+        """[start, end] 范围内有记录的日期，日期字符串可以是 2024-02-31 这样的越界值"""
+        return self.dates[bisect.bisect_left(self.dates, start):bisect.bisect_right(self.dates, end)]
+
+    def to_state(self) -> List[str]:
+        return self.dates
+
+    def load_state(self, state: List[str]) -> None:
+        self.dates = list(state)
+
+
+# 中日韩文字按字切分，其余按单词切分
+TOKEN_PATTERN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]+|[^\W_]+')
+CJK_PATTERN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+# 文档编号各部分之间的分隔符
+DOC_SEPARATOR = '\x1f'
+
+
+def tokenize(text: str, for_query: bool = False) -> List[str]:
+    """切词：英文按单词，中文取单字和相邻两字
+
+    查询时中文只用两字组合（单个汉字除外），既能定位又不会被常用字拖慢。
+    """
+    tokens = []
+    for run in TOKEN_PATTERN.findall(text.lower()):
+        if not CJK_PATTERN.match(run):
+            tokens.append(run)
+            continue
+        bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+        if for_query:
+            tokens.extend(bigrams or [run])
+        else:
+            tokens.extend(run)
+            tokens.extend(bigrams)
+    return tokens
+
+
+class SearchHit:
+    """一条搜索结果"""
+
+    def __init__(self, date: str, kind: str, text: str, score: float):
+        self.date = date
+        self.kind = kind
+        self.text = text
+        self.score = score
+
+    def snippet(self, query: str, width: int = 40) -> str:
+        """截取命中位置附近的一段文字"""
+        text = ' '.join(self.text.split())
+        lowered = text.lower()
+        position = -1
+        for token in tokenize(query, for_query=True):
+            position = lowered.find(token)
+            if position >= 0:
+                break
+        start = max(0, position - width // 2)
+        snippet = text[start:start + width]
+        if start > 0:
+            snippet = '…' + snippet
+        if start + width < len(text):
+            snippet += '…'
+        return snippet
+
+
+class SearchIndex:
+    """任务内容和每日备注的倒排索引
+
+    每个任务、每天的备注各是一个文档。变更到来时只重新切分受影响的文档，
+    查询按 tf-idf 排序，同分时较新的日期在前。
+    英文查询词按前缀匹配（在有序词表上二分查找），边输入边搜索时不必打完整个单词。
+
+    保存的状态随历史线性增长，启动时只记下读取方法（defer_state），第一次查询时才恢复，
+    在此之前到来的变更先存起来，恢复后依次补上。
+    """
+
+    name = 'search'
+    lazy_state = True
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_terms = {}
+        self.day_docs = {}
+        # postings 的全部词，保持有序，用于前缀查找
+        self.terms = []
+        self._read_state = None
+        self._deferred = []
+
+    @staticmethod
+    def task_doc(date: str, key: Tuple[str, str], copy: int = 1) -> str:
+        """同一天内容和创建时间都相同的任务按出现次序编号，第一个不带编号"""
+        created_at, text = key
+        kind = 't' if copy == 1 else f't{copy}'
+        return DOC_SEPARATOR.join((date, kind, created_at, text))
+
+    @staticmethod
+    def notes_doc(date: str) -> str:
+        return DOC_SEPARATOR.join((date, 'n'))
+
+    def _add_doc(self, doc: str, text: str) -> None:
+        self._remove_doc(doc)
+        terms = {}
+        for token in tokenize(text):
+            terms[token] = terms.get(token, 0) + 1
+        if not terms:
+            return
+        self.doc_terms[doc] = terms
+        self.day_docs.setdefault(doc.split(DOC_SEPARATOR, 1)[0], set()).add(doc)
+        for term, count in terms.items():
+            docs = self.postings.get(term)
+            if docs is None:
+                docs = self.postings[term] = {}
+                bisect.insort(self.terms, term)
+            docs[doc] = count
+
+    def _remove_doc(self, doc: str) -> None:
+        terms = self.doc_terms.pop(doc, None)
+        if terms is None:
+            return
+        date = doc.split(DOC_SEPARATOR, 1)[0]
+        self.day_docs[date].discard(doc)
+        if not self.day_docs[date]:
+            del self.day_docs[date]
+        for term in terms:
+            docs = self.postings[term]
+            docs.pop(doc, None)
+            if not docs:
+                del self.postings[term]
+                del self.terms[bisect.bisect_left(self.terms, term)]
+
+    def _add_task(self, date: str, task: Task) -> None:
+        key = task_key(task)
+        copy = 1
+        while self.task_doc(date, key, copy) in self.doc_terms:
+            copy += 1
+        self._add_doc(self.task_doc(date, key, copy), task.text)
+
+    def _remove_task(self, date: str, key: Tuple[str, str]) -> None:
+        """重复的任务内容相同，删去编号最大的一个即可"""
+        copy = 1
+        while self.task_doc(date, key, copy + 1) in self.doc_terms:
+            copy += 1
+        self._remove_doc(self.task_doc(date, key, copy))
+
+    def _index_day(self, date: str, record: Day) -> None:
+        for doc in list(self.day_docs.get(date, ())):
+            self._remove_doc(doc)
+        for task in record.tasks:
+            self._add_task(date, task)
+        self._add_doc(self.notes_doc(date), record.notes)
+
+    def build(self, data: Dict[str, Day]) -> None:
+        self.postings = {}
+        self.doc_terms = {}
+        self.day_docs = {}
+        self.terms = []
+        self._read_state = None
+        self._deferred = []
+        for date in data.keys():
+            self._index_day(date, data[date])
+
+    def defer_state(self, read_state: Callable[[], Dict[str, Dict[str, int]]]) -> None:
+        """记下读取保存状态的方法，第一次用到索引时再恢复"""
+        self._read_state = read_state
+        self._deferred = []
+
+    def _restore(self) -> None:
+        if self._read_state is None:
+            return
+        read_state, self._read_state = self._read_state, None
+        self.load_state(read_state())
+        deferred, self._deferred = self._deferred, []
+        for change in deferred:
+            self.observe(change)
+
+    def observe(self, change: Dict[str, Any]) -> None:
+        """只重新索引这条变更涉及的文档"""
+        if self._read_state is not None:
+            self._deferred.append(change)
+            return
+        op = change['op']
+        date = change['date']
+        if op == 'day':
+            # 与 apply_change 相同：已有记录时只补上对方独有的任务，已有的备注不被覆盖
+            record = Day.from_json(change['record'])
+            known = {task_key(task) for task in record.tasks
+                     if self.task_doc(date, task_key(task)) in self.doc_terms}
+            for task in record.tasks:
+                if task_key(task) not in known:
+                    self._add_task(date, task)
+            if self.notes_doc(date) not in self.doc_terms:
+                self._add_doc(self.notes_doc(date), record.notes)
+        elif op == 'add':
+            self._add_task(date, Task.from_json(change['task']))
+        elif op == 'delete' and 'key' in change:
+            self._remove_task(date, tuple(change['key']))
+        elif op == 'notes':
+            self._add_doc(self.notes_doc(date), change['notes'])
+
+    def matching(self, token: str) -> Dict[str, int]:
+        """查询词对应的倒排表：中文词精确匹配，其余把以它开头的所有词的倒排表合在一起"""
+        self._restore()
+        if CJK_PATTERN.match(token):
+            return self.postings.get(token, {})
+        start = bisect.bisect_left(self.terms, token)
+        end = bisect.bisect_left(self.terms, token + '\uffff', start)
+        if end - start == 1:
+            return self.postings[self.terms[start]]
+        merged = {}
+        for term in self.terms[start:end]:
+            for doc, count in self.postings[term].items():
+                merged[doc] = merged.get(doc, 0) + count
+        return merged
+
+    def search(self, query: str, limit: int = 50,
+               notes_text: Optional[Callable[[str], str]] = None) -> List[SearchHit]:
+        """返回同时包含全部查询词的文档，notes_text 用于按日期取回备注原文"""
+        self._restore()
+        postings = {token: self.matching(token) for token in tokenize(query, for_query=True)}
+        if not postings or not all(postings.values()):
+            return []
+
+        # 从最稀有的词开始求交集
+        terms = sorted(postings, key=lambda term: len(postings[term]))
+        candidates = set(postings[terms[0]])
+        for term in terms[1:]:
+            candidates.intersection_update(postings[term])
+            if not candidates:
+                return []
+
+        total = len(self.doc_terms)
+        weights = {term: math.log(1 + total / len(postings[term])) for term in terms}
+        scores = {doc: sum(postings[term][doc] * weights[term] for term in terms) for doc in candidates}
+        ranked = sorted(candidates, key=lambda doc: (scores[doc], doc), reverse=True)
+
+        hits = []
+        for doc in ranked[:limit]:
+            parts = doc.split(DOC_SEPARATOR, 3)
+            date, is_task = parts[0], parts[1].startswith('t')
+            if is_task:
+                text = parts[3]
+            else:
+                text = notes_text(date) if notes_text else ''
+            hits.append(SearchHit(date, 'task' if is_task else 'notes', text, scores[doc]))
+        return hits
+
+    def to_state(self) -> Dict[str, Dict[str, int]]:
+        self._restore()
+        return self.doc_terms
+
+    def load_state(self, state: Dict[str, Dict[str, int]]) -> None:
+        """只保存每个文档的词频，倒排表在加载时重建，不必重新切词"""
+        self._read_state = None
+        self.postings = {}
+        self.doc_terms = state
+        self.day_docs = {}
+        for doc, terms in state.items():
+            self.day_docs.setdefault(doc.split(DOC_SEPARATOR, 1)[0], set()).add(doc)
+            for term, count in terms.items():
+                self.postings.setdefault(term, {})[doc] = count
+        self.terms = sorted(self.postings)
+
+
+# 每日统计的各项，按顺序存成整数列表
+STAT_FIELDS = ('days', 'tasks', 'done', 'added', 'carried', 'open_age', 'done_age')
+DAYS, TASKS, DONE, ADDED, CARRIED, OPEN_AGE, DONE_AGE = range(len(STAT_FIELDS))
+PERIODS = ('day', 'week', 'month')
+
+
+@lru_cache(maxsize=8192)
+def day_number(text: str) -> int:
+    """'2024-11-01' 或 '2024-11-01 13:42:59' -> 日序号；无法解析时返回 -1"""
+    try:
+        return Date.fromisoformat(text[:10]).toordinal()
+    except (TypeError, ValueError):
+        return -1
+
+
+@lru_cache(maxsize=4096)
+def week_of(date: str) -> str:
+    """'2024-11-01' -> ISO 周 '2024-W44'"""
+    year, week, _ = Date.fromisoformat(date).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def summarize(stats: List[int]) -> Dict[str, Optional[float]]:
+    """把累计值换算成报表指标，分母为零的指标为 None"""
+
+    def ratio(numerator: int, denominator: int) -> Optional[float]:
+        return numerator / denominator if denominator else None
+
+    open_tasks = stats[TASKS] - stats[DONE]
+    return {
+        'days': stats[DAYS],
+        'tasks': stats[TASKS],
+        'done': stats[DONE],
+        'added': stats[ADDED],
+        'completion_rate': ratio(stats[DONE], stats[TASKS]),
+        'tasks_per_day': ratio(stats[ADDED], stats[DAYS]),
+        'carry_over_age': ratio(stats[OPEN_AGE], open_tasks),
+        'time_to_complete': ratio(stats[DONE_AGE], stats[DONE]),
+    }
+
+
+class RollupIndex:
+    """效率统计的日、周、月汇总
+
+    每天记录：有记录的天数、任务数、完成数、当天新建数、顺延数、未完成任务的累计天龄、
+    完成任务从创建到完成的累计天数（完成日按完成时所在的记录日计算）。
+    变更只调整受影响那一天及其所在周、月的计数，区间查询由整月汇总加两端零散日期拼成。
+    两个实例同时创建同一天记录时，合并进来的任务不计入统计（极少见，重建索引即可纠正）。
+    创建时间为空或无法解析的任务不计入任何一项，以免天龄失真。
+    """
+
+    name = 'rollups'
+
+    def __init__(self):
+        self.daily = {}
+        self.weekly = {}
+        self.monthly = {}
+        # daily 的全部日期，保持有序，按日列出时直接切片
+        self.days = []
+
+    def _bucket(self, table: Dict[str, List[int]], key: str) -> List[int]:
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = [0] * len(STAT_FIELDS)
+        return stats
+
+    def _add(self, date: str, delta: List[int]) -> None:
+        if date not in self.daily:
+            bisect.insort(self.days, date)
+        for stats in (self._bucket(self.daily, date), self._bucket(self.weekly, week_of(date)),
+                      self._bucket(self.monthly, date[:7])):
+            for i, value in enumerate(delta):
+                stats[i] += value
+
+    def _task_delta(self, date: str, created_at: str, status: bool, sign: int = 1) -> List[int]:
+        """一个任务对当天统计的贡献；没有有效创建时间的任务算不出天龄，不计入统计"""
+        delta = [0] * len(STAT_FIELDS)
+        created = day_number(created_at)
+        if created < 0:
+            return delta
+        age = max(0, day_number(date) - created)
+        delta[TASKS] = sign
+        if created_at[:10] == date:
+            delta[ADDED] = sign
+        else:
+            delta[CARRIED] = sign
+        if status:
+            delta[DONE] = sign
+            delta[DONE_AGE] = sign * age
+        else:
+            delta[OPEN_AGE] = sign * age
+        return delta
+
+    def _touch(self, date: str) -> None:
+        """第一次出现的日期计入天数"""
+        if date not in self.daily:
+            delta = [0] * len(STAT_FIELDS)
+            delta[DAYS] = 1
+            self._add(date, delta)
+
+    def build(self, data: Dict[str, Day]) -> None:
+        self.daily = {}
+        self.weekly = {}
+        self.monthly = {}
+        self.days = []
+        for date in data.keys():
+            self._touch(date)
+            for task in data.get(date).tasks:
+                self._add(date, self._task_delta(date, task.created_at, task.status))
+
+    def observe(self, change: Dict[str, Any]) -> None:
+        """按变更调整当天的计数"""
+        op = change['op']
+        date = change['date']
+        if op == 'day':
+            if date in self.daily:
+                return
+            self._touch(date)
+            for task in change['record']['tasks']:
+                self._add(date, self._task_delta(date, task['created_at'], task['status']))
+            return
+
+        self._touch(date)
+        if op == 'add':
+            task = change['task']
+            self._add(date, self._task_delta(date, task['created_at'], task['status']))
+        elif op == 'status' and 'key' in change:
+            created_at = change['key'][0]
+            # 切换状态：去掉旧状态的贡献，加上新状态的贡献
+            self._add(date, self._task_delta(date, created_at, not change['status'], -1))
+            self._add(date, self._task_delta(date, created_at, change['status']))
+        elif op == 'delete' and 'key' in change:
+            self._add(date, self._task_delta(date, change['key'][0], change.get('status', False), -1))
+
+    def range(self, start: str, end: str) -> List[int]:
+        """[start, end] 范围内的累计值：完整的月份直接取月汇总，其余逐日相加"""
+        total = [0] * len(STAT_FIELDS)
+
+        def add(stats: Optional[List[int]]) -> None:
+            if stats:
+                for i, value in enumerate(stats):
+                    total[i] += value
+
+        year, month = int(start[:4]), int(start[5:7])
+        while f"{year:04d}-{month:02d}" <= end[:7]:
+            key = f"{year:04d}-{month:02d}"
+            first, last = key + '-01', key + '-31'
+            if start <= first and last <= end:
+                add(self.monthly.get(key))
+            else:
+                for day in range(1, 32):
+                    date = f"{key}-{day:02d}"
+                    if start <= date <= end:
+                        add(self.daily.get(date))
+            month += 1
+            if month > 12:
+                year, month = year + 1, 1
+        return total
+
+    def series(self, start: str, end: str, period: str = 'day') -> List[Tuple[str, List[int]]]:
+        """按日、周或月分组列出范围内有记录的各段累计值；首尾不完整的周、月只统计范围内的日期"""
+        if period == 'day':
+            days = self.days[bisect.bisect_left(self.days, start):bisect.bisect_right(self.days, end)]
+            return [(date, self.daily[date]) for date in days]
+        if period not in PERIODS:
+            raise ValueError(f"未知的统计周期: {period}")
+
+        table = self.weekly if period == 'week' else self.monthly
+        first, last = Date.fromisoformat(start), Date.fromisoformat(end)
+        result = []
+        current = first
+        while current <= last:
+            if period == 'week':
+                period_start = current - timedelta(days=current.weekday())
+                period_end = period_start + timedelta(days=6)
+                label = week_of(current.isoformat())
+            else:
+                period_start = current.replace(day=1)
+                period_end = (period_start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+                label = current.isoformat()[:7]
+            if first <= period_start and period_end <= last:
+                stats = table.get(label)
+            else:
+                stats = self.range(max(period_start, first).isoformat(), min(period_end, last).isoformat())
+            if stats and stats[DAYS]:
+                result.append((label, stats))
+            current = period_end + timedelta(days=1)
+        return result
+
+    def to_state(self) -> Dict[str, List[int]]:
+        return self.daily
+
+    def load_state(self, state: Dict[str, List[int]]) -> None:
+        """只保存每日计数，周、月汇总在加载时累加得到"""
+        self.daily = {}
+        self.weekly = {}
+        self.monthly = {}
+        self.days = []
+        for date, stats in state.items():
+            self._add(date, stats)
+
+
+# 应用使用的全部派生索引
+INDEX_TYPES = [OpenTaskIndex, DateIndex, SearchIndex, RollupIndex]
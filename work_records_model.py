@@ -0,0 +1,83 @@
+"""每日工作记录的内存模型
+
+任务和单日记录使用 __slots__ 类，不再为每个任务保留一个字典；
+任务内容和创建时间通过 sys.intern 共享（顺延到几百天的同一任务只存一份文字）。
+创建时间保留文件中的原始字符串，保存时逐字节写回。
+与 work_records.json 的格式互相转换，文件格式保持不变。
+"""
+import sys
+from typing import Dict, List, Any, Optional
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class Task:
+    """单个待办事项"""
+
+    __slots__ = ('text', 'status', 'created_at')
+
+    def __init__(self, text: str, status: bool = False, created_at: str = ''):
+        self.text = sys.intern(text)
+        self.status = status
+        self.created_at = sys.intern(created_at) if isinstance(created_at, str) else created_at
+
+    @classmethod
+    def from_json(cls, obj: Dict[str, Any]) -> 'Task':
+        return cls(obj['text'], bool(obj['status']), obj.get('created_at', ''))
+
+    def to_json(self) -> Dict[str, Any]:
+        return {'text': self.text, 'status': self.status, 'created_at': self.created_at}
+
+    def copy(self) -> 'Task':
+        return Task(self.text, self.status, self.created_at)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Task):
+            return NotImplemented
+        return (self.text, self.status, self.created_at) == (other.text, other.status, other.created_at)
+
+    def __repr__(self) -> str:
+        return f"Task({self.text!r}, {self.status!r}, {self.created_at!r})"
+
+
+class Day:
+    """单日记录：待办事项列表和备注"""
+
+    __slots__ = ('tasks', 'notes')
+
+    def __init__(self, tasks: Optional[List[Task]] = None, notes: str = ''):
+        self.tasks = tasks if tasks is not None else []
+        self.notes = notes
+
+    @classmethod
+    def from_json(cls, obj: Dict[str, Any]) -> 'Day':
+        return cls([Task.from_json(task) for task in obj.get('tasks', [])], obj.get('notes', ''))
+
+    def to_json(self) -> Dict[str, Any]:
+        return {'tasks': [task.to_json() for task in self.tasks], 'notes': self.notes}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Day):
+            return NotImplemented
+        return self.tasks == other.tasks and self.notes == other.notes
+
+    def __repr__(self) -> str:
+        return f"Day({self.tasks!r}, {self.notes!r})"
+
+
+def json_object_hook(obj: Dict[str, Any]) -> Any:
+    """json.load 的 object_hook：解析时直接构造模型对象，不留中间字典"""
+    if 'text' in obj and 'status' in obj:
+        return Task(obj['text'], bool(obj['status']), obj.get('created_at', ''))
+    if 'tasks' in obj:
+        return Day(obj['tasks'], obj.get('notes', ''))
+    return obj
+
+
+def json_default(obj: Any) -> Any:
+    """json.dump 的 default：模型对象按原有文件格式输出"""
+    if isinstance(obj, Task):
+        return {'text': obj.text, 'status': obj.status, 'created_at': obj.created_at}
+    if isinstance(obj, Day):
+        return {'tasks': obj.tasks, 'notes': obj.notes}
+    raise TypeError(f"无法序列化 {type(obj).__name__}")
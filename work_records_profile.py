@@ -0,0 +1,205 @@
+"""每日工作记录的性能观测（默认关闭）
+
+设置环境变量 WORK_RECORDS_PROFILE=1 或以 --profile 启动时打开：
+主要操作记录耗时分布，写入线程记录每次写入的字节数，行控件记录创建和销毁次数，
+root.after 心跳测量事件循环的卡顿。慢操作和周期汇总写入滚动日志 work_records_profile.log，
+Ctrl+Shift+D 打开调试面板查看分位数。关闭时每个被观测的调用只多一次属性判断。
+"""
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Any, Callable, Optional
+
+import tkinter as tk
+from tkinter import ttk
+
+# 超过这个耗时（毫秒）的操作和卡顿单独写一条日志
+SLOW_MS = 100
+# 每项指标保留的最近样本数
+SAMPLE_LIMIT = 2000
+
+logger = logging.getLogger('work_records.profile')
+
+
+def profiling_requested() -> bool:
+    return os.environ.get('WORK_RECORDS_PROFILE', '') not in ('', '0') or '--profile' in sys.argv
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Profiler:
+    """线程安全的指标收集：耗时等数值样本保留最近 SAMPLE_LIMIT 个，计数器只累加"""
+
+    def __init__(self):
+        self.enabled = False
+        self.samples = {}
+        self.totals = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, value: float) -> None:
+        with self._lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=SAMPLE_LIMIT)
+            samples.append(value)
+            self.totals[name] = self.totals.get(name, 0) + 1
+        if name.endswith('_ms') and value >= SLOW_MS:
+            logger.warning("慢操作 %s %.1f ms", name, value)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples = {}
+            self.totals = {}
+            self.counters = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """各项指标的调用次数和 p50/p90/p99/最大值，以及计数器"""
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self.samples.items() if values}
+            totals = dict(self.totals)
+            counters = dict(self.counters)
+        stats = {
+            name: {
+                'count': totals[name],
+                'p50': percentile(ordered, 0.50),
+                'p90': percentile(ordered, 0.90),
+                'p99': percentile(ordered, 0.99),
+                'max': ordered[-1],
+            }
+            for name, ordered in samples.items()
+        }
+        return {'stats': stats, 'counters': counters}
+
+
+PROFILER = Profiler()
+
+
+def profiled(name: str) -> Callable[[Callable], Callable]:
+    """方法装饰器：观测打开时把每次调用的耗时记为 <name>_ms"""
+    metric = name + '_ms'
+
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.record(metric, (time.perf_counter() - started) * 1000)
+        return wrapper
+
+    return decorate
+
+
+class Heartbeat:
+    """用 root.after 定时打点，实际触发时刻比预定时刻晚多少即事件循环被阻塞了多久"""
+
+    INTERVAL = 50
+    # 周期汇总写入日志的间隔（秒）
+    SUMMARY_INTERVAL = 60
+
+    def __init__(self, root: tk.Misc, profiler: Profiler = PROFILER):
+        self.root = root
+        self.profiler = profiler
+        self.expected = 0.0
+        self.next_summary = time.monotonic() + self.SUMMARY_INTERVAL
+
+    def start(self) -> None:
+        self.expected = time.perf_counter() + self.INTERVAL / 1000
+        self.root.after(self.INTERVAL, self.beat)
+
+    def beat(self) -> None:
+        now = time.perf_counter()
+        self.profiler.record('event_loop_stall_ms', max(0.0, (now - self.expected) * 1000))
+        if time.monotonic() >= self.next_summary:
+            self.next_summary = time.monotonic() + self.SUMMARY_INTERVAL
+            log_summary(self.profiler)
+        self.expected = now + self.INTERVAL / 1000
+        self.root.after(self.INTERVAL, self.beat)
+
+
+def log_summary(profiler: Profiler = PROFILER) -> None:
+    snapshot = profiler.snapshot()
+    for name, stats in sorted(snapshot['stats'].items()):
+        logger.info("%s n=%d p50=%.1f p90=%.1f p99=%.1f max=%.1f",
+                    name, stats['count'], stats['p50'], stats['p90'], stats['p99'], stats['max'])
+    for name, value in sorted(snapshot['counters'].items()):
+        logger.info("%s %d", name, value)
+
+
+def enable(root: tk.Misc, log_path: str) -> None:
+    """打开观测：滚动日志、心跳和控件销毁计数，Ctrl+Shift+D 打开调试面板"""
+    handler = RotatingFileHandler(log_path, maxBytes=1024 * 1024, backupCount=3, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    PROFILER.enabled = True
+    Heartbeat(root).start()
+    # Destroy 事件经过每个控件的 all 绑定标签，可以统计全部控件的销毁
+    root.bind_all('<Destroy>', lambda event: PROFILER.count('widgets_destroyed'), add='+')
+    root.bind_all('<Control-Shift-D>', lambda event: DebugPanel(root))
+    root.bind_all('<Control-Shift-d>', lambda event: DebugPanel(root))
+    logger.info("性能观测已打开")
+
+
+def count_widgets(widget: tk.Misc) -> int:
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+class DebugPanel:
+    """每秒刷新一次的指标面板"""
+
+    REFRESH_INTERVAL = 1000
+
+    def __init__(self, root: tk.Misc):
+        self.root = root
+        self.window = tk.Toplevel(root)
+        self.window.title("性能观测")
+        self.window.geometry("620x420")
+
+        button_frame = ttk.Frame(self.window, padding="5")
+        button_frame.pack(fill='x')
+        self.widget_label = ttk.Label(button_frame)
+        self.widget_label.pack(side='left')
+        ttk.Button(button_frame, text="清零", command=PROFILER.reset).pack(side='right')
+        ttk.Button(button_frame, text="写入日志", command=log_summary).pack(side='right', padx=5)
+
+        columns = ("count", "p50", "p90", "p99", "max")
+        self.table = ttk.Treeview(self.window, columns=columns, show="tree headings")
+        self.table.heading("#0", text="指标")
+        self.table.column("#0", width=200)
+        for column in columns:
+            self.table.heading(column, text=column)
+            self.table.column(column, width=70, anchor='e')
+        self.table.pack(fill='both', expand=True, padx=5, pady=5)
+        self.refresh()
+
+    def refresh(self) -> None:
+        if not self.window.winfo_exists():
+            return
+        snapshot = PROFILER.snapshot()
+        self.table.delete(*self.table.get_children())
+        for name, stats in sorted(snapshot['stats'].items()):
+            self.table.insert('', tk.END, text=name, values=(
+                stats['count'], f"{stats['p50']:.1f}", f"{stats['p90']:.1f}",
+                f"{stats['p99']:.1f}", f"{stats['max']:.1f}"
+            ))
+        for name, value in sorted(snapshot['counters'].items()):
+            self.table.insert('', tk.END, text=name, values=(value, '', '', '', ''))
+        self.widget_label.configure(text=f"当前控件数 {count_widgets(self.root)}")
+        self.window.after(self.REFRESH_INTERVAL, self.refresh)
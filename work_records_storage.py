@@ -0,0 +1,1162 @@
+"""每日工作记录的存储层
+
+默认使用 JSON 快照 + 追加式变更日志：快照文件 work_records.json 保持原有格式不变；
+每次增删任务、切换状态、修改备注只向 work_records.journal 追加一行很小的变更记录，
+写入成本与变更大小成正比，而不是与历史长度成正比。日志累计到一定条数后再折叠回快照。
+
+数据目录中存在 work_records.db 时改用 SQLite 存储，启动时只读取用到的日期。
+用 `python work_records_storage.py migrate` 可把现有 JSON 数据一次性迁移到 SQLite。
+
+同一份数据可以被多个程序实例同时打开：写入和折叠都在 work_records.lock 文件锁内进行，
+写入前先读出其他实例追加的变更交给界面合并，只刷新变更涉及的日期。
+"""
+import difflib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import MutableMapping
+from typing import Dict, List, Any, Iterator, Callable, Optional, Tuple, Sequence
+
+from work_records_model import Day, Task, json_default, json_object_hook
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# 日志累计多少条变更后折叠回快照
+DEFAULT_COMPACT_THRESHOLD = 500
+# 后台写入线程合并一批变更的时间窗口（秒）
+DEFAULT_WRITE_INTERVAL = 0.5
+# 空闲时检查其他实例写入的间隔（秒）
+DEFAULT_SYNC_INTERVAL = 2.0
+
+
+def task_key(task: Task) -> Tuple[str, str]:
+    """任务的身份：创建时间 + 内容。顺延到后续日期的副本身份不变"""
+    return task.created_at, task.text
+
+
+def find_task(tasks: List[Task], change: Dict[str, Any]) -> Optional[int]:
+    """定位变更针对的任务：优先按身份查找，位置只作提示
+
+    其他实例的变更可能使同一任务在两边的位置不同；找不到（例如已被删除）时返回 None。
+    """
+    index = change.get('index')
+    in_range = index is not None and 0 <= index < len(tasks)
+    if 'key' not in change:
+        return index if in_range else None
+    key = tuple(change['key'])
+    if in_range and task_key(tasks[index]) == key:
+        return index
+    for i, task in enumerate(tasks):
+        if task_key(task) == key:
+            return i
+    return None
+
+
+def merge_day(record: Day, incoming: Day) -> None:
+    """同一天被两个实例分别创建时合并：保留已有任务，补上对方独有的任务"""
+    known = {task_key(task) for task in record.tasks}
+    record.tasks.extend(task for task in incoming.tasks if task_key(task) not in known)
+    if not record.notes:
+        record.notes = incoming.notes
+
+
+def line_hunks(old: List[str], new: List[str]) -> List[Tuple[int, int, int, int]]:
+    """old 到 new 的改动块 (i1, i2, j1, j2)：old[i1:i2] 被换成 new[j1:j2]"""
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    return [(i1, i2, j1, j2) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def merge_text(base: str, ours: str, theirs: str) -> str:
+    """按行三方合并备注：base 是双方共同的起点
+
+    只有一方修改时直接取修改后的内容。双方都改时，两边相对 base 的改动块按位置合并：
+    只有一方改动的区域取该方的内容；两方改动重叠（或插在同一位置）时保留我方的内容，
+    再在后面补上对方新写、我方没有的行。行按位置对应，重复的行和空行不会删错。
+    """
+    if theirs == base or theirs == ours:
+        return ours
+    if ours == base:
+        return theirs
+    base_lines = base.split('\n')
+    sides = (ours.split('\n'), theirs.split('\n'))
+    hunks = sorted(
+        (hunk, side) for side, lines in enumerate(sides) for hunk in line_hunks(base_lines, lines)
+    )
+
+    result = []
+    position = 0
+    i = 0
+    while i < len(hunks):
+        # 相互重叠的改动块（以及插在同一位置的新行）归为一组，组内 base[lo:hi] 之外两边都与 base 相同
+        lo, hi = hunks[i][0][0], hunks[i][0][1]
+        group = ([], [])
+        while i < len(hunks) and (hunks[i][0][0] < hi or hunks[i][0][0] == hunks[i][0][1] == lo == hi):
+            hunk, side = hunks[i]
+            hi = max(hi, hunk[1])
+            group[side].append(hunk)
+            i += 1
+
+        regions = []
+        for lines, side_hunks in zip(sides, group):
+            if side_hunks:
+                first, last = side_hunks[0], side_hunks[-1]
+                regions.append(lines[first[2] - (first[0] - lo):last[3] + (hi - last[1])])
+            else:
+                regions.append(base_lines[lo:hi])
+
+        result.extend(base_lines[position:lo])
+        if not group[1] or regions[0] == regions[1]:
+            result.extend(regions[0])
+        elif not group[0]:
+            result.extend(regions[1])
+        else:
+            ours_new = Counter(line for hunk in group[0] for line in sides[0][hunk[2]:hunk[3]])
+            result.extend(regions[0])
+            for line in (line for hunk in group[1] for line in sides[1][hunk[2]:hunk[3]]):
+                if ours_new[line]:
+                    ours_new[line] -= 1
+                else:
+                    result.append(line)
+        position = hi
+    result.extend(base_lines[position:])
+    return '\n'.join(result)
+
+
+def apply_change(data: Dict[str, Day], change: Dict[str, Any]) -> None:
+    """将一条变更记录应用到内存中的数据"""
+    op = change['op']
+    date = change['date']
+    if op == 'day':
+        if date in data:
+            merge_day(data[date], Day.from_json(change['record']))
+        else:
+            data[date] = Day.from_json(change['record'])
+        return
+
+    record = data.setdefault(date, Day())
+    if op == 'add':
+        record.tasks.append(Task.from_json(change['task']))
+    elif op == 'status':
+        index = find_task(record.tasks, change)
+        if index is not None:
+            record.tasks[index].status = change['status']
+    elif op == 'delete':
+        index = find_task(record.tasks, change)
+        if index is not None:
+            del record.tasks[index]
+    elif op == 'notes':
+        record.notes = change['notes']
+    else:
+        raise ValueError(f"未知的变更类型: {op}")
+
+
+def apply_remote_change(data: Any, change: Dict[str, Any]) -> None:
+    """应用其他实例写入的变更
+
+    SQLite 中的表已由对方更新，只需修正已缓存在内存中的日期；未缓存的日期下次读取时自然是新的。
+    """
+    if isinstance(data, LazyRecords) and not data.is_cached(change['date']):
+        return
+    apply_change(data, change)
+
+
+class FileLock:
+    """跨进程的排他文件锁，用于 with 语句"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self) -> 'FileLock':
+        self._file = open(self.path, 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                while True:
+                    try:
+                        # LK_LOCK 最多等待约 10 秒，超时后继续等
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+        except BaseException:
+            self._file.close()
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def file_stamp(path: str) -> List[int]:
+    """返回文件的 [大小, 修改时间]，用于判断日志是否属于当前快照"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return [0, 0]
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_json_temp(path: str, obj: Any, **dump_options) -> Tuple[str, List[int]]:
+    """把数据写入 path 旁的临时文件，返回临时文件路径和它的时间戳"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(obj, file, ensure_ascii=False, default=json_default, **dump_options)
+        file.flush()
+        os.fsync(file.fileno())
+    return tmp_path, file_stamp(tmp_path)
+
+
+def write_json_atomic(path: str, obj: Any, **dump_options) -> List[int]:
+    """先写临时文件再重命名，返回写入文件的时间戳"""
+    tmp_path, stamp = write_json_temp(path, obj, **dump_options)
+    os.replace(tmp_path, path)
+    return stamp
+
+
+def build_indexes(index_types: Sequence[type], data: Any,
+                  states: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """创建派生索引：有保存的状态就直接恢复，否则从完整数据重建
+
+    states 中的状态是 JSON 文本。lazy_state 为真的索引（全文索引）状态很大，
+    启动时不解析，交给索引在第一次查询时再恢复。
+    """
+    states = states or {}
+    indexes = {}
+    for index_type in index_types:
+        index = index_type()
+        state = states.get(index.name)
+        if state is None:
+            index.build(data)
+        elif getattr(index, 'lazy_state', False):
+            index.defer_state(lambda state=state: json.loads(state))
+        else:
+            index.load_state(json.loads(state))
+        indexes[index.name] = index
+    return indexes
+
+
+class JournalStore:
+    """快照 + 追加日志存储
+
+    日志第一行记录它所基于的快照时间戳。快照被重写后旧日志自动失效，
+    这样即使在折叠过程中崩溃，也不会把已经折叠进快照的变更重放两次。
+    派生索引（如未完成任务索引）在折叠时一并保存到 work_records.index.json，
+    同样带有快照时间戳；加载时在其基础上重放日志即可，无需扫描全部历史。
+
+    折叠时旧日志改名为 work_records.journal.prev 保留一代，新日志表头记下它的时间戳，
+    这样其他实例即使错过了折叠，也能从旧日志读完自己没见过的变更，无需整体重新加载。
+    """
+
+    # 关闭时可以直接用内存中的完整数据生成快照
+    snapshot_compaction = True
+    # 无法只读取某一天，启动时必须整体加载
+    partial_load = False
+
+    def __init__(self, snapshot_path: str, index_types: Sequence[type] = (),
+                 compact_threshold: int = DEFAULT_COMPACT_THRESHOLD):
+        self.snapshot_path = snapshot_path
+        base_path = os.path.splitext(snapshot_path)[0]
+        self.journal_path = base_path + '.journal'
+        self.previous_path = self.journal_path + '.prev'
+        self.index_path = base_path + '.index.json'
+        self.lock_path = base_path + '.lock'
+        self.index_types = list(index_types)
+        self.compact_threshold = compact_threshold
+        self.journal_length = 0
+        # 已读到（或写到）的日志位置：所基于的快照时间戳和字节偏移
+        self.journal_base = None
+        self.journal_offset = 0
+        self._journal_valid = False
+
+    def load(self) -> Tuple[Dict[str, Day], Dict[str, Any]]:
+        """读取快照并重放日志，返回数据和派生索引"""
+        data = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as file:
+                data = json.load(file, object_hook=json_object_hook)
+        indexes = build_indexes(self.index_types, data, self._read_index_states())
+
+        self.journal_length = 0
+        for change in self._read_journal():
+            apply_change(data, change)
+            for index in indexes.values():
+                index.observe(change)
+            self.journal_length += 1
+        return data, indexes
+
+    def _read_index_states(self) -> Dict[str, Any]:
+        """读取与当前快照对应的索引状态，过期或损坏时返回空"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if saved.get('base') != file_stamp(self.snapshot_path):
+            return {}
+        # 每个索引的状态单独存成 JSON 文本；旧版本直接存对象，重建一次即可
+        return {name: state for name, state in saved.get('indexes', {}).items() if isinstance(state, str)}
+
+    @staticmethod
+    def _read_header(path: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """读取日志表头和它的字节长度，文件不存在或表头损坏时返回 (None, 0)"""
+        try:
+            with open(path, 'rb') as file:
+                line = file.readline()
+        except FileNotFoundError:
+            return None, 0
+        try:
+            return json.loads(line), len(line)
+        except ValueError:
+            return None, 0
+
+    def _read_from(self, path: str, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """读取 offset 之后的完整日志行，返回变更和读到的位置
+
+        写入中途崩溃留下的半行会被截掉，后续追加才不会接在残行后面。
+        """
+        changes = []
+        with open(path, 'rb') as file:
+            file.seek(offset)
+            for line in file:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError
+                    changes.append(json.loads(line))
+                except ValueError:
+                    with open(path, 'r+b') as damaged:
+                        damaged.truncate(offset)
+                    break
+                offset += len(line)
+        return changes, offset
+
+    def _read_journal(self) -> List[Dict[str, Any]]:
+        """读取属于当前快照的全部日志记录"""
+        self.journal_base = file_stamp(self.snapshot_path)
+        self.journal_offset = 0
+        self._journal_valid = False
+        header, header_size = self._read_header(self.journal_path)
+        if header is None or header.get('base') != self.journal_base:
+            # 没有日志，或日志属于旧快照，其中的变更已经折叠过了
+            return []
+        self._journal_valid = True
+        changes, self.journal_offset = self._read_from(self.journal_path, header_size)
+        return changes
+
+    def read_foreign(self) -> Optional[List[Dict[str, Any]]]:
+        """读取其他实例在本实例上次读写之后追加的变更（须在文件锁内调用）
+
+        其他实例折叠过一次时从保留的旧日志读完剩余部分；错过不止一次折叠时返回 None，
+        表示只能整体重新加载。
+        """
+        stamp = file_stamp(self.snapshot_path)
+        if stamp == self.journal_base:
+            try:
+                if os.path.getsize(self.journal_path) == self.journal_offset:
+                    return []
+            except FileNotFoundError:
+                return []
+
+        header, header_size = self._read_header(self.journal_path)
+        if header is None or header.get('base') != stamp:
+            # 快照之后还没有有效日志
+            if stamp == self.journal_base:
+                return []
+            self.journal_base = stamp
+            self.journal_offset = 0
+            self._journal_valid = False
+            return None
+
+        changes = []
+        if header['base'] != self.journal_base:
+            previous, _ = self._read_header(self.previous_path)
+            if (header.get('previous') != self.journal_base or previous is None
+                    or previous.get('base') != self.journal_base):
+                self.journal_base = stamp
+                self.journal_offset = os.path.getsize(self.journal_path)
+                self._journal_valid = True
+                return None
+            changes, _ = self._read_from(self.previous_path, self.journal_offset)
+            self.journal_base = stamp
+            self.journal_offset = 0
+
+        self._journal_valid = True
+        more, self.journal_offset = self._read_from(self.journal_path, max(self.journal_offset, header_size))
+        changes.extend(more)
+        self.journal_length += len(changes)
+        return changes
+
+    def _start_journal(self, base: List[int], previous: Optional[List[int]] = None) -> None:
+        """为指定快照新建只含表头的空日志"""
+        header = {'base': base}
+        if previous is not None:
+            header['previous'] = previous
+        tmp_path = self.journal_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(header) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self.journal_base = base
+        self.journal_offset = os.path.getsize(self.journal_path)
+        self.journal_length = 0
+        self._journal_valid = True
+
+    def append(self, changes: List[Dict[str, Any]]) -> int:
+        """把一批变更追加到日志末尾，返回写入的字节数"""
+        if not changes:
+            return 0
+        if not self._journal_valid:
+            self._start_journal(file_stamp(self.snapshot_path))
+        lines = ''.join(json.dumps(change, ensure_ascii=False) + '\n' for change in changes).encode('utf-8')
+        with open(self.journal_path, 'ab') as file:
+            offset = file.tell()
+            try:
+                file.write(lines)
+                file.flush()
+                os.fsync(file.fileno())
+            except OSError:
+                # 回滚到写入前的长度，调用方可以安全地重试整批变更
+                file.truncate(offset)
+                raise
+            self.journal_offset = file.tell()
+        self.journal_length += len(changes)
+        return len(lines)
+
+    def needs_compaction(self) -> bool:
+        """日志是否已经长到需要折叠"""
+        return self.journal_length >= self.compact_threshold
+
+    def release_connection(self) -> None:
+        """与 SQLiteStore 接口一致；文件存储没有需要关闭的连接"""
+
+    def compact(self, data: Dict[str, Day], indexes: Optional[Dict[str, Any]] = None) -> int:
+        """把内存中的完整数据写成新快照，并清空日志，返回快照的字节数"""
+        tmp_path, stamp = write_json_temp(self.snapshot_path, data, indent=4)
+        if indexes:
+            # 先写索引再替换快照：中途崩溃时索引时间戳对不上，只会触发一次重建
+            write_json_atomic(self.index_path, {
+                'base': stamp,
+                'indexes': {name: json.dumps(index.to_state(), ensure_ascii=False) for name, index in indexes.items()}
+            })
+        os.replace(tmp_path, self.snapshot_path)
+        previous = None
+        if self._journal_valid:
+            # 保留旧日志，供还没读完它的其他实例继续读取
+            os.replace(self.journal_path, self.previous_path)
+            previous = self.journal_base
+        self._start_journal(stamp, previous)
+        return stamp[0]
+
+
+def coalesce_changes(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """合并一批变更：同一天连续的备注修改只保留最后一次"""
+    result = []
+    overridden = set()
+    for change in reversed(changes):
+        date = change['date']
+        if change['op'] == 'notes':
+            if date in overridden:
+                continue
+            overridden.add(date)
+        elif change['op'] == 'day':
+            overridden.add(date)
+        result.append(change)
+    result.reverse()
+    return result
+
+
+class PersistenceWorker:
+    """后台写入线程
+
+    界面线程只负责把变更放进队列；写入线程在 interval 秒内收集一批变更，
+    合并后一次性追加到日志，日志过长时从磁盘折叠出新快照。
+    写入失败时整批变更保留在队列中等待重试，错误通过 on_error 回调通知界面。
+
+    每次写入前（空闲时每 sync_interval 秒）在文件锁内读取其他实例追加的变更，
+    通过 on_remote 交给界面合并；错过太多无法增量合并时，把重新加载的数据交给 on_reload，
+    并暂停写入，直到界面把还没写入的变更重新应用到新数据上、调用 reload_applied 为止。
+    每批变更写入日志后把这一批交给 on_commit，界面据此确认哪些变更已经落盘。
+    on_write 在每次追加或折叠后收到 (类型, 字节数, 秒)，用于性能观测。
+    """
+
+    def __init__(self, store: JournalStore, interval: float = DEFAULT_WRITE_INTERVAL,
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 on_remote: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 on_reload: Optional[Callable[[Any, Dict[str, Any]], None]] = None,
+                 sync_interval: float = DEFAULT_SYNC_INTERVAL,
+                 on_write: Optional[Callable[[str, int, float], None]] = None,
+                 on_commit: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        self.store = store
+        self.interval = interval
+        self.on_error = on_error
+        self.on_remote = on_remote
+        self.on_reload = on_reload
+        self.sync_interval = sync_interval
+        self.on_write = on_write
+        self.on_commit = on_commit
+        self._pending = []
+        self._compact_requested = False
+        self._final_snapshot = None
+        self._final_indexes = None
+        self._closing = False
+        self._failing = False
+        # 本次运行中是否合并过其他实例的变更；合并过就不能再用内存数据直接生成快照
+        self._saw_remote = False
+        self._reload_needed = False
+        # 重新加载的数据已交给界面、界面还没处理完
+        self._reload_pending = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="work-records-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, change: Dict[str, Any]) -> None:
+        """提交一条变更，立即返回"""
+        with self._condition:
+            self._pending.append(change)
+            self._condition.notify()
+
+    def request_compaction(self) -> None:
+        """请求在下一批写入后把日志折叠回快照"""
+        with self._condition:
+            self._compact_requested = True
+            self._condition.notify()
+
+    def reload_applied(self) -> None:
+        """界面已换用 on_reload 给出的数据，可以继续写入"""
+        with self._condition:
+            self._reload_pending = False
+            self._condition.notify()
+
+    def close(self, final_snapshot: Optional[Dict[str, Any]] = None,
+              final_indexes: Optional[Dict[str, Any]] = None) -> bool:
+        """写完所有待写变更后退出线程，返回是否全部写入成功
+
+        final_snapshot / final_indexes 是界面不再修改的完整数据和索引，
+        给出时直接用它们生成快照，省去从磁盘重新读取。
+        """
+        with self._condition:
+            self._closing = True
+            self._final_snapshot = final_snapshot
+            self._final_indexes = final_indexes
+            self._condition.notify()
+        self._thread.join()
+        return not self._pending
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        """等待第一条变更到来，再等满一个时间窗口收集后续变更
+
+        空闲超过 sync_interval 时返回空批次，用于检查其他实例的写入。
+        """
+        with self._condition:
+            # 新数据不含重新加载之后写入的变更，界面换用新数据之前不再写入
+            while self._reload_pending and not self._closing:
+                self._condition.wait()
+            if not self._pending and not self._compact_requested and not self._closing:
+                self._condition.wait(self.sync_interval)
+            if self._pending or self._compact_requested:
+                deadline = time.monotonic() + self.interval
+                while not self._closing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            batch = self._pending
+            self._pending = []
+            return batch
+
+    def _requeue(self, batch: List[Dict[str, Any]]) -> None:
+        """写入失败的变更放回队首，保持原有顺序"""
+        with self._condition:
+            self._pending[:0] = batch
+
+    def _report(self, error: Exception) -> None:
+        """同一段连续失败只通知一次，避免重试时反复弹窗"""
+        if not self._failing and self.on_error is not None:
+            self.on_error(error)
+        self._failing = True
+
+    def _timed(self, kind: str, operation: Callable[..., int], *args) -> None:
+        """执行一次写入，并把字节数和耗时交给 on_write"""
+        started = time.perf_counter()
+        size = operation(*args)
+        if self.on_write is not None:
+            self.on_write(kind, size, time.perf_counter() - started)
+
+    def _sync(self) -> None:
+        """读取其他实例追加的变更并交给界面（在文件锁内调用）"""
+        changes = self.store.read_foreign()
+        if changes is None:
+            self._saw_remote = True
+            self._reload_needed = True
+        elif changes:
+            self._saw_remote = True
+            if self.on_remote is not None:
+                self.on_remote(changes)
+
+    def _write(self, batch: List[Dict[str, Any]], closing: bool,
+               final_snapshot: Optional[Dict[str, Any]], final_indexes: Optional[Dict[str, Any]]) -> None:
+        """在文件锁内同步、写入并按需折叠；只有追加日志失败时抛出异常"""
+        self._sync()
+        if self._saw_remote:
+            # 界面可能还没合并完其他实例的变更，快照必须从磁盘生成
+            final_snapshot = None
+
+        if closing and final_snapshot is not None and self.store.snapshot_compaction:
+            # 完整快照已包含所有变更，不必再写日志
+            try:
+                self._timed('compact', self.store.compact, final_snapshot, final_indexes)
+                return
+            except Exception as e:
+                self._report(e)
+
+        if batch:
+            self._timed('append', self.store.append, batch)
+            if self.on_commit is not None:
+                self.on_commit(batch)
+        self._failing = False
+
+        with self._condition:
+            compact = self._compact_requested or self.store.needs_compaction()
+            self._compact_requested = False
+        try:
+            if closing and final_snapshot is not None:
+                self._timed('compact', self.store.compact, final_snapshot, final_indexes)
+            elif compact or (closing and self.store.journal_length):
+                self._timed('compact', self.store.compact, *self.store.load())
+            if self._reload_needed and not closing:
+                data, indexes = self.store.load()
+                self._reload_needed = False
+                if self.on_reload is not None:
+                    with self._condition:
+                        self._reload_pending = True
+                    self.on_reload(data, indexes)
+        except Exception as e:
+            self._report(e)
+
+    def _run(self) -> None:
+        try:
+            self._loop()
+        finally:
+            self.store.release_connection()
+
+    def _loop(self) -> None:
+        while True:
+            batch = coalesce_changes(self._take_batch())
+            with self._condition:
+                closing = self._closing
+                final_snapshot = self._final_snapshot
+                final_indexes = self._final_indexes
+
+            try:
+                with FileLock(self.store.lock_path):
+                    self._write(batch, closing, final_snapshot, final_indexes)
+            except Exception as e:
+                self._requeue(batch)
+                self._report(e)
+                if closing:
+                    return
+                # 磁盘暂时不可用时不要空转
+                time.sleep(self.interval)
+                continue
+
+            if closing:
+                return
+
+
+class SyncedRecords:
+    """一个实例在内存中的全部记录，以及它与写入线程、其他实例之间的同步
+
+    WorkRecordApp 和测试共用这部分逻辑，本身不碰界面：写入线程的回调只把事件放进 events 队列，
+    由界面线程定时调用 process_events 处理。否则写入线程调用 Tk 时要等界面线程，
+    而界面线程关闭窗口时正在 close 里等写入线程结束，两边会互相等待。
+    今天的备注以界面上的文本为准，合并时通过 get_notes / set_notes 读写。
+    """
+
+    def __init__(self, store: Any, data: Dict[str, Day], indexes: Dict[str, Any], today: str,
+                 get_notes: Callable[[], str], set_notes: Callable[[str], None], **worker_options):
+        self.store = store
+        self.data = data
+        self.indexes = indexes
+        self.today = today
+        self.get_notes = get_notes
+        self.set_notes = set_notes
+        # 已交给写入线程、还没确认写入的本地变更，整体重新加载数据后要重新应用
+        self.unsaved = []
+        self.events = queue.Queue()
+        self.writer = PersistenceWorker(
+            store,
+            on_error=lambda error: self.events.put(('error', error)),
+            on_remote=lambda changes: self.events.put(('remote', changes)),
+            on_reload=lambda data, indexes: self.events.put(('reload', (data, indexes))),
+            on_commit=lambda batch: self.events.put(('commit', batch)),
+            **worker_options)
+        self.ensure_day(today)
+        # 今天备注在磁盘上的最新版本，作为与其他实例三方合并的共同起点
+        self.notes_base = self.data[today].notes
+
+    def record_change(self, change: Dict[str, Any]) -> None:
+        """应用一条变更，并交给后台线程写入日志"""
+        for index in self.indexes.values():
+            index.observe(change)
+        apply_change(self.data, change)
+        self.unsaved.append(change)
+        self.writer.submit(change)
+
+    def ensure_day(self, date: str) -> None:
+        """这一天还没有记录时新建，并把之前所有未完成的任务顺延过来"""
+        if date not in self.data:
+            open_index = self.indexes.get('open_tasks')
+            tasks = open_index.open_tasks() if open_index else []
+            self.record_change({'op': 'day', 'date': date, 'record': {'tasks': tasks, 'notes': ''}})
+
+    def close(self) -> bool:
+        """写完所有变更并生成快照，返回是否全部写入成功；之后不再处理事件"""
+        return self.writer.close(final_snapshot=self.data, final_indexes=self.indexes)
+
+    def process_events(self) -> List[Tuple[str, Any]]:
+        """处理写入线程送来的事件（在界面线程调用），返回界面需要响应的通知
+
+        通知为 ('error', 异常)、('remote', 涉及的日期集合) 或 ('reload', None)。
+        """
+        notices = []
+        while True:
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                return notices
+            if kind == 'commit':
+                self.confirm_saved(payload)
+            elif kind == 'remote':
+                notices.append(('remote', self.merge_remote_changes(payload)))
+            elif kind == 'reload':
+                self.replace_data(*payload)
+                notices.append(('reload', None))
+            else:
+                notices.append(('error', payload))
+
+    def confirm_saved(self, batch: List[Dict[str, Any]]) -> None:
+        """一批变更已经写入：从未写入列表中移除，今天的备注以写入的版本作为合并起点
+
+        写入线程按提交顺序成批写入，合并掉的旧备注修改都在这一批最后一条之前。
+        """
+        last = batch[-1]
+        for i, change in enumerate(self.unsaved):
+            if change is last:
+                del self.unsaved[:i + 1]
+                break
+        for change in batch:
+            if change['op'] == 'notes' and change['date'] == self.today:
+                self.notes_base = change['notes']
+
+    def merge_remote_changes(self, changes: List[Dict[str, Any]]) -> set:
+        """合并其他实例的变更，返回涉及的日期
+
+        任务变更按身份定位，直接应用即可；今天的备注与本地未同步的修改做三方合并。
+        """
+        touched = set()
+        for change in changes:
+            touched.add(change['date'])
+            if change['op'] == 'notes' and change['date'] == self.today:
+                self.merge_remote_notes(change)
+                continue
+            for index in self.indexes.values():
+                index.observe(change)
+            apply_remote_change(self.data, change)
+        return touched
+
+    def merge_remote_notes(self, change: Dict[str, Any]) -> None:
+        """今天的备注：对方版本先按原样应用，与本地修改合并的结果作为新的变更写回"""
+        theirs = change['notes']
+        merged = merge_text(self.notes_base, self.get_notes(), theirs)
+        self.notes_base = theirs
+        for index in self.indexes.values():
+            index.observe(change)
+        apply_remote_change(self.data, change)
+        if merged != theirs:
+            self.record_change({'op': 'notes', 'date': self.today, 'notes': merged})
+        self.set_notes(merged)
+
+    def replace_data(self, data: Dict[str, Day], indexes: Dict[str, Any]) -> None:
+        """整体换成重新加载的数据
+
+        新数据只包含已写入的变更。还没写入的本地变更重新应用上去（它们仍在写入队列中，
+        随后照常写入），今天的备注与新数据中的版本三方合并。
+        """
+        try:
+            ours = self.get_notes()
+            self.data = data
+            self.indexes = indexes
+            for change in self.unsaved:
+                if change['op'] == 'notes' and change['date'] == self.today:
+                    continue
+                for index in indexes.values():
+                    index.observe(change)
+                apply_change(data, change)
+            self.ensure_day(self.today)
+
+            theirs = self.data[self.today].notes
+            merged = merge_text(self.notes_base, ours, theirs)
+            self.notes_base = theirs
+            if merged != theirs:
+                self.record_change({'op': 'notes', 'date': self.today, 'notes': merged})
+            self.set_notes(merged)
+        finally:
+            self.writer.reload_applied()
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS days (
+    date TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL REFERENCES days(date),
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_date ON tasks(date, position);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, date);
+CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at);
+CREATE TABLE IF NOT EXISTS notes (
+    date TEXT PRIMARY KEY REFERENCES days(date),
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_state (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class LazyRecords(MutableMapping):
+    """按日期懒加载的数据字典，用法与原来的 self.data 相同
+
+    只有被访问过的日期才会从数据库读入内存；修改只作用于内存，
+    落盘仍由变更记录经 SQLiteStore.append 完成。
+    """
+
+    def __init__(self, store: 'SQLiteStore'):
+        self.store = store
+        self._days = {}
+
+    def __getitem__(self, date: str) -> Day:
+        if date not in self._days:
+            record = self.store.load_day(date)
+            if record is None:
+                raise KeyError(date)
+            self._days[date] = record
+        return self._days[date]
+
+    def __setitem__(self, date: str, record: Day) -> None:
+        self._days[date] = record
+
+    def get(self, date: str, default: Any = None) -> Any:
+        """只读访问：未缓存的日期直接从数据库读取，不留在内存里"""
+        if date in self._days:
+            return self._days[date]
+        record = self.store.load_day(date)
+        return default if record is None else record
+
+    def __delitem__(self, date: str) -> None:
+        raise TypeError("不支持删除整天的记录")
+
+    def is_cached(self, date: str) -> bool:
+        return date in self._days
+
+    def __contains__(self, date: object) -> bool:
+        return date in self._days or self.store.has_day(date)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(sorted(set(self.store.list_dates()) | set(self._days)))
+
+    def __len__(self) -> int:
+        return len(set(self.store.list_dates()) | set(self._days))
+
+
+class SQLiteStore:
+    """SQLite 存储，接口与 JournalStore 相同
+
+    每个线程使用各自的连接：界面线程按需读取，写入线程执行变更。
+    变更同时记入 changes 表，派生索引从 index_state 中保存的状态加上这些变更恢复；
+    meta 表的 checkpoint 记录索引状态已包含到哪一条变更。
+    其他实例的变更按 changes 表的编号增量读取。
+    """
+
+    snapshot_compaction = False
+    partial_load = True
+
+    def __init__(self, db_path: str, index_types: Sequence[type] = (),
+                 compact_threshold: int = DEFAULT_COMPACT_THRESHOLD):
+        self.db_path = db_path
+        self.index_types = list(index_types)
+        self.compact_threshold = compact_threshold
+        self.lock_path = os.path.splitext(db_path)[0] + '.lock'
+        self.journal_length = 0
+        # 本实例已读到（或写到）的最大变更编号
+        self.last_change_id = 0
+        self._local = threading.local()
+        self.connection.executescript(SQLITE_SCHEMA)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def release_connection(self) -> None:
+        """关闭当前线程的数据库连接，线程结束前调用；之后再访问会重新打开"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+    def load(self) -> Tuple[LazyRecords, Dict[str, Any]]:
+        """不读取任何日期，返回按需加载的数据字典和派生索引"""
+        data = LazyRecords(self)
+        conn = self.connection
+        states = dict(conn.execute("SELECT name, state FROM index_state"))
+        indexes = build_indexes(self.index_types, data, states)
+        # 没有保存状态的索引刚从数据库现有数据重建，不能再重放变更
+        replay = [index for name, index in indexes.items() if name in states]
+
+        row = conn.execute("SELECT value FROM meta WHERE key = 'checkpoint'").fetchone()
+        checkpoint = int(row[0]) if row else 0
+        self.journal_length = 0
+        self.last_change_id = checkpoint
+        for change_id, body in conn.execute("SELECT id, body FROM changes WHERE id > ? ORDER BY id", (checkpoint,)):
+            change = json.loads(body)
+            for index in replay:
+                index.observe(change)
+            self.journal_length += 1
+            self.last_change_id = change_id
+        return data, indexes
+
+    def read_foreign(self) -> Optional[List[Dict[str, Any]]]:
+        """读取其他实例写入的变更；对方折叠时删掉了还没读过的变更则返回 None"""
+        conn = self.connection
+        first, last = conn.execute("SELECT MIN(id), MAX(id) FROM changes").fetchone()
+        if last is None or last <= self.last_change_id:
+            return []
+        if first > self.last_change_id + 1:
+            self.last_change_id = last
+            return None
+        changes = [
+            json.loads(body) for (body,) in
+            conn.execute("SELECT body FROM changes WHERE id > ? ORDER BY id", (self.last_change_id,))
+        ]
+        self.last_change_id = last
+        self.journal_length += len(changes)
+        return changes
+
+    def has_day(self, date: object) -> bool:
+        row = self.connection.execute("SELECT 1 FROM days WHERE date = ?", (date,)).fetchone()
+        return row is not None
+
+    def list_dates(self, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+        """按日期升序列出 [start, end] 范围内有记录的日期"""
+        rows = self.connection.execute(
+            "SELECT date FROM days WHERE date >= ? AND date <= ? ORDER BY date",
+            (start or '', end or '\uffff')
+        )
+        return [row[0] for row in rows]
+
+    def load_day(self, date: str) -> Optional[Day]:
+        """读取单日记录，不存在时返回 None"""
+        if not self.has_day(date):
+            return None
+        conn = self.connection
+        tasks = [
+            Task.from_json({'text': text, 'status': status, 'created_at': created_at})
+            for text, status, created_at in conn.execute(
+                "SELECT text, status, created_at FROM tasks WHERE date = ? ORDER BY position", (date,)
+            )
+        ]
+        row = conn.execute("SELECT body FROM notes WHERE date = ?", (date,)).fetchone()
+        return Day(tasks, row[0] if row else '')
+
+    def _insert_tasks(self, date: str, tasks: List[Dict[str, Any]], first_position: int = 0) -> None:
+        self.connection.executemany(
+            "INSERT INTO tasks (date, position, text, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (date, first_position + i, task['text'], int(task['status']), task['created_at'])
+                for i, task in enumerate(tasks)
+            ]
+        )
+
+    def _find_position(self, date: str, change: Dict[str, Any]) -> Optional[int]:
+        """与 find_task 相同的规则：按身份定位任务，位置只作提示"""
+        conn = self.connection
+        if 'key' not in change:
+            return change['index']
+        created_at, text = change['key']
+        positions = [row[0] for row in conn.execute(
+            "SELECT position FROM tasks WHERE date = ? AND created_at = ? AND text = ? ORDER BY position",
+            (date, created_at, text)
+        )]
+        if change.get('index') in positions:
+            return change['index']
+        return positions[0] if positions else None
+
+    def _apply(self, change: Dict[str, Any]) -> None:
+        """把一条变更翻译成 SQL"""
+        conn = self.connection
+        op = change['op']
+        date = change['date']
+        conn.execute("INSERT OR IGNORE INTO days (date) VALUES (?)", (date,))
+        if op == 'day':
+            # 与 apply_change 相同：已有记录时只补上缺少的任务
+            rows = conn.execute("SELECT created_at, text FROM tasks WHERE date = ?", (date,)).fetchall()
+            known = set(rows)
+            tasks = [task for task in change['record']['tasks'] if (task['created_at'], task['text']) not in known]
+            # 同一天可能有重复的任务，新任务接在已有的行数之后
+            self._insert_tasks(date, tasks, len(rows))
+            conn.execute("INSERT OR IGNORE INTO notes (date, body) VALUES (?, '')", (date,))
+            conn.execute("UPDATE notes SET body = ? WHERE date = ? AND body = ''",
+                         (change['record'].get('notes', ''), date))
+        elif op == 'add':
+            count = conn.execute("SELECT COUNT(*) FROM tasks WHERE date = ?", (date,)).fetchone()[0]
+            self._insert_tasks(date, [change['task']], count)
+        elif op == 'status':
+            position = self._find_position(date, change)
+            conn.execute("UPDATE tasks SET status = ? WHERE date = ? AND position = ?",
+                         (int(change['status']), date, position))
+        elif op == 'delete':
+            position = self._find_position(date, change)
+            if position is not None:
+                conn.execute("DELETE FROM tasks WHERE date = ? AND position = ?", (date, position))
+                conn.execute("UPDATE tasks SET position = position - 1 WHERE date = ? AND position > ?",
+                             (date, position))
+        elif op == 'notes':
+            conn.execute("INSERT OR REPLACE INTO notes (date, body) VALUES (?, ?)", (date, change['notes']))
+        else:
+            raise ValueError(f"未知的变更类型: {op}")
+
+    def append(self, changes: List[Dict[str, Any]]) -> int:
+        """在一个事务中写入一批变更，返回变更记录的字节数（不含表和索引的更新）"""
+        if not changes:
+            return 0
+        bodies = [json.dumps(change, ensure_ascii=False) for change in changes]
+        with self.connection:
+            for change in changes:
+                self._apply(change)
+            self.connection.executemany("INSERT INTO changes (body) VALUES (?)", [(body,) for body in bodies])
+            self.last_change_id = self.connection.execute("SELECT MAX(id) FROM changes").fetchone()[0]
+        self.journal_length += len(changes)
+        return sum(len(body.encode('utf-8')) for body in bodies)
+
+    def needs_compaction(self) -> bool:
+        return self.journal_length >= self.compact_threshold
+
+    def compact(self, data: Any, indexes: Optional[Dict[str, Any]] = None) -> int:
+        """保存索引状态并清理 changes 表，返回索引状态的字节数；数据本身已在表中，无需另写快照
+
+        保留最后一条变更，使编号不会从头开始，其他实例才能据此判断自己是否漏读。
+        """
+        conn = self.connection
+        states = [(name, json.dumps(index.to_state(), ensure_ascii=False)) for name, index in (indexes or {}).items()]
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO index_state (name, state) VALUES (?, ?)", states)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('checkpoint', ?)",
+                         (str(self.last_change_id),))
+            conn.execute("DELETE FROM changes WHERE id < ?", (self.last_change_id,))
+        conn.execute("PRAGMA optimize")
+        self.journal_length = 0
+        return sum(len(state.encode('utf-8')) for _, state in states)
+
+
+def sqlite_path_for(snapshot_path: str) -> str:
+    """与 JSON 快照同目录的数据库文件路径"""
+    return os.path.splitext(snapshot_path)[0] + '.db'
+
+
+def open_store(snapshot_path: str, index_types: Sequence[type] = ()):
+    """已迁移到 SQLite 时使用数据库，否则使用 JSON 快照 + 日志"""
+    db_path = sqlite_path_for(snapshot_path)
+    if os.path.exists(db_path):
+        return SQLiteStore(db_path, index_types)
+    return JournalStore(snapshot_path, index_types)
+
+
+def migrate_json_to_sqlite(snapshot_path: str, db_path: Optional[str] = None,
+                           index_types: Sequence[type] = ()) -> str:
+    """把 JSON 快照（连同未折叠的日志）一次性导入新建的 SQLite 数据库"""
+    db_path = db_path or sqlite_path_for(snapshot_path)
+    if os.path.exists(db_path):
+        raise FileExistsError(f"数据库已存在: {db_path}")
+
+    data, indexes = JournalStore(snapshot_path, index_types).load()
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        with conn:
+            conn.executescript(SQLITE_SCHEMA)
+            conn.executemany("INSERT INTO days (date) VALUES (?)", [(date,) for date in data])
+            conn.executemany(
+                "INSERT INTO tasks (date, position, text, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (date, position, task.text, int(task.status), task.created_at)
+                    for date, record in data.items()
+                    for position, task in enumerate(record.tasks)
+                ]
+            )
+            conn.executemany(
+                "INSERT INTO notes (date, body) VALUES (?, ?)",
+                [(date, record.notes) for date, record in data.items()]
+            )
+            conn.executemany(
+                "INSERT INTO index_state (name, state) VALUES (?, ?)",
+                [(name, json.dumps(index.to_state(), ensure_ascii=False)) for name, index in indexes.items()]
+            )
+    finally:
+        conn.close()
+    # 迁移完整成功后才让数据库出现，程序下次启动即改用 SQLite
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == 'migrate':
+        from work_records_index import INDEX_TYPES
+        source = sys.argv[2] if len(sys.argv) > 2 else os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'work_records.json')
+        print(f"已迁移到 {migrate_json_to_sqlite(source, index_types=INDEX_TYPES)}")
+    else:
+        print("用法: python work_records_storage.py migrate [work_records.json]")